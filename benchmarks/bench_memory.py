@@ -0,0 +1,80 @@
+"""Benchmark of memory taken by objects of the world.
+Populates worlds with growing numbers of worms and food
+and measures the memory allocated per worm and per food object
+and the size of a single worm object, prints the results as JSON.
+
+Run from the repository root:
+    python -m benchmarks.bench_memory --output memory.json"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import tracemalloc
+from typing import Dict
+
+import numpy as np
+
+from benchmarks.bench_processors import commit_hash
+from src.world import World
+
+SIZES = [10000, 100000, 1000000]
+
+QUICK_SIZES = [10000]
+
+
+def measure(worms_num: int, food_num: int, columnar: bool, seed: int,
+            food_field: bool = False) -> Dict:
+    """Returns the memory allocated while populating the world."""
+    gc.collect()
+    tracemalloc.start()
+    world = World(1000, 1000, worms_num, food_num, columnar, seed, food_field)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    worm_object = sys.getsizeof(world.worms[0]) if world.worms else 0
+    del world
+    return {'worms_num': worms_num,
+            'food_num': food_num,
+            'allocated_bytes': allocated,
+            'worm_object_bytes': worm_object}
+
+
+def main() -> None:
+    """Runs the benchmark and writes JSON results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='*', type=int, help='numbers of worms to create')
+    parser.add_argument('--quick', action='store_true', help='run only the smallest size')
+    parser.add_argument('--columnar', action='store_true', help='use the columnar population store')
+    parser.add_argument('--food-field', action='store_true', help='keep food in the food field')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='file for JSON results, stdout if not set')
+    args = parser.parse_args()
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    results = {'commit': commit_hash(),
+               'python': platform.python_version(),
+               'numpy': np.__version__,
+               'columnar': args.columnar,
+               'food_field': args.food_field,
+               'seed': args.seed,
+               'sizes': []}
+    for size in sizes:
+        empty = measure(0, 0, args.columnar, args.seed, args.food_field)
+        worms_only = measure(size, 0, args.columnar, args.seed, args.food_field)
+        food_only = measure(0, size, args.columnar, args.seed, args.food_field)
+        results['sizes'].append({
+            'size': size,
+            'bytes_per_worm': (worms_only['allocated_bytes'] - empty['allocated_bytes']) / size,
+            'worm_object_bytes': worms_only['worm_object_bytes'],
+            'bytes_per_food': (food_only['allocated_bytes'] - empty['allocated_bytes']) / size})
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as writer:
+            writer.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Benchmark of world processors and of the full simulation tick.
+Builds worlds of several sizes, densities and food loads,
+times every processor separately and the whole pipeline
+from worms.py, prints the results as JSON.
+
+Run from the repository root:
+    python -m benchmarks.bench_processors --output bench.json"""
+import argparse
+import configparser
+import copy
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from typing import Dict, List
+
+import numpy as np
+
+import worms
+from src.frame_sinks import FrameSink
+from src.processors import Visualizer, WorldProcessor
+from src.world import World
+
+SCENARIOS = [
+    {'name': 'small', 'height': 50, 'width': 50, 'worms_num': 250, 'food_num': 500},
+    {'name': 'medium', 'height': 200, 'width': 200, 'worms_num': 4000, 'food_num': 8000},
+    {'name': 'medium_dense', 'height': 200, 'width': 200, 'worms_num': 20000, 'food_num': 40000},
+    {'name': 'large_sparse', 'height': 1000, 'width': 1000, 'worms_num': 20000, 'food_num': 20000},
+    {'name': 'crowded', 'height': 100, 'width': 100, 'worms_num': 2000, 'food_num': 4000,
+     'crowded_cells': 20},
+]
+
+QUICK_SCENARIOS = ['small', 'crowded']
+
+
+def benchmark_config(columnar: bool, mode: str) -> configparser.ConfigParser:
+    """Returns the repository config with the display turned off."""
+    config = configparser.ConfigParser()
+    config.read('resources/config.ini')
+    config.set('WORLD', 'columnar', str(columnar))
+    config.set('EXECUTION', 'mode', mode)
+    config.set('VISUALIZER', 'display', 'False')
+    config.set('VISUALIZER', 'output', 'none')
+    return config
+
+
+def crowd(world: World, cells_num: int) -> None:
+    """Moves all worms into a few random cells."""
+    hot_cells = world.get_random_positions(cells_num)
+    for worm in list(world.worms):
+        world.grid.remove_worm(world.grid.cell_id(worm.coordinates), worm)
+        worm.coordinates = world.random.choice(hot_cells)
+        world.grid.add_worm(world.grid.cell_id(worm.coordinates), worm)
+
+
+def build_world(scenario: Dict, columnar: bool, seed: int) -> World:
+    """Creates the world of the scenario."""
+    world = World(scenario['height'], scenario['width'],
+                  scenario['worms_num'], scenario['food_num'], columnar, seed)
+    if 'crowded_cells' in scenario:
+        crowd(world, scenario['crowded_cells'])
+    return world
+
+
+def benchmark_processor(proc_class, world: World, config: configparser.ConfigParser,
+                        repeats: int) -> Dict:
+    """Times one call of the processor on fresh copies of the world."""
+    timings = []
+    worms_num = len(world.worms)
+    for _ in range(repeats):
+        world_copy = copy.deepcopy(world)
+        if proc_class is Visualizer:
+            proc: WorldProcessor = Visualizer(sinks=[FrameSink()])
+        else:
+            proc = proc_class.from_config(config)
+        start = time.perf_counter()
+        proc.process(world_copy)
+        timings.append(time.perf_counter() - start)
+        proc.close()
+    median = statistics.median(timings)
+    return {'median_seconds': median,
+            'min_seconds': min(timings),
+            'worm_updates_per_second': worms_num / median if median > 0 else None}
+
+
+def run_ticks(world: World, processors: List[WorldProcessor], ticks: int) -> int:
+    """Runs the pipeline, returns the number of processed worm updates."""
+    worm_updates = 0
+    for _ in range(ticks):
+        worm_updates += len(world.worms)
+        world.start_tick()
+        for proc in processors:
+            proc.process(world)
+    return worm_updates
+
+
+def benchmark_pipeline(world: World, config: configparser.ConfigParser, ticks: int) -> Dict:
+    """Times the full pipeline of worms.py and measures its peak memory."""
+    world_copy = copy.deepcopy(world)
+    processors = worms.build_processors(config)
+    start = time.perf_counter()
+    worm_updates = run_ticks(world_copy, processors, ticks)
+    elapsed = time.perf_counter() - start
+
+    world_copy = copy.deepcopy(world)
+    processors = worms.build_processors(config)
+    tracemalloc.start()
+    run_ticks(world_copy, processors, ticks)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'ticks': ticks,
+            'seconds': elapsed,
+            'ticks_per_second': ticks / elapsed,
+            'worm_updates_per_second': worm_updates / elapsed,
+            'final_worms': len(world_copy.worms),
+            'peak_memory_bytes': peak_memory}
+
+
+def commit_hash() -> str:
+    """Returns the current git commit, if known."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main() -> None:
+    """Runs the benchmark and writes JSON results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', nargs='*', help='names of scenarios to run')
+    parser.add_argument('--quick', action='store_true', help='run only small scenarios')
+    parser.add_argument('--columnar', action='store_true', help='use the columnar population store')
+    parser.add_argument('--mode', default='sequential', choices=['sequential', 'fused'])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=3,
+                        help='ticks run before timing, so weather and dead worms appear')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='file for JSON results, stdout if not set')
+    args = parser.parse_args()
+
+    selected = args.scenarios or (QUICK_SCENARIOS if args.quick else None)
+    scenarios = [scenario for scenario in SCENARIOS
+                 if selected is None or scenario['name'] in selected]
+    config = benchmark_config(args.columnar, args.mode)
+
+    results = {'commit': commit_hash(),
+               'python': platform.python_version(),
+               'numpy': np.__version__,
+               'columnar': args.columnar,
+               'mode': args.mode,
+               'seed': args.seed,
+               'warmup': args.warmup,
+               'scenarios': []}
+
+    for scenario in scenarios:
+        world = build_world(scenario, args.columnar, args.seed)
+        run_ticks(world, worms.build_processors(config), args.warmup)
+        processors_results = {
+            name: benchmark_processor(proc_class, world, config, args.repeats)
+            for name, proc_class in worms.VALID_PROCESSORS.items()}
+        results['scenarios'].append({
+            'scenario': scenario,
+            'processors': processors_results,
+            'pipeline': benchmark_pipeline(world, config, args.ticks)})
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as writer:
+            writer.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
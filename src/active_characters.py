@@ -1,9 +1,12 @@
 """The module contains the main characters
-(worms with genetics class and food)."""
+(worms with genetics class and food).
+Methods drawing random values take the source of them in rng,
+the random module is used by default."""
 import random
+import weakref
 from enum import Enum
 from operator import add
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 from resources.names import NAMES
 
@@ -17,26 +20,90 @@ class Genes(Enum):
 
 
 genes_variations = [Genes.HEALTH, Genes.DAMAGE, Genes.ENERGY, Genes.DEFENSE]
+GENE_CODES = {gene: code for code, gene in enumerate(genes_variations)}
+GENES_PER_BONUS = {Genes.HEALTH: 4, Genes.DAMAGE: 5, Genes.ENERGY: 3, Genes.DEFENSE: 5}
 
 
-def create_genome() -> List[Genes]:
+GENOME_LENGTH = 12
+
+
+def create_genome(rng=random) -> List[Genes]:
     """Creates full genome, used for newborn worm."""
     genotype = []
-    genes_for_add = 12
+    genes_for_add = GENOME_LENGTH
     while genes_for_add > 0:
-        genotype.append(random.choice(genes_variations))
+        genotype.append(rng.choice(genes_variations))
         genes_for_add -= 1
     return genotype
 
 
+class Genome:
+    """Distinct genome shared by all worms carrying it.
+    Keeps codes of genes, numbers of genes of every type
+    and bonuses the genes give to a newborn worm.
+    Instances are created by intern_genome only and never changed."""
+
+    __slots__ = ('codes', 'counts', 'bonuses', 'pools', '__weakref__')
+
+    def __init__(self, codes: bytes, counts: Optional[tuple] = None):
+        self.codes = codes
+        if counts is None:
+            counts = tuple(codes.count(code) for code in range(len(genes_variations)))
+        self.counts, self.bonuses, self.pools = _gene_bonuses(counts)
+
+
+_bonuses: Dict[tuple, tuple] = {}
+
+
+def _gene_bonuses(counts: tuple) -> tuple:
+    """Returns the counts of genes, numbers of bonuses and genes left in the pools,
+    the tuples are shared by all genomes with the same counts of genes."""
+    bonuses = _bonuses.get(counts)
+    if bonuses is None:
+        bonuses_and_pools = [divmod(count, GENES_PER_BONUS[gene])
+                             for gene, count in zip(genes_variations, counts)]
+        bonuses = _bonuses[counts] = (counts,
+                                      tuple(bonus for bonus, _ in bonuses_and_pools),
+                                      tuple(pool for _, pool in bonuses_and_pools))
+    return bonuses
+
+
+_genomes: 'weakref.WeakValueDictionary[bytes, Genome]' = weakref.WeakValueDictionary()
+
+
+def intern_genome(codes: bytes, counts: Optional[tuple] = None) -> Genome:
+    """Returns the shared genome with the codes of genes,
+    the genome is created on the first use,
+    numbers of genes of every type may be given if they are known.
+    Genomes not carried by any worm are removed from the table."""
+    genome = _genomes.get(codes)
+    if genome is None:
+        genome = _genomes[codes] = Genome(bytes(codes), counts)
+    return genome
+
+
+EMPTY_GENOME = intern_genome(b'')
+
+
 class Genetics:
     """The class contains a genotype consisting of genes
     that improve the characteristics of worm instances
-    and counters for these bonuses."""
-
-    def __init__(self):
-        self.genotype: list = []
-        self.family_affinity: float = random.random()
+    and counters for these bonuses.
+    The genome is kept as bytes of gene codes,
+    the code of a gene is its index in genes_variations.
+    Equal genomes of different worms are one shared Genome,
+    a mutation replaces the genome of the worm with another one."""
+
+    state_fields = ('family',
+                    'energetic_genes_pool', 'health_genes_pool',
+                    'damage_genes_pool', 'defense_genes_pool',
+                    'energetic_boost', 'health_boost', 'damage_boost', 'defense_boost')
+
+    __slots__ = ('shared_genome',) + state_fields
+
+    def __init__(self, rng=random):
+        self.shared_genome: Genome = EMPTY_GENOME
+        self.family: int = rng.getrandbits(63)
         self.energetic_genes_pool: int = 0
         self.health_genes_pool: int = 0
         self.damage_genes_pool: int = 0
@@ -46,14 +113,58 @@ class Genetics:
         self.damage_boost: int = 0
         self.defense_boost: int = 0
 
+    @classmethod
+    def from_state(cls, genome: Genome, state: tuple) -> 'Genetics':
+        """Creates genetics with the shared genome
+        and values in the order of state_fields without random draws."""
+        genetics = cls.__new__(cls)
+        genetics.shared_genome = genome
+        (genetics.family,
+         genetics.energetic_genes_pool, genetics.health_genes_pool,
+         genetics.damage_genes_pool, genetics.defense_genes_pool,
+         genetics.energetic_boost, genetics.health_boost,
+         genetics.damage_boost, genetics.defense_boost) = state
+        return genetics
+
+    def get_genome(self) -> bytes:
+        """Returns codes of genes of the genotype."""
+        return self.shared_genome.codes
+
+    def set_genome(self, new_genome: bytes) -> None:
+        """Sets codes of genes of the genotype."""
+        self.shared_genome = intern_genome(new_genome)
+
+    genome = property(get_genome, set_genome)
+
+    @property
+    def gene_counts(self) -> tuple:
+        """Numbers of genes of every type in the genotype."""
+        return self.shared_genome.counts
+
+    def get_genotype(self) -> List[Genes]:
+        """Returns genes of the genotype."""
+        return [genes_variations[code] for code in self.shared_genome.codes]
+
+    def set_genotype(self, new_genotype: List[Genes]) -> None:
+        """Sets genes of the genotype."""
+        self.set_genome(bytes(GENE_CODES[gene] for gene in new_genotype))
+
+    genotype = property(get_genotype, set_genotype)
+
+    def gene_count(self, gene: Genes) -> int:
+        """Returns the number of genes of the type in the genotype."""
+        return self.shared_genome.counts[GENE_CODES[gene]]
+
     def insertion_mutation(self, inserted_gene: Genes) -> None:
         """Adding gene to the genotype of instance."""
-        self.genotype.append(inserted_gene)
+        self.set_genome(self.shared_genome.codes + bytes((GENE_CODES[inserted_gene],)))
 
     def deletion_mutation(self, deleted_gene: Genes) -> None:
-        """Deleting gene from the genotype of instance."""
-        if len(self.genotype) > 0:
-            self.genotype.remove(deleted_gene)
+        """Deleting the first gene of the type from the genotype of instance."""
+        codes = self.shared_genome.codes
+        if len(codes) > 0:
+            index = codes.index(GENE_CODES[deleted_gene])
+            self.set_genome(codes[:index] + codes[index + 1:])
 
     def substitution_mutation(self, deleted_gene: Genes, inserted_gene: Genes) -> None:
         """Replaces one random gene with another random one."""
@@ -62,18 +173,30 @@ class Genetics:
 
 
 class Character:
-    """Base class for objects on the map."""
+    """Base class for objects on the map.
+    Objects on the map and their genetics keep their attributes
+    in __slots__ instead of a dictionary of every instance,
+    coordinates are kept by the subclasses."""
+
+    __slots__ = ('uid', 'cell_index')
 
     def __init__(self, coordinates: tuple):
         self.coordinates = coordinates
+        self.uid: int = -1
+        self.cell_index: int = -1
 
 
 class Food(Character):
     """Healing objects located on the map."""
 
-    def __init__(self, coordinates: tuple):
+    __slots__ = ('coordinates', 'nutritional_value')
+
+    def __init__(self, coordinates: tuple, nutritional_value: Optional[float] = None,
+                 rng=random):
         super().__init__(coordinates)
-        self.nutritional_value: float = random.randint(1, 5)
+        if nutritional_value is None:
+            nutritional_value = rng.randint(1, 5)
+        self.nutritional_value: float = nutritional_value
 
     @property
     def eaten(self) -> bool:
@@ -88,16 +211,26 @@ class Food(Character):
         self.coordinates = (new_x, new_y)
 
 
-class Worm(Character):
-    """Main active objects of simulation."""
+class BaseWorm(Character):
+    """Main active objects of simulation.
+    The name is kept as its index in NAMES.
+    Coordinates and characteristics listed in state_fields after the name
+    are kept by the subclasses: in __slots__ by Worm
+    and in the columns of the population store by ColumnarWorm."""
 
-    def __init__(self, coordinates: tuple):
+    state_fields = ('_name_index', '_health', '_damage', '_defense', '_initiative', '_energy',
+                    '_level', '_experience', '_poisoned', '_divisions_limit',
+                    '_generation', '_age')
+
+    __slots__ = ('_name_index', 'genetics')
+
+    def __init__(self, coordinates: tuple, rng=random):
         super().__init__(coordinates)
-        self._name: str = random.choice(NAMES)
-        self._health: float = random.randint(6, 9)
-        self._damage: float = random.randint(1, 3)
-        self._defense: float = random.uniform(0.8, 0.95)
-        self._initiative: float = random.randint(1, 3)
+        self._name_index: int = rng.randrange(len(NAMES))
+        self._health: float = rng.randint(6, 9)
+        self._damage: float = rng.randint(1, 3)
+        self._defense: float = rng.uniform(0.8, 0.95)
+        self._initiative: float = rng.randint(1, 3)
         self._energy: float = 100
         self._level: int = 1
         self._experience: int = 0
@@ -106,7 +239,33 @@ class Worm(Character):
         self._generation: float = 0
         self._age: float = 0
 
-        self.genetics = Genetics()
+        self.genetics = Genetics(rng)
+
+    @classmethod
+    def from_state(cls, coordinates: tuple, state: tuple, genetics: Genetics) -> 'Worm':
+        """Creates a worm with characteristics in the order of state_fields
+        and the given genetics without random draws."""
+        worm = cls.__new__(cls)
+        Character.__init__(worm, coordinates)
+        (worm._name_index, worm._health, worm._damage, worm._defense, worm._initiative,
+         worm._energy, worm._level, worm._experience, worm._poisoned, worm._divisions_limit,
+         worm._generation, worm._age) = state
+        worm.genetics = genetics
+        return worm
+
+    def get_state(self) -> tuple:
+        """Returns characteristics of the worm in the order of state_fields."""
+        return tuple(getattr(self, field) for field in self.state_fields)
+
+    def set_state(self, state: tuple) -> None:
+        """Restores characteristics of the worm returned by get_state."""
+        for field, value in zip(self.state_fields, state):
+            setattr(self, field, value)
+
+    @property
+    def name(self) -> str:
+        """Returns the name of worm instance."""
+        return NAMES[self._name_index]
 
     def get_health(self) -> float:
         """Get _health value of worm instance."""
@@ -242,32 +401,44 @@ class Worm(Character):
     def newborn_genetics_boost(self, genotype: list) -> None:
         """Fills the pool of each type
          by the number of genes
-         of certain types contained in the genotype.
-         The method is used when creating a new instance."""
-        for gene in genotype:
-            if gene is Genes.ENERGY:
-                self.genetics.energetic_genes_pool += 1
-                continue
-            if gene is Genes.HEALTH:
-                self.genetics.health_genes_pool += 1
-                continue
-            if gene is Genes.DAMAGE:
-                self.genetics.damage_genes_pool += 1
-                continue
-            if gene is Genes.DEFENSE:
-                self.genetics.defense_genes_pool += 1
-
-        self.energetic_genes_realization()
-        self.health_genes_realization()
-        self.damage_genes_realization()
-        self.defense_genes_realization()
-
-    def insertion_mutation(self) -> None:
+         of certain types contained in the genotype
+         and gives the bonuses of the full pools.
+         The method is used when creating a new instance,
+         the bonuses are computed once for every distinct filling of the pools.
+         Negative pools are realized one by one like after mutations."""
+        genetics = self.genetics
+        pools = (genetics.health_genes_pool + genotype.count(Genes.HEALTH),
+                 genetics.damage_genes_pool + genotype.count(Genes.DAMAGE),
+                 genetics.energetic_genes_pool + genotype.count(Genes.ENERGY),
+                 genetics.defense_genes_pool + genotype.count(Genes.DEFENSE))
+        if min(pools) < 0:
+            (genetics.health_genes_pool, genetics.damage_genes_pool,
+             genetics.energetic_genes_pool, genetics.defense_genes_pool) = pools
+            self.energetic_genes_realization()
+            self.health_genes_realization()
+            self.damage_genes_realization()
+            self.defense_genes_realization()
+            return
+        _, (health_bonuses, damage_bonuses, energetic_bonuses, defense_bonuses), \
+            (genetics.health_genes_pool, genetics.damage_genes_pool,
+             genetics.energetic_genes_pool, genetics.defense_genes_pool) = _gene_bonuses(pools)
+        genetics.health_boost += health_bonuses
+        genetics.damage_boost += damage_bonuses
+        genetics.energetic_boost += energetic_bonuses
+        genetics.defense_boost += defense_bonuses
+
+        self._health += Genes.HEALTH.value * health_bonuses
+        self._damage += Genes.DAMAGE.value * damage_bonuses
+        self._energy += Genes.ENERGY.value * energetic_bonuses
+        for _ in range(defense_bonuses):
+            self._defense = max(self._defense - Genes.DEFENSE.value, 0.2)
+
+    def insertion_mutation(self, rng=random) -> None:
         """The method adds a random new gene to the genotype of instance
          and adds 1 to the pool of genes of that type.
          If the pool is full, it increases the characteristic
          corresponding to the type of gene by the value of the gene."""
-        inserted_gene = random.choice(genes_variations)
+        inserted_gene = rng.choice(genes_variations)
         self.genetics.insertion_mutation(inserted_gene)
         if inserted_gene is Genes.ENERGY:
             self.genetics.energetic_genes_pool += 1
@@ -285,21 +456,21 @@ class Worm(Character):
             self.genetics.defense_genes_pool += 1
             self.defense_genes_realization()
 
-    def deletion_mutation(self) -> None:
+    def deletion_mutation(self, rng=random) -> None:
         """Removes a random gene from the genotype of the worm instance,
         reduces the pool of the corresponding type of genes,
         if the pool becomes less than zero,
         then decreases the characteristic of the worm instance
          by the value of the gene."""
-        if len(self.genetics.genotype) == 0:
+        if len(self.genetics.genome) == 0:
             self._health = 0
             return
 
-        if len(self.genetics.genotype) == 1:
-            self.genetics.genotype = []
+        if len(self.genetics.genome) == 1:
+            self.genetics.genome = b''
             self._health = 0
         else:
-            deleted_gene = random.choice(self.genetics.genotype)
+            deleted_gene = genes_variations[rng.choice(self.genetics.genome)]
             self.genetics.deletion_mutation(deleted_gene)
             if deleted_gene == Genes.ENERGY:
                 self.genetics.energetic_genes_pool -= 1
@@ -314,36 +485,37 @@ class Worm(Character):
                 self.genetics.defense_genes_pool -= 1
                 self.defense_genes_realization()
 
-    def substitution_mutation(self) -> None:
+    def substitution_mutation(self, rng=random) -> None:
         """Removes a random gene from the worm's genotype,
         adds a random gene to the genotype,
         checks the corresponding gene pools,
         and implements a bonus / penalty
         on the corresponding pool values."""
-        self.deletion_mutation()
-        self.insertion_mutation()
+        self.deletion_mutation(rng)
+        self.insertion_mutation(rng)
 
-    def mutation_metamorphosis(self, mutation_probability_throw: int) -> None:
+    def mutation_metamorphosis(self, mutation_probability_throw: int, rng=random) -> None:
         """Removes a gene from the genotype of the worm
          and / or adds a gene to the genotype.
          Makes the appropriate changes to the pool of genes to be changed,
          implements the bonus / penalty of the worm characteristics
          corresponding to the pool."""
         if mutation_probability_throw == 1:
-            self.substitution_mutation()
+            self.substitution_mutation(rng)
         elif 1 < mutation_probability_throw < 4:
-            self.insertion_mutation()
+            self.insertion_mutation(rng)
         elif 3 < mutation_probability_throw < 6:
-            self.deletion_mutation()
+            self.deletion_mutation(rng)
 
-    def level_up(self) -> None:
+    def level_up(self, rng=random) -> bool:
         """Upgrade level of worm instance, gives a health bonus
         and bonus to one of the three characteristics
-        (damage, defense, initiative)."""
+        (damage, defense, initiative).
+        Returns True if the level has been raised."""
         if self.dead:
-            return
+            return False
         if self._experience < self._level + 2:
-            return
+            return False
 
         self._level += 1
         self._experience = 0
@@ -352,12 +524,13 @@ class Worm(Character):
         if self._defense > 0.2:
             level_ups.append(self.level_up_defense)
 
-        level_up_func = random.choice(level_ups)
+        level_up_func = rng.choice(level_ups)
         level_up_func()
 
         self._defense = max(self._defense, 0.2)
 
         self.division_potential()
+        return True
 
     def level_up_damage(self) -> float:
         """Gives bonus of damage and health,
@@ -401,25 +574,27 @@ class Worm(Character):
         return penalty_value
 
     @staticmethod
-    def poison(target) -> None:
+    def poison(target, rng=random) -> None:
         """Increasing _poisoned of worm instance for random value."""
-        target.poisoned += random.randint(1, 3)
+        target._poisoned += rng.randint(1, 3)
 
     def poison_effect(self) -> None:
         """With positive poisoning, the worm takes damage,
         the duration of the poisoning decreases."""
-        if self.get_poisoned() > 0:
+        if self._poisoned > 0:
             self._health -= 1
-            self.poisoned -= 1
+            self._poisoned -= 1
 
     def is_relative_to(self, other) -> bool:
-        """True if the family affinity is below 1e-12.
+        """True if the worms belong to the same family.
+        A family is founded by a worm created with a random id,
+        children inherit the id of the parent.
         Used in the strike method.
         Relatives do not strikes each other,
         do not mix their genotypes
         when creating a child in genetic_variability
         in main module World class."""
-        return abs(self.genetics.family_affinity - other.genetics.family_affinity) < 1e-12
+        return self.genetics.family == other.genetics.family
 
     def is_dangerous(self, enemy_health: float) -> bool:
         """An enemy is considered dangerous
@@ -432,16 +607,17 @@ class Worm(Character):
         """Returns a value equal to the highest value of health in the list of worms. """
         danger_health = 0
         if worms_here:
-            danger_health = max([worm.get_health() for worm in worms_here])
+            danger_health = max([worm._health for worm in worms_here])
         return danger_health
 
     def get_safe_steps(self, steps: Dict[Enum, List]) -> List:
         """Accepts a dictionary (key = location, value = list of worms in location).
         Returns a list of locations in which the highest health value of the worm
         from the list of worms is less than the health of the current worm. """
+        health = self._health
         safe_steps = []
-        for step in steps:
-            if not self.is_dangerous(self.max_danger_at_location(steps.get(step))):
+        for step, worms_here in steps.items():
+            if max([worm._health for worm in worms_here], default=0) <= health:
                 safe_steps.append(step.value)
         return safe_steps
 
@@ -458,25 +634,29 @@ class Worm(Character):
             best_steps = safe_steps
         return best_steps
 
-    def strike(self, other) -> None:
+    def strike(self, other, rng=random) -> bool:
         """This worm strikes another worm, damaging it
         and has a chance to poison it.
         Energy is consumed per strike with the age penalty.
-         This worm gains +1 experience."""
+         This worm gains +1 experience.
+         Returns True if the strike has been made."""
         if not self.dead and self._energy > 0:
-            other.health -= self._damage * other.get_defense()
+            other._health -= self._damage * other._defense
             self._experience += 1
             self._energy -= 2 * self.aging_penalty()
-            poison_probability_throw = random.randint(1, 10)
+            poison_probability_throw = rng.randint(1, 10)
             if poison_probability_throw <= 3:
-                self.poison(other)
+                self.poison(other, rng)
+            return True
+        return False
 
-    def eat(self, target_food) -> None:
+    def eat(self, target_food) -> bool:
         """The worm eats food, gaining a health bonus
          equal to the nutritional value
           and a multiplier energy bonus.
           When a certain energy level is reached,
-          the worm's division limit increases."""
+          the worm's division limit increases.
+          Returns True if the food has been eaten."""
         if not self.dead:
             if target_food.nutritional_value > 0:
                 self._health += target_food.nutritional_value
@@ -485,6 +665,8 @@ class Worm(Character):
                 if self._energy > 150:
                     self._divisions_limit += 1
                     self._energy -= 50
+                return True
+        return False
 
     def move(self, step: tuple, border_x: int, border_y: int) -> None:
         """The worm moves to another cell wasting energy with aging penalty."""
@@ -494,3 +676,9 @@ class Worm(Character):
             new_x = min(max(new_coordinates[0], 0), border_x - 1)
             new_y = min(max(new_coordinates[1], 0), border_y - 1)
             self.coordinates = (new_x, new_y)
+
+
+class Worm(BaseWorm):
+    """Worm keeping its coordinates and characteristics in __slots__."""
+
+    __slots__ = ('coordinates',) + BaseWorm.state_fields[1:]
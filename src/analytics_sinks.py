@@ -0,0 +1,93 @@
+"""The module contains destinations of analytics records:
+CSV file and NumPy files of columns.
+A batch of records is a dictionary of equal length columns by their names,
+batches are written from a background thread by AsyncAnalyticsSink."""
+import csv
+import glob
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.async_writer import AsyncWriter
+
+
+class AnalyticsSink:
+    """Base class of analytics destinations."""
+
+    def write(self, batch: Dict[str, np.ndarray]) -> None:
+        """Base method of analytics destinations."""
+
+    def close(self) -> None:
+        """Releases resources of the destination."""
+
+
+class AsyncAnalyticsSink(AsyncWriter, AnalyticsSink):
+    """Passes batches to another sink from a background thread,
+    waiting for free space when the queue is full."""
+
+    def __init__(self, sink: AnalyticsSink, queue_size: int = 16):
+        super().__init__(sink, queue_size, 'block', 'analytics-sink')
+
+
+class CsvSink(AnalyticsSink):
+    """Appends batches of records to a CSV file,
+    the header is written if the file is new or empty,
+    so a resumed run continues the file of the run it resumes."""
+
+    def __init__(self, path: str = 'output/analytics.csv'):
+        self.path = path
+        self._file = None
+        self._writer = None
+
+    def write(self, batch: Dict[str, np.ndarray]) -> None:
+        """Appends the records of the batch."""
+        if self._writer is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'a', newline='', encoding='utf-8')
+            self._writer = csv.writer(self._file)
+            if self._file.tell() == 0:
+                self._writer.writerow(batch)
+        self._writer.writerows(zip(*(column.tolist() for column in batch.values())))
+        self._file.flush()
+
+    def close(self) -> None:
+        """Closes the file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+
+class NpzSink(AnalyticsSink):
+    """Saves every batch of records as a NumPy archive of its columns,
+    archives are numbered in the directory, read_npz joins them back.
+    Numbering continues after the archives already in the directory,
+    so a resumed run does not overwrite the archives of the run it resumes."""
+
+    def __init__(self, directory: str = 'output/analytics'):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        numbers = [int(name[10:-4]) for name in os.listdir(directory)
+                   if name.startswith('analytics_') and name.endswith('.npz')
+                   and name[10:-4].isdigit()]
+        self.count = max(numbers, default=-1) + 1
+
+    def write(self, batch: Dict[str, np.ndarray]) -> None:
+        """Saves the batch."""
+        np.savez(os.path.join(self.directory, f'analytics_{self.count:06d}.npz'), **batch)
+        self.count += 1
+
+
+def read_npz(directory: str) -> Dict[str, np.ndarray]:
+    """Returns the columns of all batches saved by NpzSink into the directory."""
+    columns: Dict[str, List[np.ndarray]] = {}
+    names: Optional[List[str]] = None
+    for path in sorted(glob.glob(os.path.join(directory, 'analytics_*.npz'))):
+        with np.load(path) as archive:
+            names = names or list(archive.files)
+            for name in names:
+                columns.setdefault(name, []).append(archive[name])
+    return {name: np.concatenate(parts) for name, parts in columns.items()}
@@ -0,0 +1,86 @@
+"""The module contains the collection of map objects
+with stable integer ids and constant time removal."""
+from typing import Iterator, List
+
+
+class Arena:
+    """Collection of objects with stable integer ids.
+    Objects are kept densely, the id of a removed object
+    goes to the free list and is given to the next added one.
+    Removal moves the last object into the freed position,
+    so the order of objects is not preserved."""
+
+    def __init__(self):
+        self._items: List = []
+        self._positions: List[int] = []
+        self._free_ids: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __contains__(self, item) -> bool:
+        return 0 <= item.uid < len(self._positions) \
+            and self._positions[item.uid] >= 0 \
+            and self._items[self._positions[item.uid]] is item
+
+    @property
+    def free_ids(self) -> List[int]:
+        """Returns free ids, the last one is given out first."""
+        return list(self._free_ids)
+
+    def get(self, uid: int):
+        """Returns the object with the given id."""
+        return self._items[self._positions[uid]]
+
+    def append(self, item) -> None:
+        """Adds the object and gives it an id."""
+        if self._free_ids:
+            uid = self._free_ids.pop()
+            self._positions[uid] = len(self._items)
+        else:
+            uid = len(self._positions)
+            self._positions.append(len(self._items))
+        item.uid = uid
+        self._items.append(item)
+
+    def extend(self, items: List) -> None:
+        """Adds the objects in order, their ids are given like by append."""
+        position = len(self._items)
+        positions = self._positions
+        free_ids = self._free_ids
+        for item in items:
+            if free_ids:
+                uid = free_ids.pop()
+                positions[uid] = position
+            else:
+                uid = len(positions)
+                positions.append(position)
+            item.uid = uid
+            position += 1
+        self._items.extend(items)
+
+    def remove(self, item) -> None:
+        """Removes the object, its id becomes free."""
+        position = self._positions[item.uid]
+        last = self._items.pop()
+        if last is not item:
+            self._items[position] = last
+            self._positions[last.uid] = position
+        self._positions[item.uid] = -1
+        self._free_ids.append(item.uid)
+        item.uid = -1
+
+    def restore(self, items: List, free_ids: List[int]) -> None:
+        """Refills the arena with objects keeping their ids,
+        free ids are given out in the same order as before."""
+        self._items = list(items)
+        self._positions = [-1] * (len(items) + len(free_ids))
+        for position, item in enumerate(self._items):
+            self._positions[item.uid] = position
+        self._free_ids = list(free_ids)
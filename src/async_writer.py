@@ -0,0 +1,68 @@
+"""The module contains the background writer passing items
+to a destination from its own thread through a bounded queue,
+used by the frame and analytics sinks."""
+import logging
+import queue
+import threading
+
+
+class AsyncWriter:
+    """Passes items to the write method of the destination from a background thread
+    through a bounded queue, the destination is closed with the writer.
+    When the queue is full,
+    the overflow policy decides what happens:
+    'block' waits for free space,
+    'drop_newest' skips the new item,
+    'drop_oldest' discards the oldest queued item."""
+
+    overflow_policies = ('block', 'drop_newest', 'drop_oldest')
+
+    def __init__(self, destination, queue_size: int = 64, overflow: str = 'block',
+                 name: str = 'async-writer'):
+        if overflow not in self.overflow_policies:
+            logging.error('Unknown overflow policy')
+            raise ValueError('Unknown overflow policy')
+        self.destination = destination
+        self.overflow = overflow
+        self.name = name
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max(queue_size, 1))
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Writes queued items until the stop marker is received."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self.destination.write(item)
+            except Exception:  # pylint: disable=broad-except
+                logging.exception('Item of %s was not written', self.name)
+
+    def write(self, item) -> None:
+        """Queues the item according to the overflow policy."""
+        if self.overflow == 'block':
+            self._queue.put(item)
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if self.overflow == 'drop_newest':
+                self.dropped += 1
+                return
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            self._queue.put(item)
+
+    def close(self) -> None:
+        """Writes the remaining items and closes the destination."""
+        self._queue.put(None)
+        self._thread.join()
+        self.destination.close()
+        if self.dropped:
+            logging.warning('Items dropped by %s: %s', self.name, self.dropped)
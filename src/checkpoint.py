@@ -0,0 +1,320 @@
+"""The module contains saving of the whole world into checkpoints
+and restoring of worlds from them.
+A checkpoint is a directory with NumPy arrays of worms, genomes,
+food objects or the food field and weather objects, read back with memory mapping,
+and meta.json with the map, states of random sources and processors."""
+import configparser
+import json
+import logging
+import os
+import shutil
+import threading
+from operator import attrgetter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.active_characters import Worm, Food, Genetics
+from src.weather import Rain, Tornado
+from src.world import World
+
+FORMAT_VERSION = 4
+
+WORM_DTYPE = np.dtype([('uid', np.int64), ('cell_index', np.int64), ('slot', np.int64),
+                       ('x', np.int64), ('y', np.int64),
+                       ('name', np.int16),
+                       ('health', np.float64), ('damage', np.float64),
+                       ('defense', np.float64), ('initiative', np.int64),
+                       ('energy', np.float64), ('level', np.int64),
+                       ('experience', np.int64), ('poisoned', np.float64),
+                       ('divisions_limit', np.float64), ('generation', np.float64),
+                       ('age', np.float64),
+                       ('family', np.int64),
+                       ('energetic_genes_pool', np.int64), ('health_genes_pool', np.int64),
+                       ('damage_genes_pool', np.int64), ('defense_genes_pool', np.int64),
+                       ('energetic_boost', np.int64), ('health_boost', np.int64),
+                       ('damage_boost', np.int64), ('defense_boost', np.int64),
+                       ('genome', np.int64)])
+
+FOOD_DTYPE = np.dtype([('uid', np.int64), ('cell_index', np.int64),
+                       ('x', np.int64), ('y', np.int64),
+                       ('nutritional_value', np.float64)])
+
+WEATHER_DTYPE = np.dtype([('tornado', np.bool_),
+                          ('x', np.int64), ('y', np.int64),
+                          ('side', np.int64), ('duration', np.int64),
+                          ('charge', np.int64),
+                          ('direction_x', np.int64), ('direction_y', np.int64)])
+
+ARRAYS = ('worms', 'genomes', 'genome_offsets', 'food', 'weather',
+          'worms_free_ids', 'food_free_ids', 'free_slots', 'food_counts', 'food_nutrition')
+
+_STATS_END = 5 + len(Worm.state_fields)
+_GENETICS_END = _STATS_END + len(Genetics.state_fields)
+
+_worm_state = attrgetter(*Worm.state_fields)
+_genetics_state = attrgetter(*Genetics.state_fields)
+
+
+def worm_record(worm: Worm, genome: int) -> tuple:
+    """Returns the row of the worm in the worms array."""
+    return (worm.uid, worm.cell_index, getattr(worm, 'slot', -1)) + worm.coordinates \
+        + _worm_state(worm) + _genetics_state(worm.genetics) + (genome,)
+
+
+def food_records(world_object: World) -> np.ndarray:
+    """Returns the food objects of the world as the food array."""
+    return np.array([(food_unit.uid, food_unit.cell_index) + food_unit.coordinates
+                     + (food_unit.nutritional_value,)
+                     for food_unit in world_object.food], dtype=FOOD_DTYPE)
+
+
+def weather_records(world_object: World) -> np.ndarray:
+    """Returns rains and tornadoes of the world as the weather array."""
+    return np.array([(isinstance(weather_event, Tornado),)
+                     + (weather_event.get_state() + (0, 0, 0))[:7]
+                     for weather_event in world_object.rains + world_object.tornadoes],
+                    dtype=WEATHER_DTYPE)
+
+
+class Snapshot:
+    """Copy of the world state in arrays, ready to be written.
+    Taking a snapshot is the only part of saving
+    that has to stop the simulation."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict):
+        self.arrays = arrays
+        self.meta = meta
+
+    @classmethod
+    def take(cls, world_object: World,
+             processors: Sequence = ()) -> 'Snapshot':
+        """Copies the state of the world and of the processors.
+        Equal genomes are saved once."""
+        genome_indices: Dict[bytes, int] = {}
+        records = []
+        for worm in world_object.worms:
+            genome = worm.genetics.genome
+            index = genome_indices.get(genome)
+            if index is None:
+                index = genome_indices[genome] = len(genome_indices)
+            records.append(worm_record(worm, index))
+        worms = np.array(records, dtype=WORM_DTYPE)
+        genome_offsets = np.zeros(len(genome_indices) + 1, dtype=np.int64)
+        np.cumsum([len(genome) for genome in genome_indices], out=genome_offsets[1:])
+        genomes = np.frombuffer(b''.join(genome_indices), dtype=np.uint8)
+        food = food_records(world_object)
+        weather = weather_records(world_object)
+
+        population = world_object.population
+        food_field = world_object.food_field
+        version, internal_state, gauss_next = world_object.random.getstate()
+        meta = {'format': FORMAT_VERSION,
+                'tick': world_object.tick,
+                'births': world_object.births,
+                'deaths': world_object.deaths,
+                'height': world_object.height,
+                'width': world_object.width,
+                'columnar': population is not None,
+                'population_size': population.size if population is not None else 0,
+                'food_field': food_field is not None,
+                'seed': world_object.seed,
+                'random': [version, list(internal_state), gauss_next],
+                'rng': world_object.rng.bit_generator.state,
+                'processors': [{'name': proc.name, 'state': proc.state_dict()}
+                               for proc in processors]}
+        arrays = {'worms': worms,
+                  'genomes': genomes,
+                  'genome_offsets': genome_offsets,
+                  'food': food,
+                  'weather': weather,
+                  'worms_free_ids': np.array(world_object.worms.free_ids, dtype=np.int64),
+                  'food_free_ids': np.array(world_object.food.free_ids, dtype=np.int64),
+                  'free_slots': np.array(population.free_slots if population is not None else [],
+                                         dtype=np.int64),
+                  'food_counts': food_field.counts.copy() if food_field is not None
+                  else np.zeros(0, dtype=np.int32),
+                  'food_nutrition': food_field.nutrition.copy() if food_field is not None
+                  else np.zeros(0, dtype=np.float64)}
+        return cls(arrays, meta)
+
+    def write(self, path: str) -> None:
+        """Writes the snapshot into the directory.
+        Files are written into a temporary directory renamed at the end,
+        so the checkpoint at the path is always complete."""
+        temporary_path = path + '.tmp'
+        if os.path.exists(temporary_path):
+            shutil.rmtree(temporary_path)
+        os.makedirs(temporary_path)
+        for name, array in self.arrays.items():
+            np.save(os.path.join(temporary_path, name + '.npy'), array)
+        with open(os.path.join(temporary_path, 'meta.json'), 'w', encoding='utf-8') as writer:
+            json.dump(self.meta, writer)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(temporary_path, path)
+
+
+def save(world_object: World, path: str, processors: Sequence = ()) -> None:
+    """Saves the world and states of the processors into the directory."""
+    Snapshot.take(world_object, processors).write(path)
+
+
+def load(path: str, processors: Sequence = ()) -> World:
+    """Restores the world saved into the directory
+    and the states of the given processors, matched by their names.
+    The world continues exactly as it would without saving."""
+    arrays, meta = read(path)
+    return restore(arrays, meta, processors)
+
+
+def read(path: str) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """Returns the arrays, memory mapped, and the meta of the checkpoint."""
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as reader:
+        meta = json.load(reader)
+    if meta.get('format') != FORMAT_VERSION:
+        logging.error('Unknown checkpoint format')
+        raise ValueError('Unknown checkpoint format')
+    arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+              for name in ARRAYS}
+    return arrays, meta
+
+
+def restore(arrays: Dict[str, np.ndarray], meta: Dict, processors: Sequence = ()) -> World:
+    """Creates the world from the arrays and meta of a checkpoint
+    and restores the states of the given processors."""
+    world_object = World(meta['height'], meta['width'], 0, 0, meta['columnar'], meta['seed'],
+                         meta['food_field'])
+    world_object.tick = meta['tick']
+    world_object.births, world_object.deaths = meta['births'], meta['deaths']
+    _restore_worms(world_object, arrays['worms'], arrays['genomes'],
+                   arrays['genome_offsets'], arrays['worms_free_ids'].tolist())
+    if world_object.population is not None:
+        world_object.population.restore_slots(arrays['worms']['slot'].tolist(),
+                                              meta['population_size'],
+                                              arrays['free_slots'].tolist())
+    _restore_food(world_object, arrays['food'], arrays['food_free_ids'].tolist())
+    if world_object.food_field is not None:
+        world_object.food_field.counts[:] = arrays['food_counts']
+        world_object.food_field.nutrition[:] = arrays['food_nutrition']
+    for record in arrays['weather'].tolist():
+        if record[0]:
+            world_object.tornadoes.append(
+                Tornado.from_state(record[1:], world_object.width, world_object.height))
+        else:
+            world_object.rains.append(
+                Rain.from_state(record[1:], world_object.width, world_object.height))
+
+    version, internal_state, gauss_next = meta['random']
+    world_object.random.setstate((version, tuple(internal_state), gauss_next))
+    world_object.rng.bit_generator.state = meta['rng']
+
+    states: Dict[str, List[Dict]] = {}
+    for saved in meta['processors']:
+        states.setdefault(saved['name'], []).append(saved['state'])
+    for proc in processors:
+        if states.get(proc.name):
+            proc.load_state_dict(states[proc.name].pop(0))
+    return world_object
+
+
+def _restore_worms(world_object: World, records: np.ndarray, genomes: np.ndarray,
+                   offsets: np.ndarray, free_ids: List[int]) -> None:
+    """Recreates worms with their ids, genomes and order in the cells."""
+    genome_codes = genomes.tobytes()
+    bounds = offsets.tolist()
+    genome_list = [genome_codes[begin:end] for begin, end in zip(bounds, bounds[1:])]
+    worms: List[Worm] = []
+    for record in records.tolist():
+        worm = world_object.create_worm((record[3], record[4]))
+        worm.uid, worm.cell_index = record[0], record[1]
+        worm.set_state(record[5:_STATS_END])
+        for field, value in zip(Genetics.state_fields, record[_STATS_END:_GENETICS_END]):
+            setattr(worm.genetics, field, value)
+        worm.genetics.genome = genome_list[record[-1]]
+        worms.append(worm)
+    world_object.worms.restore(worms, free_ids)
+    for worm in sorted(worms, key=lambda item: item.cell_index):
+        world_object.grid.add_worm(world_object.grid.cell_id(worm.coordinates), worm)
+
+
+def _restore_food(world_object: World, records: np.ndarray, free_ids: List[int]) -> None:
+    """Recreates food objects with their ids and order in the cells."""
+    food: List[Food] = []
+    for uid, cell_index, x, y, nutritional_value in records.tolist():
+        food_unit = Food((x, y), nutritional_value)
+        food_unit.uid, food_unit.cell_index = uid, cell_index
+        food.append(food_unit)
+    world_object.food.restore(food, free_ids)
+    for food_unit in sorted(food, key=lambda item: item.cell_index):
+        world_object.grid.add_food(world_object.grid.cell_id(food_unit.coordinates), food_unit)
+
+
+def latest(directory: str) -> Optional[str]:
+    """Returns the path of the newest complete checkpoint in the directory."""
+    if not os.path.isdir(directory):
+        return None
+    checkpoints = [name for name in os.listdir(directory)
+                   if name.startswith('tick_') and name[5:].isdigit()]
+    if not checkpoints:
+        return None
+    return os.path.join(directory, max(checkpoints, key=lambda name: int(name[5:])))
+
+
+class Checkpointer:
+    """Periodically saves the world into directory/tick_N.
+    The snapshot is taken between ticks, the files are written
+    from a background thread while the simulation goes on.
+    Only the newest keep checkpoints are left in the directory."""
+
+    def __init__(self, directory: str = 'checkpoints', interval: int = 0, keep: int = 3):
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self._writer: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> 'Checkpointer':
+        """Creates the checkpointer with settings from the CHECKPOINT section."""
+        section = 'CHECKPOINT'
+        return cls(config.get(section, 'directory', fallback='checkpoints'),
+                   config.getint(section, 'interval', fallback=0),
+                   config.getint(section, 'keep', fallback=3))
+
+    def after_tick(self, world_object: World, processors: Sequence) -> None:
+        """Saves the world if the tick is a multiple of the interval."""
+        if self.interval and world_object.tick % self.interval == 0:
+            self.save(world_object, processors)
+
+    def save(self, world_object: World, processors: Sequence) -> None:
+        """Takes the snapshot and starts writing it.
+        Waits for the previous checkpoint if it is still being written."""
+        snapshot = Snapshot.take(world_object, processors)
+        self.wait()
+        path = os.path.join(self.directory, f'tick_{world_object.tick}')
+        self._writer = threading.Thread(target=self._write, args=(snapshot, path), daemon=True)
+        self._writer.start()
+
+    def _write(self, snapshot: Snapshot, path: str) -> None:
+        """Writes the snapshot and removes old checkpoints."""
+        try:
+            snapshot.write(path)
+        except OSError:
+            logging.exception('Checkpoint %s is not saved', path)
+            return
+        logging.info('Checkpoint saved to %s', path)
+        checkpoints = sorted((name for name in os.listdir(self.directory)
+                              if name.startswith('tick_') and name[5:].isdigit()),
+                             key=lambda name: int(name[5:]))
+        for name in checkpoints[:-self.keep] if self.keep > 0 else []:
+            shutil.rmtree(os.path.join(self.directory, name))
+
+    def wait(self) -> None:
+        """Waits until the last checkpoint is written."""
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+
+    def close(self) -> None:
+        """Finishes writing when the simulation stops."""
+        self.wait()
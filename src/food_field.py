@@ -0,0 +1,94 @@
+"""The module contains the food field keeping food of the map
+as arrays of cells instead of food objects."""
+from typing import Tuple
+
+import numpy as np
+
+from src.active_characters import Food
+from src.grid import Grid
+from resources.common_types import tornado_scatter_values
+
+
+class FoodField:
+    """Numbers of food units and their total nutritional value in every cell.
+    Units of a cell are not told apart: every unit of the cell
+    has the mean nutritional value of the cell.
+    The numbers of units are the food counters of the grid,
+    so the memory taken by food depends only on the size of the map."""
+
+    def __init__(self, grid: Grid):
+        self.grid = grid
+        self.counts = grid.food_counts
+        self.nutrition = np.zeros(grid.height * grid.width, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return int(self.counts.sum())
+
+    def sow(self, cell_ids: np.ndarray, nutritional_values: np.ndarray) -> None:
+        """Adds food units with the nutritional values into the cells,
+        one unit for every cell id."""
+        self.add(cell_ids, 1, nutritional_values)
+
+    def add(self, cell_ids: np.ndarray, counts, nutrition) -> None:
+        """Adds the numbers of units with their total nutritional value into the cells."""
+        np.add.at(self.counts, cell_ids, counts)
+        np.add.at(self.nutrition, cell_ids, nutrition)
+
+    def unit_at(self, cell_id: int) -> Food:
+        """Returns a food object with the nutritional value of one unit in the cell,
+        the unit is removed from the field by remove_unit after it is eaten."""
+        count = self.counts[cell_id]
+        return Food((cell_id % self.grid.width, cell_id // self.grid.width),
+                    float(self.nutrition[cell_id] / count) if count > 0 else 0.0)
+
+    def remove_unit(self, cell_id: int, nutritional_value: float) -> None:
+        """Removes one unit with the nutritional value from the cell."""
+        self.counts[cell_id] -= 1
+        self.nutrition[cell_id] = self.nutrition[cell_id] - nutritional_value \
+            if self.counts[cell_id] > 0 else 0
+
+    def take(self, cell_id: int) -> Tuple[int, float]:
+        """Empties the cell, returns the number of units and their nutritional value."""
+        taken = int(self.counts[cell_id]), float(self.nutrition[cell_id])
+        self.counts[cell_id] = 0
+        self.nutrition[cell_id] = 0
+        return taken
+
+    def coordinates(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns arrays of x and y coordinates of the cells with food."""
+        cells = np.flatnonzero(self.counts)
+        return cells % self.grid.width, cells // self.grid.width
+
+    def rain(self, coverage: np.ndarray, nutrition_penalty: float) -> None:
+        """Every unit loses the penalty for every rain covering its cell."""
+        self.nutrition -= nutrition_penalty * coverage.ravel() * self.counts
+
+    def remove_eaten(self) -> None:
+        """Empties the cells where the units have lost their nutritional value."""
+        eaten = (self.counts > 0) & (self.nutrition <= 0)
+        self.counts[eaten] = 0
+        self.nutrition[eaten] = 0
+
+    def scatter(self, rectangle: tuple, rng: np.random.Generator) -> None:
+        """Scatters units of the rectangle (x_begin, y_begin, x_end, y_end)
+        like the tornado: units of every cell are split at random
+        between the four scatter steps and the parts are shifted by them,
+        units stop at the borders of the map."""
+        x_begin, y_begin, x_end, y_end = rectangle
+        height, width = self.grid.height, self.grid.width
+        counts = self.counts.reshape(height, width)[y_begin:y_end, x_begin:x_end]
+        nutrition = self.nutrition.reshape(height, width)[y_begin:y_end, x_begin:x_end]
+        if not counts.any():
+            return
+        parts = rng.multinomial(counts, [1 / len(tornado_scatter_values)]
+                                * len(tornado_scatter_values))
+        unit_values = np.divide(nutrition, counts, out=np.zeros_like(nutrition),
+                                where=counts > 0)
+        counts[:] = 0
+        nutrition[:] = 0
+        ys, xs = np.mgrid[y_begin:y_end, x_begin:x_end]
+        for index, (step_x, step_y) in enumerate(tornado_scatter_values):
+            cell_ids = np.clip(ys + step_y, 0, height - 1) * width \
+                + np.clip(xs + step_x, 0, width - 1)
+            self.add(cell_ids.ravel(), parts[..., index].ravel(),
+                     (parts[..., index] * unit_values).ravel())
@@ -0,0 +1,94 @@
+"""The module contains destinations of visualized frames:
+display window, PNG files, video file
+and a background writer for any of them."""
+import os
+
+import cv2
+import numpy as np
+
+from src.async_writer import AsyncWriter
+
+
+class FrameSink:
+    """Base class of frame destinations."""
+
+    def write(self, frame: np.ndarray) -> None:
+        """Base method of frame destinations."""
+
+    def close(self) -> None:
+        """Releases resources of the destination."""
+
+
+class DisplaySink(FrameSink):
+    """Shows frames in a window, must be used from the main thread."""
+
+    def __init__(self, window_name: str = 'vis'):
+        self.window_name = window_name
+
+    def write(self, frame: np.ndarray) -> None:
+        """Shows the frame."""
+        cv2.imshow(self.window_name, frame)
+        cv2.waitKey(1)
+
+    def close(self) -> None:
+        """Closes the window."""
+        cv2.destroyWindow(self.window_name)
+
+
+class PngSink(FrameSink):
+    """Saves every frame to a numbered PNG file."""
+
+    def __init__(self, directory: str = 'output'):
+        self.directory = directory
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, frame: np.ndarray) -> None:
+        """Saves the frame."""
+        cv2.imwrite(os.path.join(self.directory, f'vis_{self.count}.png'), frame)
+        self.count += 1
+
+
+class VideoSink(FrameSink):
+    """Encodes frames into a single video file."""
+
+    def __init__(self, path: str = 'output/worms.mp4', fps: float = 30, fourcc: str = 'mp4v'):
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc
+        self._writer = None
+
+    def write(self, frame: np.ndarray) -> None:
+        """Appends the frame to the video, the video size is taken from the first frame."""
+        if self._writer is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            height, width = frame.shape[:2]
+            self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc),
+                                           self.fps, (width, height))
+        self._writer.write(frame)
+
+    def close(self) -> None:
+        """Finishes the video file."""
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+
+class AsyncSink(AsyncWriter, FrameSink):
+    """Passes frames to another sink from a background thread
+    through a bounded queue with the overflow policy of AsyncWriter."""
+
+    def __init__(self, sink: FrameSink, queue_size: int = 64, overflow: str = 'block'):
+        super().__init__(sink, queue_size, overflow, 'frame-sink')
+
+    @property
+    def sink(self) -> FrameSink:
+        """Returns the wrapped sink."""
+        return self.destination
+
+    @property
+    def dropped_frames(self) -> int:
+        """Returns the number of frames dropped on overflow."""
+        return self.dropped
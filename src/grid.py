@@ -0,0 +1,119 @@
+"""The module contains the spatial index of the map
+with flat cell ids and dense occupancy counters."""
+from typing import Dict, List
+
+import numpy as np
+
+
+class Grid:
+    """Index of objects located at the cells of the map.
+    A cell (x, y) has the flat id y * width + x,
+    the numbers of worms and food objects in the cells
+    are kept in dense arrays, the objects themselves
+    are kept only for the occupied cells.
+    Every object remembers its position in the cell list
+    in cell_index, so it leaves the cell in constant time."""
+
+    def __init__(self, height: int, width: int):
+        self.height = height
+        self.width = width
+        self.worm_counts = np.zeros(height * width, dtype=np.int32)
+        self.food_counts = np.zeros(height * width, dtype=np.int32)
+        self._worms: Dict[int, List] = {}
+        self._food: Dict[int, List] = {}
+
+    def contains(self, pos: tuple) -> bool:
+        """True if the coordinates are inside the map."""
+        return 0 <= pos[0] < self.width and 0 <= pos[1] < self.height
+
+    def cell_id(self, pos: tuple) -> int:
+        """Returns the flat id of the cell."""
+        return pos[1] * self.width + pos[0]
+
+    def worms_in(self, cell_id: int) -> List:
+        """Returns list of worms located in the cell."""
+        return self._worms.get(cell_id, [])
+
+    def food_in(self, cell_id: int) -> List:
+        """Returns list of food objects located in the cell."""
+        return self._food.get(cell_id, [])
+
+    def has_food(self, cell_id: int) -> bool:
+        """True if in the cell located food."""
+        return self.food_counts[cell_id] > 0
+
+    def add_worm(self, cell_id: int, worm) -> None:
+        """Puts the worm into the cell."""
+        self._add(self._worms, cell_id, worm)
+        self.worm_counts[cell_id] += 1
+
+    def add_worms(self, cell_ids: np.ndarray, worms: List) -> None:
+        """Puts the worms into the cells with the given ids."""
+        buckets = self._worms
+        for cell_id, worm in zip(cell_ids.tolist(), worms):
+            bucket = buckets.setdefault(cell_id, [])
+            worm.cell_index = len(bucket)
+            bucket.append(worm)
+        np.add.at(self.worm_counts, cell_ids, 1)
+
+    def remove_worm(self, cell_id: int, worm) -> None:
+        """Takes the worm out of the cell."""
+        self._remove(self._worms, cell_id, worm)
+        self.worm_counts[cell_id] -= 1
+
+    def add_food(self, cell_id: int, food_unit) -> None:
+        """Puts the food object into the cell."""
+        self._add(self._food, cell_id, food_unit)
+        self.food_counts[cell_id] += 1
+
+    def remove_food(self, cell_id: int, food_unit) -> None:
+        """Takes the food object out of the cell."""
+        self._remove(self._food, cell_id, food_unit)
+        self.food_counts[cell_id] -= 1
+
+    def take_all(self, cell_id: int) -> tuple:
+        """Empties the cell, returns lists of worms and food located there."""
+        worms = self._worms.pop(cell_id, [])
+        food = self._food.pop(cell_id, [])
+        self.worm_counts[cell_id] = 0
+        self.food_counts[cell_id] = 0
+        return worms, food
+
+    def take_rectangle(self, rectangle: tuple, with_food: bool = True) -> tuple:
+        """Empties all cells of the rectangle (x_begin, y_begin, x_end, y_end),
+        returns lists of worms and food located there.
+        Food is left in the cells if with_food is not set."""
+        x_begin, y_begin, x_end, y_end = rectangle
+        worms: List = []
+        food: List = []
+        for y in range(y_begin, y_end):
+            row_begin = y * self.width
+            for cell_id in range(row_begin + x_begin, row_begin + x_end):
+                if cell_id in self._worms:
+                    worms.extend(self._worms.pop(cell_id))
+                if with_food and cell_id in self._food:
+                    food.extend(self._food.pop(cell_id))
+            self.worm_counts[row_begin + x_begin:row_begin + x_end] = 0
+            if with_food:
+                self.food_counts[row_begin + x_begin:row_begin + x_end] = 0
+        return worms, food
+
+    @staticmethod
+    def _add(buckets: Dict[int, List], cell_id: int, item) -> None:
+        """Appends the object to the bucket."""
+        bucket = buckets.setdefault(cell_id, [])
+        item.cell_index = len(bucket)
+        bucket.append(item)
+
+    @staticmethod
+    def _remove(buckets: Dict[int, List], cell_id: int, item) -> None:
+        """Removes the object from the bucket putting the last object
+        in its place, empty buckets are dropped."""
+        bucket = buckets[cell_id]
+        last = bucket.pop()
+        if last is not item:
+            bucket[item.cell_index] = last
+            last.cell_index = item.cell_index
+        item.cell_index = -1
+        if not bucket:
+            del buckets[cell_id]
@@ -0,0 +1,94 @@
+"""The module contains measuring of processors:
+wall time of every processor per tick and counters of world events."""
+import configparser
+import json
+import logging
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Optional, Sequence
+
+import numpy as np
+
+
+class Instrumentation:
+    """Collects wall time of processors and counters of events
+    (moves, strikes, births, deaths, eaten food, weather cells).
+    The latest timings of every processor are kept in a rolling window.
+    When disabled, processors run without measuring
+    and counters are not changed."""
+
+    def __init__(self, enabled: bool = False, window: int = 1000,
+                 dump_interval: int = 0, dump_path: Optional[str] = None):
+        self.enabled = enabled
+        self.window = window
+        self.dump_interval = dump_interval
+        self.dump_path = dump_path
+        self.tick: int = 0
+        self.counters: Counter = Counter()
+        self.tick_counters: Counter = Counter()
+        self._timings: Dict[str, Deque[float]] = {}
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> 'Instrumentation':
+        """Creates the instrumentation with settings from the INSTRUMENTATION section."""
+        section = 'INSTRUMENTATION'
+        return cls(config.getboolean(section, 'enabled', fallback=False),
+                   config.getint(section, 'window', fallback=1000),
+                   config.getint(section, 'dump_interval', fallback=0),
+                   config.get(section, 'dump_path', fallback='') or None)
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Increases the counter of events."""
+        if self.enabled:
+            self.tick_counters[name] += value
+
+    def run_tick(self, world_object, processors: Sequence) -> None:
+        """Runs all processors once, measuring each of them."""
+        world_object.start_tick()
+        if not self.enabled:
+            for proc in processors:
+                proc.process(world_object)
+            world_object.tick += 1
+            return
+
+        self.tick_counters = Counter()
+        for proc in processors:
+            start = time.perf_counter()
+            proc.process(world_object)
+            elapsed = time.perf_counter() - start
+            timings = self._timings.get(proc.name)
+            if timings is None:
+                timings = self._timings[proc.name] = deque(maxlen=self.window)
+            timings.append(elapsed)
+        self.counters.update(self.tick_counters)
+        self.tick += 1
+        world_object.tick += 1
+
+        if self.dump_interval and self.tick % self.dump_interval == 0:
+            self.dump()
+
+    def percentiles(self, name: str,
+                    quantiles: Sequence[float] = (50, 90, 99)) -> Dict[str, float]:
+        """Returns percentiles of wall time of the processor in seconds
+        over the rolling window."""
+        timings = self._timings.get(name)
+        if not timings:
+            return {}
+        values = np.percentile(np.fromiter(timings, dtype=np.float64), quantiles)
+        return {f'p{quantile:g}': float(value) for quantile, value in zip(quantiles, values)}
+
+    def summary(self) -> Dict:
+        """Returns percentiles of all processors and counters of events."""
+        return {'tick': self.tick,
+                'processors': {name: self.percentiles(name) for name in self._timings},
+                'counters': dict(self.counters),
+                'tick_counters': dict(self.tick_counters)}
+
+    def dump(self) -> None:
+        """Writes the summary as a JSON line to the dump file or to the log."""
+        line = json.dumps(self.summary())
+        if self.dump_path is None:
+            logging.info('Instrumentation: %s', line)
+            return
+        with open(self.dump_path, 'a', encoding='utf-8') as writer:
+            writer.write(line + '\n')
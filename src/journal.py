@@ -0,0 +1,55 @@
+"""The module contains the journal of changes of the map
+noted by the world and the processors while they make them."""
+from typing import List, Tuple
+
+
+class Journal:
+    """Changes of the map made since the journal was cleared:
+    worms and food objects added and removed, in their order,
+    moved worms and food objects moved or changed.
+    Added objects are kept with the ids given to them,
+    removals with the number of objects added before them,
+    so the changes of the ids can be repeated in the same order.
+    The world notes the changes only while it has a journal."""
+
+    def __init__(self):
+        self.worms_added: List[Tuple[int, object]] = []
+        self.worms_removed: List[Tuple[int, int]] = []
+        self.worms_moved: List = []
+        self.food_added: List[Tuple[int, object]] = []
+        self.food_removed: List[Tuple[int, int]] = []
+        self.food_changed: List = []
+
+    def add_worms(self, worms: List) -> None:
+        """Notes the worms placed on the map."""
+        self.worms_added.extend((worm.uid, worm) for worm in worms)
+
+    def remove_worm(self, worm) -> None:
+        """Notes the worm removed from the map, called before its id is freed."""
+        self.worms_removed.append((worm.uid, len(self.worms_added)))
+
+    def move_worm(self, worm) -> None:
+        """Notes the worm which may have changed its coordinates."""
+        self.worms_moved.append(worm)
+
+    def move_worms(self, worms: List) -> None:
+        """Notes the worms which may have changed their coordinates."""
+        self.worms_moved.extend(worms)
+
+    def add_food(self, food_unit) -> None:
+        """Notes the food object placed on the map."""
+        self.food_added.append((food_unit.uid, food_unit))
+
+    def remove_food(self, food_unit) -> None:
+        """Notes the food object removed from the map, called before its id is freed."""
+        self.food_removed.append((food_unit.uid, len(self.food_added)))
+
+    def change_food(self, food: List) -> None:
+        """Notes the food objects moved or with changed nutritional value."""
+        self.food_changed.extend(food)
+
+    def clear(self) -> None:
+        """Forgets the noted changes."""
+        for changes in (self.worms_added, self.worms_removed, self.worms_moved,
+                        self.food_added, self.food_removed, self.food_changed):
+            changes.clear()
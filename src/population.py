@@ -0,0 +1,217 @@
+"""The module contains the columnar population store
+keeping characteristics of worms in NumPy arrays
+and the worm class working as a view into the store."""
+import random
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.active_characters import BaseWorm, Genetics
+
+COLUMNS = {'health': np.float64,
+           'damage': np.float64,
+           'defense': np.float64,
+           'initiative': np.int64,
+           'energy': np.float64,
+           'level': np.int64,
+           'experience': np.int64,
+           'poisoned': np.float64,
+           'divisions_limit': np.float64,
+           'generation': np.float64,
+           'age': np.float64,
+           'x': np.int64,
+           'y': np.int64}
+
+
+class Population:
+    """Structure of arrays with characteristics of worms.
+    Every worm occupies one slot, freed slots are reused."""
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity: int = max(capacity, 1)
+        self.size: int = 0
+        self.active = np.zeros(self.capacity, dtype=bool)
+        self.owners: List[Optional[BaseWorm]] = [None] * self.capacity
+        self._free_slots: List[int] = []
+        for name, dtype in COLUMNS.items():
+            setattr(self, name, np.zeros(self.capacity, dtype=dtype))
+
+    def __len__(self) -> int:
+        return self.size - len(self._free_slots)
+
+    def _grow(self, min_capacity: int = 0) -> None:
+        """Doubles the capacity of all columns
+        or grows them to the minimal capacity if it is larger."""
+        new_capacity = max(self.capacity * 2, min_capacity)
+        for name in list(COLUMNS) + ['active']:
+            column = getattr(self, name)
+            grown = np.zeros(new_capacity, dtype=column.dtype)
+            grown[:self.capacity] = column
+            setattr(self, name, grown)
+        self.owners.extend([None] * (new_capacity - self.capacity))
+        self.capacity = new_capacity
+
+    def allocate(self, owner: BaseWorm) -> int:
+        """Reserves a slot for the worm and returns its index."""
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            slot = self.size
+            self.size += 1
+        self.active[slot] = True
+        self.owners[slot] = owner
+        return slot
+
+    def allocate_many(self, owners: List[BaseWorm]) -> List[int]:
+        """Reserves slots for the worms at once and returns their indices.
+        Freed slots are reused first in the same order as by allocate,
+        the columns grow at most once."""
+        reused = min(len(owners), len(self._free_slots))
+        slots = self._free_slots[len(self._free_slots) - reused:][::-1]
+        del self._free_slots[len(self._free_slots) - reused:]
+        added = len(owners) - reused
+        if self.size + added > self.capacity:
+            self._grow(self.size + added)
+        slots.extend(range(self.size, self.size + added))
+        self.size += added
+        self.active[slots] = True
+        for slot, owner in zip(slots, owners):
+            self.owners[slot] = owner
+        return slots
+
+    def release(self, slot: int) -> None:
+        """Frees the slot of a removed worm."""
+        self.active[slot] = False
+        self.owners[slot] = None
+        self._free_slots.append(slot)
+
+    @property
+    def free_slots(self) -> List[int]:
+        """Returns free slots, the last one is reused first."""
+        return list(self._free_slots)
+
+    def restore_slots(self, slots: List[int], size: int, free_slots: List[int]) -> None:
+        """Moves worms from the first slots, in the order of allocation,
+        into the given slots and restores the free list.
+        Used when a saved world is loaded."""
+        count = len(slots)
+        while self.capacity < size:
+            self._grow()
+        order = np.asarray(slots, dtype=np.int64)
+        for name in COLUMNS:
+            column = getattr(self, name)
+            values = column[:count].copy()
+            column[:max(count, size)] = 0
+            column[order] = values
+        owners = self.owners[:count]
+        self.owners = [None] * self.capacity
+        for slot, owner in zip(slots, owners):
+            self.owners[slot] = owner
+            owner.slot = slot
+        self.active[:] = False
+        self.active[order] = True
+        self.size = size
+        self._free_slots = list(free_slots)
+
+    def active_slots(self) -> np.ndarray:
+        """Returns indices of all occupied slots."""
+        return np.flatnonzero(self.active[:self.size])
+
+    def mask(self) -> np.ndarray:
+        """Returns a boolean mask of occupied slots
+        trimmed to the used part of the columns."""
+        return self.active[:self.size]
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns the used part of a column."""
+        return getattr(self, name)[:self.size]
+
+
+class _Column:
+    """Descriptor redirecting an attribute of the worm
+    to its slot in a column of the population store."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, worm, owner=None):
+        if worm is None:
+            return self
+        return getattr(worm.store, self.name)[worm.slot].item()
+
+    def __set__(self, worm, value) -> None:
+        getattr(worm.store, self.name)[worm.slot] = value
+
+
+class _Coordinates:
+    """Descriptor redirecting coordinates of the worm
+    to the x and y columns of the population store."""
+
+    def __get__(self, worm, owner=None):
+        if worm is None:
+            return self
+        return worm.store.x[worm.slot].item(), worm.store.y[worm.slot].item()
+
+    def __set__(self, worm, value: tuple) -> None:
+        worm.store.x[worm.slot] = value[0]
+        worm.store.y[worm.slot] = value[1]
+
+
+class ColumnarWorm(BaseWorm):
+    """Worm keeping its coordinates and characteristics in the population store,
+    the worm itself holds only its slot and the attributes of BaseWorm."""
+
+    __slots__ = ('store', 'slot')
+
+    _health = _Column('health')
+    _damage = _Column('damage')
+    _defense = _Column('defense')
+    _initiative = _Column('initiative')
+    _energy = _Column('energy')
+    _level = _Column('level')
+    _experience = _Column('experience')
+    _poisoned = _Column('poisoned')
+    _divisions_limit = _Column('divisions_limit')
+    _generation = _Column('generation')
+    _age = _Column('age')
+    coordinates = _Coordinates()
+
+    def __init__(self, coordinates: tuple, store: Population, rng=random):
+        self.store = store
+        self.slot = store.allocate(self)
+        super().__init__(coordinates, rng)
+
+    def __getstate__(self) -> dict:
+        """Returns the attributes kept by the worm itself for copying and pickling,
+        characteristics and coordinates are copied with the columns of the store."""
+        return {'store': self.store, 'slot': self.slot,
+                'uid': self.uid, 'cell_index': self.cell_index,
+                '_name_index': self._name_index, 'genetics': self.genetics}
+
+    def __setstate__(self, state: dict) -> None:
+        """Restores the attributes returned by __getstate__."""
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    @classmethod
+    def spawn(cls, store: Population, columns: Dict[str, np.ndarray],
+              name_indices: List[int], genetics: List[Genetics]) -> List['ColumnarWorm']:
+        """Creates worms in one batch without random draws.
+        Slots are reserved at once and the characteristics, coordinates included,
+        are written into the columns of the store at once, missing columns are zeros."""
+        worms: List[ColumnarWorm] = []
+        for name_index, worm_genetics in zip(name_indices, genetics):
+            worm = cls.__new__(cls)
+            worm.store = store
+            worm.uid, worm.cell_index = -1, -1
+            worm._name_index = name_index
+            worm.genetics = worm_genetics
+            worms.append(worm)
+        slots = store.allocate_many(worms)
+        for worm, slot in zip(worms, slots):
+            worm.slot = slot
+        for name in COLUMNS:
+            getattr(store, name)[slots] = columns.get(name, 0)
+        return worms
@@ -1,71 +1,152 @@
 """The module contains all world's processors
 changing states of the world."""
-import cv2
+import configparser
 import logging
-import random
+import os
+from operator import attrgetter
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 import numpy as np
 
-from resources.common_types import Colors
+from resources.common_types import Colors, NEIGHBOURS_VALUES
+from src.active_characters import genes_variations, intern_genome
+from src.analytics_sinks import AnalyticsSink, AsyncAnalyticsSink, CsvSink, NpzSink
 from src.world import World
-from src.active_characters import Food, Worm
+from src.weather import Rain
+from src.frame_sinks import FrameSink, DisplaySink, PngSink, VideoSink, AsyncSink
 
 
 class WorldProcessor:
-    """Base class of processors."""
+    """Base class of processors.
+    Processors with per_worm set change every worm independently
+    of other worms in process_worm and can be fused into one pass,
+    uses_random marks the ones drawing random values for worms.
+    Attributes listed in state_attributes are saved in checkpoints."""
+
+    per_worm = False
+    uses_random = False
+    state_attributes: Tuple[str, ...] = ()
 
     def __init__(self):
         pass
 
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> 'WorldProcessor':
+        """Creates the processor with settings from the config."""
+        return cls()
+
+    @property
+    def name(self) -> str:
+        """Name of the processor in measurements."""
+        return type(self).__name__
+
+    def state_dict(self) -> Dict:
+        """Returns the internal state of the processor kept in checkpoints."""
+        return {attribute: getattr(self, attribute) for attribute in self.state_attributes}
+
+    def load_state_dict(self, state: Dict) -> None:
+        """Restores the internal state returned by state_dict."""
+        for attribute in self.state_attributes:
+            if attribute in state:
+                setattr(self, attribute, state[attribute])
+
     def process(self, world_object: World) -> None:
         """Base method of processors."""
 
+    def start_pass(self, world_object: World) -> None:
+        """Prepares the pass over all worms of per-worm processors."""
+
+    def process_worm(self, worm, world_object: World) -> None:
+        """Changes one worm, used by per-worm processors."""
+
+    def finish_pass(self, world_object: World) -> None:
+        """Completes the pass over all worms of per-worm processors."""
+
+    def close(self) -> None:
+        """Releases resources of the processor when the simulation stops."""
+
 
 class Visualizer(WorldProcessor):
     """Visualizing processor."""
 
-    def __init__(self, save_visualizations: bool = False):
+    palette = np.array([Colors.WHITE.value, Colors.BLUE.value,
+                        Colors.GREEN.value, Colors.YELLOW.value], dtype='uint8')
+    scale = 4
+
+    def __init__(self, save_visualizations: bool = False,
+                 sinks: Optional[List[FrameSink]] = None):
         super(Visualizer, self).__init__()
         self.save_visualizations = save_visualizations
-        self.count = 0
-
-    def process(self, world_object: World) -> None:
-        """Visualize the map of world with objects
-        from Worm and Weather modules."""
+        if sinks is None:
+            sinks = [DisplaySink()]
+            if save_visualizations:
+                sinks.append(PngSink('output'))
+        self.sinks = sinks
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> 'Visualizer':
+        """Creates the visualizer with frame sinks from the VISUALIZER section.
+        Files are written from a background thread,
+        the window is shown only if display is on."""
+        section = 'VISUALIZER'
+        sinks: List[FrameSink] = []
+        if config.getboolean(section, 'display', fallback=True):
+            sinks.append(DisplaySink())
+
+        output = config.get(section, 'output', fallback='none')
+        if output == 'png':
+            file_sink: Optional[FrameSink] = PngSink(config.get(section, 'path', fallback='output'))
+        elif output == 'video':
+            file_sink = VideoSink(os.path.join(config.get(section, 'path', fallback='output'),
+                                               'worms.mp4'),
+                                  config.getfloat(section, 'fps', fallback=30))
+        elif output == 'none':
+            file_sink = None
+        else:
+            logging.error('Unknown visualizer output')
+            raise ValueError('Unknown visualizer output')
+
+        if file_sink is not None:
+            sinks.append(AsyncSink(file_sink,
+                                   config.getint(section, 'queue_size', fallback=64),
+                                   config.get(section, 'overflow', fallback='block')))
+        return cls(sinks=sinks)
+
+    def compose_frame(self, world_object: World) -> np.ndarray:
+        """Draws the map of world with objects
+        from Worm and Weather modules into an upscaled image."""
         vis = np.zeros((world_object.height, world_object.width, 3), dtype='uint8')
-        worm_color = [Colors.WHITE, Colors.BLUE, Colors.GREEN, Colors.YELLOW]
-        for rain in world_object.rains:
-            for coordinate in rain.all_coordinates:
-                vis[coordinate[1],
-                    coordinate[0]] \
-                    = Colors.SKY_BLUE.value
-        for tornado in world_object.tornadoes:
-            for coordinate in tornado.all_coordinates:
-                vis[coordinate[1],
-                    coordinate[0]] \
-                    = Colors.GREY.value
-        for worm in world_object.worms:
-            if worm.get_generation() < 4:
-                vis[worm.coordinates[1],
-                    worm.coordinates[0]] \
-                    = worm_color[int(worm.get_generation())].value
-            else:
-                vis[worm.coordinates[1],
-                    worm.coordinates[0]] = Colors.WHITE.value
+        for weather_events, color in ((world_object.rains, Colors.SKY_BLUE),
+                                      (world_object.tornadoes, Colors.GREY)):
+            for weather_event in weather_events:
+                x_begin, y_begin, x_end, y_end = weather_event.rectangle
+                vis[y_begin:y_end, x_begin:x_end] = color.value
+
+        worms_x, worms_y = world_object.worm_coordinates()
+        generations = world_object.worm_generations()
+        palette_index = np.where(generations < len(self.palette), generations, 0).astype(np.intp)
+        vis[worms_y, worms_x] = self.palette[palette_index]
 
-        for food_unit in world_object.food:
-            vis[food_unit.coordinates[1],
-                food_unit.coordinates[0]] \
-                = Colors.FOOD.value
+        food_x, food_y = world_object.food_coordinates()
+        vis[food_y, food_x] = Colors.FOOD.value
 
-        scale = 4
-        vis = cv2.resize(vis, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST)
+        height, width = vis.shape[:2]
+        return np.broadcast_to(vis[:, None, :, None, :],
+                               (height, self.scale, width, self.scale, 3)) \
+            .reshape(height * self.scale, width * self.scale, 3)
 
-        if self.save_visualizations:
-            cv2.imwrite(f'output/vis_{self.count}.png', vis)
-            self.count += 1
+    def process(self, world_object: World) -> None:
+        """Visualize the map of world with objects
+        from Worm and Weather modules."""
+        if not self.sinks:
+            return
+        vis = self.compose_frame(world_object)
+        for sink in self.sinks:
+            sink.write(vis)
 
-        cv2.imshow('vis', vis)
-        cv2.waitKey(1)
+    def close(self) -> None:
+        """Finishes writing of frames."""
+        for sink in self.sinks:
+            sink.close()
 
 
 class AddFoodProcessor(WorldProcessor):
@@ -73,117 +154,371 @@ class AddFoodProcessor(WorldProcessor):
 
     def process(self, world_object: World) -> None:
         """Add food objects at the random coordinates on the map."""
-        growth = random.randint(10, 20)
-        for i in range(growth):
-            pos = world_object.get_random_pos()
-            food_unit = Food(pos)
-            world_object.cells[pos].food.append(food_unit)
-            world_object.food.append(food_unit)
+        world_object.sow_food(int(world_object.rng.integers(10, 21)))
 
 
 class AgingProcessor(WorldProcessor):
     """Increase age of worms every iteration."""
 
+    per_worm = True
+
     def process(self, world_object: World) -> None:
         """Increase age of worms."""
+        if world_object.population is not None:
+            population = world_object.population
+            population.column('age')[population.mask()] += 1
+            return
         for worm in world_object.worms:
-            worm.age += 1
+            self.process_worm(worm, world_object)
+
+    def process_worm(self, worm, world_object: World) -> None:
+        """Increase age of the worm."""
+        worm.age += 1
 
 
 class ZeroEnergyProcessor(WorldProcessor):
     """Processor decreases health of worms without energy."""
 
+    per_worm = True
+
     def process(self, world_object: World) -> None:
         """Slowly decrease health of worms without energy."""
+        if world_object.population is not None:
+            population = world_object.population
+            exhausted = population.mask() & (population.column('energy') <= 0)
+            population.column('health')[exhausted] -= 0.1
+            return
         for worm in world_object.worms_by_initiative:
-            if worm.get_energy() <= 0:
-                worm.health -= 0.1
+            self.process_worm(worm, world_object)
+
+    def process_worm(self, worm, world_object: World) -> None:
+        """Slowly decrease health of the worm without energy."""
+        if worm.get_energy() <= 0:
+            worm.health -= 0.1
 
 
 class WormsMovementProcessor(WorldProcessor):
-    """Processor moves worms on the map."""
+    """Processor moves worms on the map.
+    Worms look at two maps built once per tick: the highest health
+    of worms in every cell and the cells with food.
+    Decisions of all worms are taken at once from the maps,
+    a decision is taken again only for a worm whose cell or neighbour cells
+    have been changed by the moves made before it in the tick."""
+
+    step_lists = [[step for bit, step in enumerate(NEIGHBOURS_VALUES) if mask >> bit & 1]
+                  for mask in range(1 << len(NEIGHBOURS_VALUES))]
 
     def process(self, world_object: World) -> None:
         """The worms assess the danger and the presence of food
          in neighboring cells, then move to a random one of the most acceptable. """
-        for worm in world_object.worms_by_initiative:
-            if worm.dead:
+        order = world_object.worms_by_initiative
+        grid = world_object.grid
+        width = world_object.width
+        healths = np.fromiter((worm.get_health() for worm in order),
+                              dtype=np.float64, count=len(order))
+        cells = np.fromiter((grid.cell_id(worm.coordinates) for worm in order),
+                            dtype=np.int64, count=len(order))
+        danger, food = world_object.movement_maps(cells, healths)
+        decisions = self.decisions(cells, healths, danger, food, grid.worm_counts,
+                                   width, world_object.height).tolist()
+
+        moves = 0
+        changed: Set[int] = set()
+        for worm, cell, health, decision in zip(order, cells.tolist(), healths.tolist(), decisions):
+            if changed and (cell in changed or cell - width in changed or cell + width in changed
+                            or cell - 1 in changed or cell + 1 in changed):
+                decision = self.decision(cell, health, danger, food, grid.worm_counts,
+                                         width, world_object.height)
+            if decision <= 0:
                 continue
-            enemies = [enemy for enemy in world_object.worms_at(worm.coordinates)
-                       if enemy is not worm]
-            affordable_food = world_object.food_at(worm.coordinates)
-            is_worm_in_danger = worm.is_dangerous(
-                worm.max_danger_at_location(world_object.worms_at(worm.coordinates)))
-
-            is_nothing_interesting_in_cell = False
-
-            if len(affordable_food) == 0 and len(enemies) == 0:
-                is_nothing_interesting_in_cell = True
-
-            if is_worm_in_danger or is_nothing_interesting_in_cell:
-                neighbours_worms = world_object.get_neighbours_worms(
-                    worm.coordinates, world_object.width, world_object.height)
-                safe_steps = worm.get_safe_steps(neighbours_worms)
-                if len(safe_steps) != 0:
-                    steps_with_food = world_object.get_neighbours_food(worm.coordinates)
-                    dcoord = random.choice(worm.get_best_steps(safe_steps, steps_with_food))
-
-                    world_object.cells[worm.coordinates].worms.remove(worm)
-                    worm.move(dcoord, world_object.width, world_object.height)
-                    world_object.cells[worm.coordinates].worms.append(worm)
+            world_object.move_worm(worm, world_object.random.choice(self.step_lists[decision]))
+            new_cell = grid.cell_id(worm.coordinates)
+            if new_cell != cell:
+                moves += 1
+                changed.update((cell, new_cell))
+                danger[new_cell] = max(danger[new_cell], health)
+                if health >= danger[cell]:
+                    danger[cell] = max([0.0] + [other.get_health() for other in grid.worms_in(cell)])
+        world_object.instrumentation.count('moves', moves)
+
+    @staticmethod
+    def decisions(cells: np.ndarray, healths: np.ndarray, danger: np.ndarray, food: np.ndarray,
+                  worm_counts: np.ndarray, width: int, height: int) -> np.ndarray:
+        """Returns decisions of the worms in the cells:
+        -1 if the worm stays, otherwise the mask of steps it chooses from,
+        bits of the mask follow NEIGHBOURS_VALUES.
+        A living worm moves if a stronger worm is in its cell
+        or there is neither food nor other worms in it.
+        It steps into neighbour cells without stronger worms,
+        the ones with food are preferred."""
+        xs, ys = cells % width, cells // width
+        moving = (healths > 0) & ((danger[cells] > healths) | (~food[cells] & (worm_counts[cells] == 1)))
+        safe = np.zeros(len(cells), dtype=np.int64)
+        with_food = np.zeros(len(cells), dtype=np.int64)
+        for bit, (step_x, step_y) in enumerate(NEIGHBOURS_VALUES):
+            inside = (xs + step_x >= 0) & (xs + step_x < width) \
+                & (ys + step_y >= 0) & (ys + step_y < height)
+            neighbours = np.where(inside, cells + step_y * width + step_x, 0)
+            safe |= (inside & (danger[neighbours] <= healths)) << bit
+            with_food |= (inside & food[neighbours]) << bit
+        best = safe & with_food
+        return np.where(moving, np.where(best > 0, best, safe), -1)
+
+    @staticmethod
+    def decision(cell: int, health: float, danger: np.ndarray, food: np.ndarray,
+                 worm_counts: np.ndarray, width: int, height: int) -> int:
+        """Returns the decision of one worm, like decisions."""
+        if health <= 0 or not (danger[cell] > health or (not food[cell] and worm_counts[cell] == 1)):
+            return -1
+        x, y = cell % width, cell // width
+        safe = 0
+        with_food = 0
+        for bit, (step_x, step_y) in enumerate(NEIGHBOURS_VALUES):
+            if 0 <= x + step_x < width and 0 <= y + step_y < height:
+                neighbour = cell + step_y * width + step_x
+                if danger[neighbour] <= health:
+                    safe |= 1 << bit
+                if food[neighbour]:
+                    with_food |= 1 << bit
+        return safe & with_food or safe
 
 
 class PoisonProcessor(WorldProcessor):
     """Processor of poison effects on the worms."""
 
+    per_worm = True
+
     def process(self, world_object: World) -> None:
         """If the worm is poisoned, it loses its life."""
+        if world_object.population is not None:
+            population = world_object.population
+            poisoned = population.mask() & (population.column('poisoned') > 0)
+            population.column('health')[poisoned] -= 1
+            population.column('poisoned')[poisoned] -= 1
+            return
         for worm in world_object.worms_by_initiative:
-            worm.poison_effect()
+            self.process_worm(worm, world_object)
+
+    def process_worm(self, worm, world_object: World) -> None:
+        """If the worm is poisoned, it loses its life."""
+        worm.poison_effect()
 
 
 class FightProcessor(WorldProcessor):
-    """Processor of worms strikes."""
+    """Processor of worms strikes.
+    Every worm strikes a random not relative worm of its cell,
+    the target strikes back, dead worms and worms without energy do not strike.
+    Fights are resolved in rounds: in every round the next attacker
+    by initiative of every cell fights. Fights of different cells
+    do not affect each other, so a round is resolved with array operations.
+    When few cells are left in a round, the rest is resolved worm by worm."""
+
+    state_columns = ('health', 'energy', 'experience', 'poisoned', 'damage', 'defense', 'age')
+    changed_columns = ('health', 'energy', 'experience', 'poisoned')
+    min_round_cells = 8
 
     def process(self, world_object: World) -> None:
         """Every worm strikes another not a relatives worm
         at the same cell."""
-        for worm in world_object.worms_by_initiative:
-            targets = world_object.worms_at(worm.coordinates)
-            if len(targets) == 0:
-                continue
-            target = random.choice(targets)
-
-            if target is worm:
-                continue
-
-            if worm.is_relative_to(target):
-                continue
-
-            worm.strike(target)
-            target.strike(worm)
+        order = world_object.worms_by_initiative
+        worms_num = len(order)
+        grid = world_object.grid
+        rng = world_object.rng
+        width = grid.width
+        cells = np.fromiter((y * width + x for x, y in (worm.coordinates for worm in order)),
+                            dtype=np.int64, count=worms_num)
+        cell_sizes = np.bincount(cells, minlength=grid.height * width)
+        cell_starts = np.cumsum(cell_sizes) - cell_sizes
+        members = np.argsort(cells, kind='stable')
+        targets = members[cell_starts[cells] + rng.integers(0, cell_sizes[cells])]
+        poison = np.where(rng.random((worms_num, 2)) < 0.3,
+                          rng.integers(1, 4, size=(worms_num, 2)), 0)
+        attackers = np.flatnonzero(targets != np.arange(worms_num))
+        families = np.zeros(worms_num, dtype=np.int64)
+        fighters = np.union1d(attackers, targets[attackers])
+        families[fighters] = np.fromiter((order[index].genetics.family
+                                          for index in fighters.tolist()),
+                                         dtype=np.int64, count=len(fighters))
+        attackers = attackers[families[targets[attackers]] != families[attackers]]
+        if len(attackers) == 0:
+            world_object.instrumentation.count('strikes', 0)
+            return
+
+        fighters = np.union1d(attackers, targets[attackers])
+        state = self.read_state(world_object, order, fighters)
+        state['penalty'] = np.where(state['age'] > 100, 3, np.where(state['age'] > 50, 2, 1))
+        by_cell = attackers[np.argsort(cells[attackers], kind='stable')]
+        attacker_cells = cells[by_cell]
+        ranks = np.arange(len(by_cell)) - np.searchsorted(attacker_cells, attacker_cells)
+        rounds = by_cell[np.lexsort((by_cell, ranks))]
+        round_starts = np.searchsorted(np.sort(ranks), np.arange(ranks.max() + 2))
+
+        strikes = 0
+        rest = rounds[:0]
+        for begin, end in zip(round_starts[:-1].tolist(), round_starts[1:].tolist()):
+            if end - begin < self.min_round_cells:
+                rest = np.sort(rounds[begin:])
+                break
+            round_attackers = rounds[begin:end]
+            round_targets = targets[round_attackers]
+            round_poison = poison[round_attackers]
+            strikes += self.strike(round_attackers, round_targets, round_poison[:, 0], state)
+            strikes += self.strike(round_targets, round_attackers, round_poison[:, 1], state)
+        strikes += self.fight_one_by_one(rest, targets, poison, state)
+
+        self.write_state(world_object, order, fighters, state)
+        world_object.instrumentation.count('strikes', strikes)
+
+    @classmethod
+    def read_state(cls, world_object: World, order: list, indices: np.ndarray) -> dict:
+        """Returns arrays of characteristics of the worms in the order,
+        only the worms with the indices are read, the others are zeros."""
+        if world_object.population is not None:
+            slots = np.fromiter((order[index].slot for index in indices.tolist()),
+                                dtype=np.int64, count=len(indices))
+            columns = {name: world_object.population.column(name)[slots]
+                       for name in cls.state_columns}
+        else:
+            getter = attrgetter(*('_' + name for name in cls.state_columns))
+            rows = np.array([getter(order[index]) for index in indices.tolist()],
+                            dtype=np.float64).reshape(-1, len(cls.state_columns))
+            columns = dict(zip(cls.state_columns, rows.T))
+        state = {}
+        for name, values in columns.items():
+            state[name] = np.zeros(len(order), dtype=np.int64 if name in ('experience', 'poisoned')
+                                   else np.float64)
+            state[name][indices] = values
+        return state
+
+    @classmethod
+    def write_state(cls, world_object: World, order: list, indices: np.ndarray,
+                    state: dict) -> None:
+        """Writes changed characteristics of the worms with the indices back."""
+        if world_object.population is not None:
+            slots = np.fromiter((order[index].slot for index in indices.tolist()),
+                                dtype=np.int64, count=len(indices))
+            for name in cls.changed_columns:
+                world_object.population.column(name)[slots] = state[name][indices]
+            return
+        values = [state[name][indices].tolist() for name in cls.changed_columns]
+        for index, health, energy, experience, poisoned in zip(indices.tolist(), *values):
+            worm = order[index]
+            worm._health, worm._energy = health, energy
+            worm._experience, worm._poisoned = experience, poisoned
+
+    @staticmethod
+    def strike(strikers: np.ndarray, struck: np.ndarray, poison: np.ndarray, state: dict) -> int:
+        """Living strikers with energy strike the worms of the same positions
+        like Worm.strike, no worm may occur twice in the arrays.
+        Returns the number of strikes made."""
+        health, energy = state['health'], state['energy']
+        able = (health[strikers] > 0) & (energy[strikers] > 0)
+        strikers, struck = strikers[able], struck[able]
+        health[struck] -= state['damage'][strikers] * state['defense'][struck]
+        state['experience'][strikers] += 1
+        energy[strikers] -= 2 * state['penalty'][strikers]
+        state['poisoned'][struck] += poison[able]
+        return len(strikers)
+
+    @staticmethod
+    def fight_one_by_one(attackers: np.ndarray, targets: np.ndarray, poison: np.ndarray,
+                         state: dict) -> int:
+        """Resolves fights of the attackers in their order worm by worm.
+        Returns the number of strikes made."""
+        if len(attackers) == 0:
+            return 0
+        fighters = np.union1d(attackers, targets[attackers])
+        health, energy, experience, poisoned, damage, defense, penalty = (
+            state[name][fighters].tolist() for name in ('health', 'energy', 'experience',
+                                                        'poisoned', 'damage', 'defense',
+                                                        'penalty'))
+        strikes = 0
+        for attacker, target, (attack_poison, back_poison) in zip(
+                np.searchsorted(fighters, attackers).tolist(),
+                np.searchsorted(fighters, targets[attackers]).tolist(),
+                poison[attackers].tolist()):
+            for striker, other, poison_value in ((attacker, target, attack_poison),
+                                                 (target, attacker, back_poison)):
+                if health[striker] > 0 and energy[striker] > 0:
+                    health[other] -= damage[striker] * defense[other]
+                    experience[striker] += 1
+                    energy[striker] -= 2 * penalty[striker]
+                    poisoned[other] += poison_value
+                    strikes += 1
+        for name, values in (('health', health), ('energy', energy),
+                             ('experience', experience), ('poisoned', poisoned)):
+            state[name][fighters] = values
+        return strikes
 
 
 class LevelUpProcessor(WorldProcessor):
     """Processor of level ups effects."""
 
+    per_worm = True
+    uses_random = True
+
+    def __init__(self):
+        super().__init__()
+        self.leveled_up = False
+
     def process(self, world_object: World) -> None:
         """Each worm that has reached
         a certain value of experience increases its level."""
+        if world_object.population is not None:
+            population = world_object.population
+            ready = population.mask() \
+                & (population.column('health') > 0) \
+                & (population.column('experience') >= population.column('level') + 2)
+            if ready.any():
+                for slot in np.flatnonzero(ready):
+                    population.owners[slot].level_up(world_object.random)
+                world_object.initiative_changed()
+            return
         for worm in world_object.worms:
-            worm.level_up()
+            self.process_worm(worm, world_object)
+        self.finish_pass(world_object)
+
+    def process_worm(self, worm, world_object: World) -> None:
+        """Increases the level of the worm if it has enough experience."""
+        if worm.level_up(world_object.random):
+            self.leveled_up = True
+
+    def finish_pass(self, world_object: World) -> None:
+        """Updates the order of worms by initiative after level ups."""
+        if self.leveled_up:
+            world_object.initiative_changed()
+            self.leveled_up = False
 
 
 class FoodPickUpProcessor(WorldProcessor):
     """Processor of pick ups food objects by worms."""
 
     def process(self, world_object: World) -> None:
-        """Each worm picks up food if it is in the cage."""
+        """Each worm picks up food if it is in the cage.
+        In the food field the worm eats one unit of the cell."""
+        food_eaten = 0
+        food_field = world_object.food_field
+        if food_field is not None:
+            grid = world_object.grid
+            for eater in world_object.worms_by_initiative:
+                cell_id = grid.cell_id(eater.coordinates)
+                if grid.has_food(cell_id):
+                    target = food_field.unit_at(cell_id)
+                    nutritional_value = target.nutritional_value
+                    if eater.eat(target):
+                        food_field.remove_unit(cell_id, nutritional_value)
+                        food_eaten += 1
+            world_object.instrumentation.count('food_eaten', food_eaten)
+            return
         for eater in world_object.worms_by_initiative:
             targets = world_object.food_at(eater.coordinates)
             if len(targets) != 0:
-                target = random.choice(targets)
-                eater.eat(target)
+                target = world_object.random.choice(targets)
+                if eater.eat(target):
+                    food_eaten += 1
+                    if world_object.journal is not None:
+                        world_object.journal.change_food([target])
+        world_object.instrumentation.count('food_eaten', food_eaten)
 
 
 class EatenFoodRemover(WorldProcessor):
@@ -191,33 +526,57 @@ class EatenFoodRemover(WorldProcessor):
 
     def process(self, world_object: World) -> None:
         """delete all food without nutritional value."""
+        if world_object.food_field is not None:
+            world_object.food_field.remove_eaten()
+            return
         eaten_food = [food_unit for food_unit in world_object.food if food_unit.eaten]
         for food in eaten_food:
-            world_object.cells[food.coordinates].food.remove(food)
-            world_object.food.remove(food)
+            world_object.remove_food(food)
 
 
 class CorpseGrindingProcessor(WorldProcessor):
-    """Processor goes through the list of worms,
-    if there are dead in their cells,
-    the living receive a bonus."""
+    """Processor gives the living worms
+    a bonus for the dead worms in their cells.
+    Bonuses of the dead worms are summed for every cell at once."""
 
     def process(self, world_object: World) -> None:
         """Worms receive a bonus for killed worms in the same cell as they are."""
-        for worm in world_object.worms:
-            if not worm.dead:
-                continue
-
-            eaters = world_object.worms_at(worm.coordinates)
-            for eater in eaters:
-                if eater.dead:
-                    continue
-                eater.health += worm.get_level() + worm.get_damage() + worm.get_initiative()
-                eater.energy += (worm.get_level() + worm.get_damage() + worm.get_initiative()) * 10
+        dead_worms = world_object.dead_worms()
+        if not dead_worms:
+            return
+        grid = world_object.grid
+        dead_cells = np.fromiter((grid.cell_id(worm.coordinates) for worm in dead_worms),
+                                 dtype=np.int64, count=len(dead_worms))
+        bonuses = np.fromiter((worm.get_level() + worm.get_damage() + worm.get_initiative()
+                               for worm in dead_worms), dtype=np.float64, count=len(dead_worms))
+        cells, groups = np.unique(dead_cells, return_inverse=True)
+        cell_bonuses = np.bincount(groups, weights=bonuses, minlength=len(cells))
+
+        eaters: List = []
+        eaters_bonuses: List[float] = []
+        for cell, bonus in zip(cells.tolist(), cell_bonuses.tolist()):
+            cell_worms = grid.worms_in(cell)
+            eaters.extend(cell_worms)
+            eaters_bonuses.extend([bonus] * len(cell_worms))
+        if world_object.population is not None:
+            population = world_object.population
+            slots = np.fromiter((eater.slot for eater in eaters), dtype=np.int64,
+                                count=len(eaters))
+            eaters_bonuses = np.where(population.health[slots] > 0, eaters_bonuses, 0)
+            population.health[slots] += eaters_bonuses
+            population.energy[slots] += eaters_bonuses * 10
+            return
+        for eater, bonus in zip(eaters, eaters_bonuses):
+            if not eater.dead:
+                eater.health += bonus
+                eater.energy += bonus * 10
 
 
 class DeadWormsRemover(WorldProcessor):
-    """Processor goes through the list of worms if they are dead and removes them."""
+    """Processor removes the dead worms,
+    the worms found dead earlier in the tick are not searched again."""
+
+    state_attributes = ('dead_worms',)
 
     def __init__(self):
         super().__init__()
@@ -225,15 +584,12 @@ class DeadWormsRemover(WorldProcessor):
 
     def process(self, world_object: World) -> None:
         """Delete dead worms."""
-        number_of_worms_before = len(world_object.worms)
-        dead_worms = [worm for worm in world_object.worms if worm.dead]
+        dead_worms = world_object.take_dead_worms()
         for worm in dead_worms:
-            cell = world_object.cells[worm.coordinates]
-            cell.worms.remove(worm)
-            world_object.worms.remove(worm)
-        dead_worms_in_round = number_of_worms_before - len(world_object.worms)
-        self.dead_worms += dead_worms_in_round
-        print('dead', self.dead_worms)
+            world_object.remove_worm(worm)
+        self.dead_worms += len(dead_worms)
+        world_object.deaths += len(dead_worms)
+        world_object.instrumentation.count('deaths', len(dead_worms))
 
 
 class WormDivisionProcessor(WorldProcessor):
@@ -242,45 +598,88 @@ class WormDivisionProcessor(WorldProcessor):
     def process(self, world_object: World) -> None:
         """Creates a worm with a parental genotype
         or with a genotype mixed from the genotypes
-        of non-relatives worms in the cell."""
-        for parent in world_object.worms:
-            if parent.get_divisions_limit() == 0:
-                continue
-            child = Worm(parent.coordinates)
-            child.genetics.genotype = world_object.genetic_variability(parent.coordinates)
-            world_object.cells[parent.coordinates].worms.append(child)
-            world_object.worms.append(child)
-            child.genetics.family_affinity = parent.genetics.family_affinity + 0.00000000000001
-            child.newborn_genetics_boost(child.genetics.genotype)
+        of non-relatives worms in the cell.
+        Genotypes of children are mixed once for every cell
+        and for all cells at once."""
+        number_of_worms_before = len(world_object.worms)
+        parents = [worm for worm in world_object.worms if worm.get_divisions_limit() != 0]
+        cell_groups: Dict[int, int] = {}
+        parents_genomes: List[List[bytes]] = []
+        for parent in parents:
+            cell_id = world_object.grid.cell_id(parent.coordinates)
+            if cell_id not in cell_groups:
+                cell_groups[cell_id] = len(parents_genomes)
+                parents_genomes.append(
+                    [worm.genetics.genome
+                     for worm in world_object.worms_is_not_relatives(parent.coordinates)])
+        children_genomes = [intern_genome(codes)
+                            for codes in world_object.crossover(parents_genomes)]
+
+        world_object.spawn_worms(
+            [parent.coordinates for parent in parents],
+            [children_genomes[cell_groups[world_object.grid.cell_id(parent.coordinates)]]
+             for parent in parents],
+            [parent.genetics.family for parent in parents],
+            [parent.get_generation() + 1 for parent in parents])
+        for parent in parents:
             parent.divisions_limit -= 1
-            child.generation = parent.get_generation() + 1
+        world_object.births += len(parents)
+        world_object.instrumentation.count('births',
+                                           len(world_object.worms) - number_of_worms_before)
 
 
 class MutationProcessor(WorldProcessor):
     """Creates a random changes in the worm's genotype."""
 
+    per_worm = True
+    uses_random = True
+
+    def __init__(self):
+        super().__init__()
+        self._throws: Iterator[int] = iter(())
+
     def process(self, world_object: World) -> None:
         """With a certain probability creates
         a random change in the worm's genotype
         (add, del or exchange gene)."""
+        self.start_pass(world_object)
         for worm in world_object.worms:
-            mutation_probability_throw = random.randint(1, 100)
-            worm.mutation_metamorphosis(mutation_probability_throw)
+            self.process_worm(worm, world_object)
+
+    def start_pass(self, world_object: World) -> None:
+        """Draws the mutation probability throws for all worms at once."""
+        throws = world_object.rng.integers(1, 101, size=len(world_object.worms))
+        self._throws = iter(throws.tolist())
+
+    def process_worm(self, worm, world_object: World) -> None:
+        """With a certain probability changes the genotype of the worm."""
+        worm.mutation_metamorphosis(next(self._throws), world_object.random)
 
 
 class WeatherEventsEmergenceProcessor(WorldProcessor):
     """Creates a new weather objects."""
 
+    def __init__(self, max_rains: int = 5, max_tornadoes: int = 3):
+        super().__init__()
+        self.max_rains = max_rains
+        self.max_tornadoes = max_tornadoes
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> 'WeatherEventsEmergenceProcessor':
+        """Creates the processor with limits from the WEATHER section."""
+        return cls(config.getint('WEATHER', 'max_rains', fallback=5),
+                   config.getint('WEATHER', 'max_tornadoes', fallback=3))
+
     def process(self, world_object: World) -> None:
         """With a certain probability creates
         a new Rain or Tornado object."""
-        if len(world_object.rains) < 5:
-            chance_throw = random.randrange(0, 10)
+        if len(world_object.rains) < self.max_rains:
+            chance_throw = world_object.random.randrange(0, 10)
             if chance_throw >= 8:
                 world_object.rain_emergence()
 
-        if len(world_object.tornadoes) < 3:
-            chance_throw = random.randrange(0, 10)
+        if len(world_object.tornadoes) < self.max_tornadoes:
+            chance_throw = world_object.random.randrange(0, 10)
             if chance_throw >= 8:
                 world_object.tornado_emergence()
 
@@ -292,43 +691,99 @@ class WeatherMovementsProcessor(WorldProcessor):
         """Moves weather objects and update list of occupied coordinates."""
         if world_object.rains:
             for rain in world_object.rains:
-                rain.move(world_object.width, world_object.height)
+                rain.move(world_object.width, world_object.height, world_object.random)
                 rain.upscaling(world_object.width, world_object.height)
 
         if world_object.tornadoes:
             for tornado in world_object.tornadoes:
-                tornado.move(world_object.width, world_object.height)
+                tornado.move(world_object.width, world_object.height, world_object.random)
                 tornado.upscaling(world_object.width, world_object.height)
 
 
 class WeatherEffectsProcessor(WorldProcessor):
     """Applies effects of the weather objects."""
 
+    def __init__(self):
+        super().__init__()
+        self._coverage = np.zeros((0, 0), dtype=np.int32)
+
+    def rain_coverage(self, world_object: World) -> np.ndarray:
+        """Returns the grid with the number of rains over every cell.
+        The grid is reused, it must be cleared with clear_coverage."""
+        if self._coverage.shape != (world_object.height, world_object.width):
+            self._coverage = np.zeros((world_object.height, world_object.width), dtype=np.int32)
+        for rain in world_object.rains:
+            x_begin, y_begin, x_end, y_end = rain.rectangle
+            self._coverage[y_begin:y_end, x_begin:x_end] += 1
+        return self._coverage
+
+    def clear_coverage(self, world_object: World) -> None:
+        """Zeroes the cells of the coverage grid covered by rains."""
+        for rain in world_object.rains:
+            x_begin, y_begin, x_end, y_end = rain.rectangle
+            self._coverage[y_begin:y_end, x_begin:x_end] = 0
+
     def process(self, world_object: World) -> None:
         """Tornado scatters worms and food,
         Rain decrease health/energy of worms
         and decrease nutritional_value of food."""
         if len(world_object.rains) > 0:
-            for rain in world_object.rains:
-                for coordinate in rain.all_coordinates:
-                    worms_in_cell = world_object.worms_at(coordinate)
-                    food_in_cell = world_object.food_at(coordinate)
-                    rain.raining_effect(worms_in_cell, food_in_cell)
+            coverage = self.rain_coverage(world_object)
+            self.rain_on_worms(world_object, coverage)
+            if world_object.food_field is not None:
+                world_object.food_field.rain(coverage, Rain.nutrition_penalty)
+            else:
+                self.rain_on_food(world_object, coverage)
+            self.clear_coverage(world_object)
+
+        world_object.instrumentation.count(
+            'weather_cells', sum(weather_event.area for weather_event
+                                 in world_object.rains + world_object.tornadoes))
 
         if len(world_object.tornadoes) > 0:
+            grid = world_object.grid
+            food_field = world_object.food_field
             for tornado in world_object.tornadoes:
-                for coordinate in tornado.all_coordinates:
-                    worms_in_cell = world_object.worms_at(coordinate)
-                    food_in_cell = world_object.food_at(coordinate)
-                    cell = world_object.cells[coordinate]
-                    cell.worms = []
-                    cell.food = []
-                    tornado.tornado_effect(worms_in_cell, food_in_cell,
-                                           world_object.width, world_object.height)
-                    for worm in worms_in_cell:
-                        world_object.cells[worm.coordinates].worms.append(worm)
-                    for food in food_in_cell:
-                        world_object.cells[food.coordinates].food.append(food)
+                if food_field is not None:
+                    food_field.scatter(tornado.rectangle, world_object.rng)
+                worms_in_area, food_in_area = grid.take_rectangle(tornado.rectangle,
+                                                                  food_field is None)
+                tornado.tornado_effect(worms_in_area, food_in_area,
+                                       world_object.width, world_object.height,
+                                       world_object.random)
+                for worm in worms_in_area:
+                    grid.add_worm(grid.cell_id(worm.coordinates), worm)
+                for food in food_in_area:
+                    grid.add_food(grid.cell_id(food.coordinates), food)
+                if world_object.journal is not None:
+                    world_object.journal.move_worms(worms_in_area)
+                    world_object.journal.change_food(food_in_area)
+
+    @staticmethod
+    def rain_on_food(world_object: World, coverage: np.ndarray) -> None:
+        """Applies the rain effect to food objects in covered cells."""
+        food_x, food_y = world_object.food_coordinates()
+        food_hits = coverage[food_y, food_x]
+        hit = np.flatnonzero(food_hits)
+        for index in hit:
+            Rain.raining_effect([], [world_object.food[index]], int(food_hits[index]))
+        if world_object.journal is not None:
+            world_object.journal.change_food([world_object.food[index] for index in hit])
+
+    @staticmethod
+    def rain_on_worms(world_object: World, coverage: np.ndarray) -> None:
+        """Applies the rain effect to worms standing in covered cells."""
+        worms_x, worms_y = world_object.worm_coordinates()
+        worm_hits = coverage[worms_y, worms_x]
+        if world_object.population is not None:
+            population = world_object.population
+            hit = worm_hits > 0
+            slots = population.active_slots()[hit]
+            population.health[slots] -= Rain.health_penalty * worm_hits[hit]
+            population.damage[slots] -= Rain.damage_penalty * worm_hits[hit]
+            return
+        for index in np.flatnonzero(worm_hits):
+            Rain.raining_effect([world_object.worms[index]], [], int(worm_hits[index]))
 
 
 class WeatherEventsRemover(WorldProcessor):
@@ -347,19 +802,173 @@ class WeatherEventsRemover(WorldProcessor):
 
 
 class AnalyticsProcessor(WorldProcessor):
-    """Displays info in the console."""
-
-    def __init__(self):
+    """Records aggregates of the world every interval ticks:
+    numbers of worms, births and deaths since the previous record,
+    food units and weather events, mean and max characteristics of worms,
+    numbers of worms of every generation and frequencies of gene types.
+    Records are kept in memory and passed to the sink in batches of columns."""
+
+    state_attributes = ('iterations', 'step', 'births', 'deaths')
+    statistics = ('health', 'energy', 'damage', 'defense', 'level', 'age', 'generation')
+    generation_bins = 8
+
+    def __init__(self, sink: Optional[AnalyticsSink] = None, interval: int = 1,
+                 batch_size: int = 1000):
         super().__init__()
+        self.sink = sink
+        self.interval = max(interval, 1)
+        self.batch_size = max(batch_size, 1)
         self.iterations = 0
         self.step = 0
+        self.births = 0
+        self.deaths = 0
+        self._records: List[tuple] = []
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> 'AnalyticsProcessor':
+        """Creates the processor with the sink from the ANALYTICS section,
+        batches are written from a background thread."""
+        section = 'ANALYTICS'
+        output = config.get(section, 'output', fallback='none')
+        path = config.get(section, 'path', fallback='output')
+        if output == 'csv':
+            sink: Optional[AnalyticsSink] = CsvSink(os.path.join(path, 'analytics.csv'))
+        elif output == 'npz':
+            sink = NpzSink(os.path.join(path, 'analytics'))
+        elif output == 'none':
+            sink = None
+        else:
+            logging.error('Unknown analytics output')
+            raise ValueError('Unknown analytics output')
+
+        if sink is not None:
+            sink = AsyncAnalyticsSink(sink, config.getint(section, 'queue_size', fallback=16))
+        return cls(sink, config.getint(section, 'interval', fallback=1),
+                   config.getint(section, 'batch_size', fallback=1000))
+
+    @classmethod
+    def columns(cls) -> List[str]:
+        """Names of the fields of records,
+        the last generation counts also all older generations."""
+        return (['tick', 'worms', 'births', 'deaths', 'food', 'rains', 'tornadoes']
+                + [f'{kind}_{name}' for name in cls.statistics for kind in ('mean', 'max')]
+                + [f'generation_{generation}' for generation in range(cls.generation_bins)]
+                + [f'genes_{gene.name.lower()}' for gene in genes_variations])
 
     def process(self, world_object: World) -> None:
-        """Displays iteration number and total number of worms on the map."""
+        """Records the aggregates every interval ticks."""
         self.iterations += 1
         self.step += 1
-        print('iter', self.iterations)
-        print('number of worms', len(world_object.worms))
         if self.step == 100:
-            logging.debug('Program is working correctly')
+            logging.debug('Program is working correctly, iteration %s, number of worms %s',
+                          self.iterations, len(world_object.worms))
             self.step = 0
+        if self.sink is None or self.iterations % self.interval:
+            return
+        self._records.append(self.aggregate(world_object))
+        if len(self._records) >= self.batch_size:
+            self.flush()
+
+    def aggregate(self, world_object: World) -> tuple:
+        """Returns the record of the world in the order of columns,
+        worms are read in two passes: characteristics and genomes."""
+        values = world_object.worm_characteristics(self.statistics)
+        genes = world_object.gene_counts().sum(axis=0)
+        record = [world_object.tick, len(world_object.worms),
+                  world_object.births - self.births, world_object.deaths - self.deaths,
+                  world_object.food_count(), len(world_object.rains), len(world_object.tornadoes)]
+        self.births, self.deaths = world_object.births, world_object.deaths
+        for name in self.statistics:
+            column = values[name]
+            record += [float(column.mean()) if len(column) else 0.0,
+                       float(column.max(initial=0))]
+        generations = np.minimum(values['generation'].astype(np.int64), self.generation_bins - 1)
+        record += np.bincount(generations, minlength=self.generation_bins).tolist()
+        record += (genes / max(int(genes.sum()), 1)).tolist()
+        return tuple(record)
+
+    def flush(self) -> None:
+        """Passes the kept records to the sink as one batch of columns."""
+        if self.sink is None or not self._records:
+            return
+        self.sink.write({name: np.array(values)
+                         for name, values in zip(self.columns(), zip(*self._records))})
+        self._records = []
+
+    def close(self) -> None:
+        """Writes the kept records and closes the sink."""
+        if self.sink is not None:
+            self.flush()
+            self.sink.close()
+
+
+class FusedWormProcessor(WorldProcessor):
+    """Runs several per-worm processors in one pass over worms.
+    For every worm the processors are applied in their order,
+    which gives the same result as separate passes
+    because each processor changes only the worm itself.
+    Random values are drawn in the order of world worms,
+    so a fused group may contain only one processor using them."""
+
+    def __init__(self, processors: List[WorldProcessor]):
+        super().__init__()
+        self.processors = processors
+
+    @property
+    def name(self) -> str:
+        """Names of the fused processors."""
+        return '+'.join(proc.name for proc in self.processors)
+
+    def state_dict(self) -> Dict:
+        """Returns states of the fused processors by their names."""
+        return {proc.name: proc.state_dict() for proc in self.processors}
+
+    def load_state_dict(self, state: Dict) -> None:
+        """Restores states of the fused processors."""
+        for proc in self.processors:
+            proc.load_state_dict(state.get(proc.name, {}))
+
+    def process(self, world_object: World) -> None:
+        """Applies all processors to every worm."""
+        if world_object.population is not None:
+            for proc in self.processors:
+                proc.process(world_object)
+            return
+        processors = self.processors
+        for proc in processors:
+            proc.start_pass(world_object)
+        for worm in world_object.worms:
+            for proc in processors:
+                proc.process_worm(worm, world_object)
+        for proc in processors:
+            proc.finish_pass(world_object)
+
+    def close(self) -> None:
+        """Releases resources of the fused processors."""
+        for proc in self.processors:
+            proc.close()
+
+
+def fuse_processors(processors: List[WorldProcessor]) -> List[WorldProcessor]:
+    """Replaces runs of consecutive per-worm processors
+    with fused processors, the order of processors is kept."""
+    fused: List[WorldProcessor] = []
+    group: List[WorldProcessor] = []
+
+    def close_group() -> None:
+        if len(group) == 1:
+            fused.append(group[0])
+        elif len(group) > 1:
+            fused.append(FusedWormProcessor(list(group)))
+        group.clear()
+
+    for proc in processors:
+        if not proc.per_worm:
+            close_group()
+            fused.append(proc)
+            continue
+        if proc.uses_random and any(member.uses_random for member in group):
+            close_group()
+        group.append(proc)
+    close_group()
+    return fused
@@ -0,0 +1,359 @@
+"""The module contains recording of the changes made by every tick
+into a binary event log and reconstruction of recorded worlds.
+A log is a directory with events.bin, blocks of changes of every tick,
+meta.json and keyframes, checkpoints of the whole world taken periodically.
+The changes are the ones noted by the processors in the journal of the world:
+births, deaths and moves of worms, added, eaten and moved food,
+changed cells of the food field and the weather.
+The map at any recorded tick is the nearest earlier keyframe
+with the changes of the following ticks applied to its arrays,
+the whole world is restored at keyframes."""
+import configparser
+import json
+import logging
+import os
+import shutil
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.arena import Arena
+from src.checkpoint import (Checkpointer, FOOD_DTYPE, WEATHER_DTYPE, WORM_DTYPE,
+                            read, restore, weather_records, worm_record)
+from src.journal import Journal
+from src.world import World
+
+EVENTS_FORMAT = 2
+
+REMOVED_DTYPE = np.dtype([('uid', '<i4'), ('added', '<i4')])
+
+SECTIONS = {'worms_removed': REMOVED_DTYPE,
+            'worms_added': WORM_DTYPE,
+            'genome_codes': np.dtype(np.uint8),
+            'worm_moves': np.dtype([('uid', '<i4'), ('x', '<i4'), ('y', '<i4')]),
+            'food_removed': REMOVED_DTYPE,
+            'food_added': FOOD_DTYPE,
+            'food_changes': FOOD_DTYPE,
+            'field_changes': np.dtype([('cell', '<i4'), ('count', '<i4'),
+                                       ('nutrition', '<f8')]),
+            'weather': WEATHER_DTYPE}
+
+HEADER_DTYPE = np.dtype([(name, '<i8') for name in ('tick', 'births', 'deaths')]
+                        + [(name, '<i8') for name in SECTIONS])
+
+MAP_WORM_DTYPE = np.dtype([('uid', np.int64), ('x', np.int64), ('y', np.int64)])
+MAP_FOOD_DTYPE = np.dtype([('uid', np.int64), ('x', np.int64), ('y', np.int64),
+                           ('nutritional_value', np.float64)])
+
+
+def _padded(size: int) -> int:
+    """Returns the size rounded up to 8 bytes."""
+    return size + -size % 8
+
+
+class _Row:
+    """Record of a map object kept in an arena while the changes are applied."""
+
+    __slots__ = ('uid', 'record')
+
+    def __init__(self, record: list):
+        self.uid = record[0]
+        self.record = record
+
+
+def _apply(arena: Arena, removed: np.ndarray, added: List[_Row]) -> None:
+    """Repeats additions and removals of objects in the order they were made,
+    so the objects get the same ids and places as in the recorded world."""
+    begin = 0
+    for uid, before in removed.tolist():
+        arena.extend(added[begin:before])
+        begin = before
+        arena.remove(arena.get(uid))
+    arena.extend(added[begin:])
+
+
+def _records(arena: Arena, record_dtype: np.dtype, dtype: np.dtype) -> np.ndarray:
+    """Returns the fields of the dtype of the records of the objects of the arena
+    in their order."""
+    records = np.array([tuple(row.record) for row in arena], dtype=record_dtype)
+    result = np.zeros(len(records), dtype=dtype)
+    for name in dtype.names:
+        result[name] = records[name]
+    return result
+
+
+class MapState:
+    """Map of the world after a recorded tick: ids and coordinates of worms,
+    ids, coordinates and nutritional values of food objects, in the order of the world,
+    the food field and the weather.
+    Characteristics and genomes of worms are not recorded between keyframes,
+    so they are not a part of the map."""
+
+    def __init__(self, tick: int, births: int, deaths: int, worms: np.ndarray,
+                 food: np.ndarray, food_counts: np.ndarray, food_nutrition: np.ndarray,
+                 weather: np.ndarray):
+        self.tick = tick
+        self.births = births
+        self.deaths = deaths
+        self.worms = worms
+        self.food = food
+        self.food_counts = food_counts
+        self.food_nutrition = food_nutrition
+        self.weather = weather
+
+
+class EventRecorder:
+    """Writes the changes noted in the journal of the world by every tick
+    into directory/events.bin: removed and added worms with their genomes,
+    coordinates of moved worms, removed, added and changed food objects,
+    changed cells of the food field and the weather.
+    Keyframes are checkpoints saved into directory/tick_N
+    when the recording starts and every keyframe_interval ticks.
+    The recorder owns its directory: a new recording replaces
+    only the files of an earlier log and refuses a directory with other files."""
+
+    def __init__(self, directory: str = 'events', keyframe_interval: int = 100,
+                 record: bool = True):
+        self.directory = directory
+        self.record = record
+        self.keyframes = Checkpointer(directory, keyframe_interval, keep=0)
+        self._file = None
+        self._world: Optional[World] = None
+        self._keyframe_ticks: List[int] = []
+        self._field: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser) -> 'EventRecorder':
+        """Creates the recorder with settings from the EVENTS section."""
+        section = 'EVENTS'
+        return cls(config.get(section, 'directory', fallback='events'),
+                   config.getint(section, 'keyframe_interval', fallback=100),
+                   config.getboolean(section, 'record', fallback=False))
+
+    def start(self, world_object: World, processors: Sequence = ()) -> None:
+        """Starts the log from the current state of the world, saved as the first keyframe,
+        and starts noting changes of the world in its journal.
+        An earlier log left in the directory is removed."""
+        if not self.record:
+            return
+        self.close()
+        self._remove_log()
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(os.path.join(self.directory, 'events.bin'), 'wb')
+        self._world = world_object
+        world_object.journal = Journal()
+        food_field = world_object.food_field
+        self._field = np.concatenate((food_field.counts, food_field.nutrition)) \
+            if food_field is not None else None
+        self._keyframe_ticks = []
+        self._save_keyframe(world_object, processors)
+
+    def _remove_log(self) -> None:
+        """Removes events.bin, meta.json and the keyframes of an earlier log.
+        Raises ValueError if the directory holds anything else,
+        for example checkpoints or another log."""
+        if not os.path.isdir(self.directory):
+            return
+        names = set(os.listdir(self.directory))
+        owned = set()
+        if 'meta.json' in names:
+            try:
+                with open(os.path.join(self.directory, 'meta.json'), encoding='utf-8') as reader:
+                    meta = json.load(reader)
+            except ValueError:
+                meta = {}
+            if meta.get('format') == EVENTS_FORMAT:
+                owned.update({'meta.json', 'events.bin'})
+                for tick in meta['keyframes']:
+                    owned.update({f'tick_{tick}', f'tick_{tick}.tmp'})
+        foreign = sorted(names - owned)
+        if foreign:
+            logging.error('Directory %s of the event log holds other files: %s',
+                          self.directory, ', '.join(foreign))
+            raise ValueError('Directory of the event log holds other files')
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+    def _save_keyframe(self, world_object: World, processors: Sequence) -> None:
+        """Saves the keyframe and lists it in meta.json."""
+        self._keyframe_ticks.append(world_object.tick)
+        with open(os.path.join(self.directory, 'meta.json'), 'w', encoding='utf-8') as writer:
+            json.dump({'format': EVENTS_FORMAT, 'keyframes': self._keyframe_ticks}, writer)
+        self.keyframes.save(world_object, processors)
+
+    def after_tick(self, world_object: World, processors: Sequence) -> None:
+        """Appends the changes made by the tick and saves the keyframe if it is time."""
+        if not self.record:
+            return
+        if self._file is None:
+            self.start(world_object, processors)
+            return
+        self._file.write(self._block(world_object))
+        self._file.flush()
+        world_object.journal.clear()
+        interval = self.keyframes.interval
+        if interval and world_object.tick % interval == 0:
+            self._save_keyframe(world_object, processors)
+
+    def _block(self, world_object: World) -> bytes:
+        """Returns the block of changes noted in the journal of the world."""
+        journal = world_object.journal
+        sections: Dict[str, np.ndarray] = {
+            'worms_removed': np.array(journal.worms_removed, dtype=REMOVED_DTYPE),
+            'worms_added': np.array([(uid,) + worm_record(worm, len(worm.genetics.genome))[1:]
+                                     for uid, worm in journal.worms_added], dtype=WORM_DTYPE),
+            'genome_codes': np.frombuffer(b''.join(worm.genetics.genome
+                                                   for _, worm in journal.worms_added),
+                                          dtype=np.uint8),
+            'worm_moves': np.array([(worm.uid,) + worm.coordinates
+                                    for worm in journal.worms_moved if worm.uid >= 0],
+                                   dtype=SECTIONS['worm_moves']),
+            'food_removed': np.array(journal.food_removed, dtype=REMOVED_DTYPE),
+            'food_added': np.array([(uid, food_unit.cell_index) + food_unit.coordinates
+                                    + (food_unit.nutritional_value,)
+                                    for uid, food_unit in journal.food_added], dtype=FOOD_DTYPE),
+            'food_changes': np.array([(food_unit.uid, food_unit.cell_index)
+                                      + food_unit.coordinates + (food_unit.nutritional_value,)
+                                      for food_unit in journal.food_changed
+                                      if food_unit.uid >= 0], dtype=FOOD_DTYPE),
+            'weather': weather_records(world_object)}
+
+        food_field = world_object.food_field
+        if food_field is not None:
+            field = np.concatenate((food_field.counts, food_field.nutrition))
+            cells = np.flatnonzero((field != self._field).reshape(2, -1).any(axis=0))
+            changes = np.empty(len(cells), dtype=SECTIONS['field_changes'])
+            changes['cell'] = cells
+            changes['count'] = food_field.counts[cells]
+            changes['nutrition'] = food_field.nutrition[cells]
+            sections['field_changes'] = changes
+            self._field = field
+
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header['tick'] = world_object.tick
+        header['births'] = world_object.births
+        header['deaths'] = world_object.deaths
+        parts = []
+        for name, dtype in SECTIONS.items():
+            data = np.ascontiguousarray(sections.get(name, np.zeros(0, dtype=dtype)),
+                                        dtype=dtype).tobytes()
+            header[name] = len(data) // dtype.itemsize
+            parts.append(data + bytes(_padded(len(data)) - len(data)))
+        return header.tobytes() + b''.join(parts)
+
+    def close(self) -> None:
+        """Finishes writing of the log and of the keyframes
+        and stops noting changes of the world."""
+        self.keyframes.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._world is not None:
+            self._world.journal = None
+            self._world = None
+
+
+class Replay:
+    """Reader of a log written by EventRecorder.
+    The log is memory mapped and only headers of blocks are read on opening.
+    The map at any recorded tick is restored from arrays of the nearest keyframe
+    with the changes of the following blocks applied to them:
+    worms and food objects with their ids, order and coordinates,
+    nutritional values of food, the food field and the weather are exact.
+    The whole world, with characteristics and genomes of worms
+    and states of random sources and processors, is restored only at keyframes,
+    so a run is continued from a keyframe checkpoint."""
+
+    def __init__(self, directory: str = 'events'):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as reader:
+            meta = json.load(reader)
+        if meta.get('format') != EVENTS_FORMAT:
+            logging.error('Unknown event log format')
+            raise ValueError('Unknown event log format')
+        path = os.path.join(directory, 'events.bin')
+        self._data = np.memmap(path, dtype=np.uint8, mode='r') if os.path.getsize(path) \
+            else np.zeros(0, dtype=np.uint8)
+        self._offsets: Dict[int, int] = {}
+        offset = 0
+        while offset + HEADER_DTYPE.itemsize <= len(self._data):
+            header = np.frombuffer(self._data, dtype=HEADER_DTYPE, count=1, offset=offset)[0]
+            end = offset + HEADER_DTYPE.itemsize + sum(
+                _padded(int(header[name]) * dtype.itemsize) for name, dtype in SECTIONS.items())
+            if end > len(self._data):
+                break
+            self._offsets[int(header['tick'])] = offset
+            offset = end
+        self.keyframes = [tick for tick in meta['keyframes']
+                          if os.path.isdir(os.path.join(directory, f'tick_{tick}'))]
+
+    @property
+    def ticks(self) -> range:
+        """Returns the range of recorded ticks."""
+        if not self.keyframes:
+            return range(0)
+        return range(self.keyframes[0], max([self.keyframes[-1]] + list(self._offsets)) + 1)
+
+    def block(self, tick: int) -> Dict[str, np.ndarray]:
+        """Returns the header and the sections of the block of the tick
+        as arrays mapped from the log."""
+        offset = self._offsets[tick]
+        header = np.frombuffer(self._data, dtype=HEADER_DTYPE, count=1, offset=offset)[0]
+        block = {'header': header}
+        offset += HEADER_DTYPE.itemsize
+        for name, dtype in SECTIONS.items():
+            count = int(header[name])
+            block[name] = np.frombuffer(self._data, dtype=dtype, count=count, offset=offset)
+            offset += _padded(count * dtype.itemsize)
+        return block
+
+    def world_at(self, tick: int) -> World:
+        """Returns the whole world as it was after the keyframe tick."""
+        if tick not in self.keyframes:
+            logging.error('Tick %s is not a keyframe', tick)
+            raise ValueError('Tick is not a keyframe')
+        return restore(*read(os.path.join(self.directory, f'tick_{tick}')))
+
+    def map_at(self, tick: int) -> MapState:
+        """Returns the map as it was after the tick."""
+        keyframes = [keyframe for keyframe in self.keyframes if keyframe <= tick]
+        if not keyframes or any(block_tick not in self._offsets
+                                for block_tick in range(keyframes[-1] + 1, tick + 1)):
+            logging.error('Tick %s is not recorded', tick)
+            raise ValueError('Tick is not recorded')
+        arrays, meta = read(os.path.join(self.directory, f'tick_{keyframes[-1]}'))
+        worms = Arena()
+        worms.restore([_Row(list(record)) for record in arrays['worms'].tolist()],
+                      arrays['worms_free_ids'].tolist())
+        food = Arena()
+        food.restore([_Row(list(record)) for record in arrays['food'].tolist()],
+                     arrays['food_free_ids'].tolist())
+        food_counts = np.array(arrays['food_counts'])
+        food_nutrition = np.array(arrays['food_nutrition'])
+        header = {'tick': meta['tick'], 'births': meta['births'], 'deaths': meta['deaths']}
+        weather = np.array(arrays['weather'])
+
+        for block_tick in range(keyframes[-1] + 1, tick + 1):
+            block = self.block(block_tick)
+            _apply(worms, block['worms_removed'],
+                   [_Row(list(record)) for record in block['worms_added'].tolist()])
+            for uid, x, y in block['worm_moves'].tolist():
+                worms.get(uid).record[3:5] = x, y
+            _apply(food, block['food_removed'],
+                   [_Row(list(record)) for record in block['food_added'].tolist()])
+            for record in block['food_changes'].tolist():
+                food.get(record[0]).record = list(record)
+            changes = block['field_changes']
+            food_counts[changes['cell']] = changes['count']
+            food_nutrition[changes['cell']] = changes['nutrition']
+            header = block['header']
+            weather = np.array(block['weather'])
+
+        return MapState(int(header['tick']), int(header['births']), int(header['deaths']),
+                        _records(worms, WORM_DTYPE, MAP_WORM_DTYPE),
+                        _records(food, FOOD_DTYPE, MAP_FOOD_DTYPE),
+                        food_counts, food_nutrition, weather)
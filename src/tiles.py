@@ -0,0 +1,353 @@
+"""The module contains the simulation of the map split into tiles,
+vertical strips of columns simulated by separate worker processes.
+Border cells of the neighbour tiles are exchanged through shared memory,
+objects crossing the borders migrate between tiles
+through the coordinating process, which also owns the weather."""
+import configparser
+import logging
+import multiprocessing
+import threading
+import traceback
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.active_characters import Food, Genetics, Worm
+from src.processors import WorldProcessor, Visualizer, AnalyticsProcessor, \
+    WeatherEventsEmergenceProcessor, WeatherMovementsProcessor, WeatherEventsRemover, \
+    WormsMovementProcessor, WeatherEffectsProcessor
+from src.weather import Rain, Tornado
+from src.world import World
+
+WEATHER_PROCESSORS = (WeatherEventsEmergenceProcessor, WeatherMovementsProcessor,
+                      WeatherEventsRemover)
+MIGRATING_PROCESSORS = (WormsMovementProcessor, WeatherEffectsProcessor)
+HALO_PROCESSORS = (WormsMovementProcessor,)
+SKIPPED_PROCESSORS = (Visualizer, AnalyticsProcessor)
+POLL_INTERVAL = 0.1
+
+
+def tile_bounds(width: int, tiles: int) -> List[int]:
+    """Returns borders of the tiles, tile i owns columns bounds[i]..bounds[i + 1]."""
+    if not 0 < tiles <= width:
+        logging.error('Wrong number of tiles')
+        raise ValueError('Wrong number of tiles')
+    return [width * index // tiles for index in range(tiles + 1)]
+
+
+class TileWorld(World):
+    """World of one tile. The map has the full size,
+    but only objects in the columns x_begin..x_end belong to the tile.
+    Cells of the neighbour tiles next to the borders are seen through the halo:
+    the highest health of worms and presence of food there."""
+
+    def __init__(self, height: int, width: int, bounds: Sequence[int], index: int,
+                 worms_num: int = 0, food_num: int = 0,
+                 columnar: bool = False, seed: Optional[int] = None,
+                 food_field: bool = False):
+        self.bounds = list(bounds)
+        self.x_begin = self.bounds[index]
+        self.x_end = self.bounds[index + 1]
+        self.index = index
+        self.halo_health = np.full((2, height), -np.inf)
+        self.halo_food = np.zeros((2, height), dtype=bool)
+        super().__init__(height, width, worms_num, 0, columnar, seed, food_field)
+        World.sow_food(self, food_num)
+
+    def get_random_positions(self, number: int) -> List[tuple]:
+        """get a list of random coordinates in the columns of the tile."""
+        xs = self.rng.integers(self.x_begin, self.x_end, size=number).tolist()
+        ys = self.rng.integers(0, self.height, size=number).tolist()
+        return list(zip(xs, ys))
+
+    def sow_food(self, food_num: int = 1000) -> None:
+        """Sows the part of the food objects falling on the tile."""
+        share = (self.x_end - self.x_begin) / self.width
+        super().sow_food(int(self.rng.binomial(food_num, share)))
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the highest health of worms and presence of food
+        in the first and the last column of the tile."""
+        health = np.full((2, self.height), -np.inf)
+        counts = self.grid.worm_counts.reshape(self.height, self.width)
+        food = self.grid.food_counts.reshape(self.height, self.width) > 0
+        for side, x in enumerate((self.x_begin, self.x_end - 1)):
+            for y in np.flatnonzero(counts[:, x]).tolist():
+                health[side, y] = max(worm.get_health() for worm in self.worms_at((x, y)))
+        return health, food[:, [self.x_begin, self.x_end - 1]].T
+
+    def movement_maps(self, cells: np.ndarray,
+                      healths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the maps of danger and food,
+        the columns next to the tile are taken from the halo."""
+        danger, food = super().movement_maps(cells, healths)
+        for side, x in ((0, self.x_begin - 1), (1, self.x_end)):
+            if 0 <= x < self.width:
+                danger.reshape(self.height, self.width)[:, x] = np.maximum(self.halo_health[side], 0)
+                food.reshape(self.height, self.width)[:, x] = self.halo_food[side]
+        return danger, food
+
+    def set_weather(self, weather: List[tuple]) -> None:
+        """Replaces weather objects with the ones of the coordinator."""
+        self.rains = [Rain.from_state(state, self.width, self.height)
+                      for tornado, state in weather if not tornado]
+        self.tornadoes = [Tornado.from_state(state, self.width, self.height)
+                          for tornado, state in weather if tornado]
+
+    def take_emigrants(self) -> Dict[int, Tuple[List[tuple], List[tuple]]]:
+        """Removes objects which left the columns of the tile,
+        returns their states grouped by the tiles they entered."""
+        emigrants: Dict[int, Tuple[List[tuple], List[tuple]]] = {}
+        outside = np.ones(self.width, dtype=bool)
+        outside[self.x_begin:self.x_end] = False
+        for counts, objects_in, is_worm in ((self.grid.worm_counts, self.grid.worms_in, True),
+                                            (self.grid.food_counts, self.grid.food_in, False)):
+            cells = np.flatnonzero(counts.reshape(self.height, self.width)[:, outside])
+            columns = np.flatnonzero(outside)
+            for cell in cells.tolist():
+                x = int(columns[cell % len(columns)])
+                y = cell // len(columns)
+                target = int(np.searchsorted(self.bounds, x, side='right')) - 1
+                if not is_worm and self.food_field is not None:
+                    units, nutrition = self.food_field.take(self.grid.cell_id((x, y)))
+                    emigrants.setdefault(target, ([], []))[1].extend(
+                        [((x, y), nutrition / units)] * units)
+                    continue
+                for item in list(objects_in(self.grid.cell_id((x, y)))):
+                    if is_worm:
+                        self.remove_worm(item)
+                        emigrants.setdefault(target, ([], []))[0].append(pack_worm(item))
+                    else:
+                        self.remove_food(item)
+                        emigrants.setdefault(target, ([], []))[1].append(
+                            (item.coordinates, item.nutritional_value))
+        return emigrants
+
+    def accept_immigrants(self, worms: List[tuple], food: List[tuple]) -> None:
+        """Places objects which entered the tile."""
+        for state in worms:
+            self.add_worm(unpack_worm(self, state))
+        for coordinates, nutritional_value in food:
+            self.add_food(Food(coordinates, nutritional_value))
+
+
+def pack_worm(worm: Worm) -> tuple:
+    """Returns the state of the worm sent to another tile."""
+    return (worm.coordinates, worm.get_state(),
+            tuple(getattr(worm.genetics, field) for field in Genetics.state_fields),
+            worm.genetics.genome)
+
+
+def unpack_worm(world_object: World, state: tuple) -> Worm:
+    """Creates the worm from the state returned by pack_worm."""
+    coordinates, worm_state, genetics_state, genome = state
+    worm = world_object.create_worm(coordinates)
+    worm.set_state(worm_state)
+    for field, value in zip(Genetics.state_fields, genetics_state):
+        setattr(worm.genetics, field, value)
+    worm.genetics.genome = genome
+    return worm
+
+
+def _tile_worker(world_object: TileWorld, processors: List[WorldProcessor],
+                 connection, barrier, halo_names: Tuple[str, str], tiles: int) -> None:
+    """Steps the tile on the commands of the coordinator."""
+    health_memory = shared_memory.SharedMemory(name=halo_names[0])
+    food_memory = shared_memory.SharedMemory(name=halo_names[1])
+    shape = (tiles, 2, world_object.height)
+    halo_health = np.ndarray(shape, dtype=np.float64, buffer=health_memory.buf)
+    halo_food = np.ndarray(shape, dtype=bool, buffer=food_memory.buf)
+    index = world_object.index
+    try:
+        while True:
+            command, weather = connection.recv()
+            if command == 'stop':
+                break
+            world_object.set_weather(weather)
+            world_object.start_tick()
+            migrations = 0
+            for proc in processors:
+                if isinstance(proc, HALO_PROCESSORS):
+                    halo_health[index], halo_food[index] = world_object.edges()
+                    barrier.wait()
+                    if index > 0:
+                        world_object.halo_health[0] = halo_health[index - 1, 1]
+                        world_object.halo_food[0] = halo_food[index - 1, 1]
+                    if index < tiles - 1:
+                        world_object.halo_health[1] = halo_health[index + 1, 0]
+                        world_object.halo_food[1] = halo_food[index + 1, 0]
+                proc.process(world_object)
+                if isinstance(proc, MIGRATING_PROCESSORS):
+                    emigrants = world_object.take_emigrants()
+                    migrations += sum(len(worms) + len(food) for worms, food in emigrants.values())
+                    connection.send(emigrants)
+                    world_object.accept_immigrants(*connection.recv())
+            world_object.tick += 1
+            connection.send({'worms': len(world_object.worms),
+                             'food': world_object.food_count(),
+                             'migrations': migrations})
+    except threading.BrokenBarrierError:
+        pass
+    except Exception:  # pylint: disable=broad-except
+        barrier.abort()
+        connection.send(('error', traceback.format_exc()))
+    finally:
+        for proc in processors:
+            proc.close()
+        del halo_health, halo_food
+        health_memory.close()
+        food_memory.close()
+
+
+class TiledSimulation:
+    """Runs the pipeline of processors on the map split into tiles,
+    every tile in its own process with its own stream of random values.
+    The coordinator runs the weather processors and routes migrating objects,
+    visualizer and analytics processors are not run.
+    Movements look at the neighbour tiles as they were before the movement phase,
+    so the result is statistically equivalent, not identical,
+    to the run of a single world."""
+
+    def __init__(self, height: int, width: int, worms_num: int, food_num: int,
+                 processors: List[WorldProcessor], tiles: int = 2,
+                 columnar: bool = False, seed: Optional[int] = None,
+                 food_field: bool = False):
+        self.bounds = tile_bounds(width, tiles)
+        self.tiles = tiles
+        self.tick = 0
+        self.failed = False
+        seeds = [int(sequence.generate_state(1, np.uint64)[0])
+                 for sequence in np.random.SeedSequence(seed).spawn(tiles + 1)]
+        self.weather_world = World(height, width, 0, 0, seed=seeds[0])
+        self.weather_processors = [proc for proc in processors
+                                   if isinstance(proc, WEATHER_PROCESSORS)]
+        tile_processors = [proc for proc in processors
+                           if not isinstance(proc, WEATHER_PROCESSORS + SKIPPED_PROCESSORS)]
+        if any(isinstance(proc, SKIPPED_PROCESSORS) for proc in processors):
+            logging.warning('Visualizer and analytics are not run on tiles')
+        self.migration_phases = sum(isinstance(proc, MIGRATING_PROCESSORS)
+                                    for proc in tile_processors)
+
+        shares = np.diff(self.bounds) / width
+        worms_split = self.weather_world.rng.multinomial(worms_num, shares).tolist()
+        food_split = self.weather_world.rng.multinomial(food_num, shares).tolist()
+
+        halo_size = tiles * 2 * height
+        self._halo_health = shared_memory.SharedMemory(create=True, size=halo_size * 8)
+        self._halo_food = shared_memory.SharedMemory(create=True, size=halo_size)
+        barrier = multiprocessing.Barrier(tiles)
+        self._connections = []
+        self._workers = []
+        for index in range(tiles):
+            world_object = TileWorld(height, width, self.bounds, index,
+                                     worms_split[index], food_split[index],
+                                     columnar, seeds[index + 1], food_field)
+            connection, worker_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target=_tile_worker, daemon=True,
+                args=(world_object, tile_processors, worker_connection, barrier,
+                      (self._halo_health.name, self._halo_food.name), tiles))
+            worker.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._workers.append(worker)
+
+    @classmethod
+    def from_config(cls, config: configparser.ConfigParser,
+                    processors: List[WorldProcessor]) -> 'TiledSimulation':
+        """Creates the simulation with the WORLD settings and tiles from the EXECUTION section."""
+        seed = config.get('WORLD', 'seed', fallback='')
+        return cls(config.getint('WORLD', 'height'), config.getint('WORLD', 'width'),
+                   config.getint('WORLD', 'worms_num'), config.getint('WORLD', 'food_num'),
+                   processors, config.getint('EXECUTION', 'tiles', fallback=1),
+                   config.getboolean('WORLD', 'columnar', fallback=False),
+                   int(seed) if seed else None,
+                   config.getboolean('WORLD', 'food_field', fallback=False))
+
+    def step(self) -> Dict[str, int]:
+        """Runs one tick on all tiles, returns totals over the map.
+        Raises RuntimeError if a tile has failed."""
+        for proc in self.weather_processors:
+            proc.process(self.weather_world)
+        weather = [(False, rain.get_state()) for rain in self.weather_world.rains] \
+            + [(True, tornado.get_state()) for tornado in self.weather_world.tornadoes]
+        for index in range(self.tiles):
+            self._send(index, ('tick', weather))
+
+        for _ in range(self.migration_phases):
+            incoming: List[Tuple[List[tuple], List[tuple]]] = [([], []) for _ in range(self.tiles)]
+            for index in range(self.tiles):
+                for target, (worms, food) in self._receive(index).items():
+                    incoming[target][0].extend(worms)
+                    incoming[target][1].extend(food)
+            for index, immigrants in enumerate(incoming):
+                self._send(index, immigrants)
+
+        totals = {'tick': self.tick, 'worms': 0, 'food': 0, 'migrations': 0,
+                  'rains': len(self.weather_world.rains),
+                  'tornadoes': len(self.weather_world.tornadoes)}
+        for index in range(self.tiles):
+            for name, value in self._receive(index).items():
+                totals[name] += value
+        self.tick += 1
+        return totals
+
+    def _send(self, index: int, message) -> None:
+        """Sends the message to the worker of the tile."""
+        try:
+            self._connections[index].send(message)
+        except OSError:
+            self._fail(index)
+
+    def _receive(self, index: int):
+        """Waits for the message of the worker of the tile,
+        checking that the worker is still running."""
+        connection = self._connections[index]
+        while not connection.poll(POLL_INTERVAL):
+            if self._workers[index].exitcode is not None and not connection.poll():
+                self._fail(index)
+        try:
+            message = connection.recv()
+        except EOFError:
+            self._fail(index)
+        if isinstance(message, tuple) and message[0] == 'error':
+            self._fail(index, message[1])
+        return message
+
+    def _fail(self, index: int, error: Optional[str] = None) -> None:
+        """Logs the error of the failed tile and raises RuntimeError.
+        A tile stopped by the failure of another one reports the error of that tile."""
+        self.failed = True
+        if error is None:
+            for connection in self._connections:
+                try:
+                    while error is None and connection.poll():
+                        message = connection.recv()
+                        if isinstance(message, tuple) and message[0] == 'error':
+                            error = message[1]
+                except (EOFError, OSError):
+                    continue
+        logging.error('Tile %s failed:\n%s', index, error or 'the worker has stopped')
+        raise RuntimeError('Tile worker failed')
+
+    def close(self) -> None:
+        """Stops the workers and frees the shared memory,
+        workers of a failed simulation are terminated."""
+        try:
+            for connection in self._connections:
+                try:
+                    connection.send(('stop', None))
+                except OSError:
+                    continue
+            for worker in self._workers:
+                worker.join(None if not self.failed else POLL_INTERVAL * 10)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
+            for connection in self._connections:
+                connection.close()
+        finally:
+            for memory in (self._halo_health, self._halo_food):
+                memory.close()
+                memory.unlink()
@@ -1,4 +1,6 @@
-"""The module contains classes of weather events (rain, tornado)."""
+"""The module contains classes of weather events (rain, tornado).
+Methods drawing random values take the source of them in rng,
+the random module is used by default."""
 from typing import List
 import random
 from operator import add
@@ -10,42 +12,41 @@ from resources.common_types import NEIGHBOURS_VALUES, tornado_scatter_values
 class WeatherEvent:
     """Base class for weather objects on the map."""
 
+    __slots__ = ('_zero_coordinates', '_side', '_duration', '_rectangle')
+
     def __init__(self, start_coordinates: tuple):
         self._zero_coordinates = start_coordinates
         self._side: int = 0
         self._duration: int = 0
-        self._all_coordinates: List = []
+        self._rectangle: tuple = (0, 0, 0, 0)
+
+    @classmethod
+    def from_state(cls, state: tuple, border_x: int, border_y: int) -> 'WeatherEvent':
+        """Creates the weather object from the values returned by get_state
+        without drawing random values."""
+        weather_event = cls.__new__(cls)
+        WeatherEvent.__init__(weather_event, (0, 0))
+        weather_event.set_state(state)
+        weather_event.upscaling(border_x, border_y)
+        return weather_event
+
+    def get_state(self) -> tuple:
+        """Returns (x, y, side, duration) of the weather object."""
+        return self._zero_coordinates + (self._side, self._duration)
+
+    def set_state(self, state: tuple) -> None:
+        """Restores the weather object from the values returned by get_state."""
+        x, y, self._side, self._duration = state[:4]
+        self._zero_coordinates = (x, y)
 
     def upscaling(self, border_x: int, border_y: int) -> None:
-        """Creates a list of coordinates according to the size of the weather object."""
-        coordinates = []
-        step_forward = (1, 0)
-        step_down = (0, 1)
-        line_begin_coordinates = self._zero_coordinates
-        for row_id in range(self._side):
-            line_coordinates: List[tuple] = []
-            for column_id in range(self._side):
-                if column_id == 0:
-                    last_coordinates = None
-                else:
-                    last_coordinates = line_coordinates.pop()
-                    line_coordinates.append(last_coordinates)
-
-                if last_coordinates is None:
-                    line_coordinates.append(line_begin_coordinates)
-                else:
-                    next_coordinates_raw = tuple(map(add, step_forward, last_coordinates))
-                    next_coordinates = (
-                        min(max(next_coordinates_raw[0], 0), border_x - 1),
-                        min(max(next_coordinates_raw[1], 0), border_y - 1)
-                    )
-                    if next_coordinates not in line_coordinates:
-                        line_coordinates.append(next_coordinates)
-            coordinates.extend(line_coordinates)
-            line_begin_coordinates_raw = tuple(map(add, step_down, line_begin_coordinates))
-            line_begin_coordinates = (line_begin_coordinates_raw[0],
-                                      min(max(line_begin_coordinates_raw[1], 0), border_y - 1))
-        self._all_coordinates = coordinates
+        """Updates the area of the weather object according to its size.
+        The area is a square clamped by the borders of the map."""
+        x_begin = min(max(self._zero_coordinates[0], 0), border_x - 1)
+        y_begin = min(max(self._zero_coordinates[1], 0), border_y - 1)
+        self._rectangle = (x_begin, y_begin,
+                           min(x_begin + self._side, border_x),
+                           min(y_begin + self._side, border_y))
 
     @property
     def duration(self):
@@ -69,9 +70,22 @@ class WeatherEvent:
         return self._duration <= 0
 
     @property
-    def all_coordinates(self) -> List:
+    def rectangle(self) -> tuple:
+        """Returns the area of the weather object
+        as (x_begin, y_begin, x_end, y_end), the ends are exclusive."""
+        return self._rectangle
+
+    @property
+    def area(self) -> int:
+        """Returns the number of cells covered by the weather object."""
+        x_begin, y_begin, x_end, y_end = self._rectangle
+        return (x_end - x_begin) * (y_end - y_begin)
+
+    @property
+    def all_coordinates(self) -> List[tuple]:
         """Returns all coordinates at which the weather event is located."""
-        return self._all_coordinates
+        x_begin, y_begin, x_end, y_end = self._rectangle
+        return [(x, y) for y in range(y_begin, y_end) for x in range(x_begin, x_end)]
 
     def get_side(self) -> int:
         """Returns side of a square of the weather object."""
@@ -83,11 +97,11 @@ class WeatherEvent:
 
     side = property(get_side, set_side)
 
-    def move(self, border_x: int, border_y: int) -> None:
+    def move(self, border_x: int, border_y: int, rng=random) -> None:
         """Moving method on the map."""
         if not self.is_over:
             self.decrease_duration()
-            step = random.choice(NEIGHBOURS_VALUES)
+            step = rng.choice(NEIGHBOURS_VALUES)
             new_coordinates = tuple(map(add, step, self._zero_coordinates))
             new_x = min(max(new_coordinates[0], 0), border_x - 1)
             new_y = min(max(new_coordinates[1], 0), border_y - 1)
@@ -99,72 +113,91 @@ class Rain(WeatherEvent):
     that reduces the health and damage of worms,
     reduce nutritive_value of food objects."""
 
-    def __init__(self, start_coordinates: tuple):
+    health_penalty = 0.2
+    damage_penalty = 0.1
+    nutrition_penalty = 0.5
+
+    __slots__ = ()
+
+    def __init__(self, start_coordinates: tuple, rng=random):
         super().__init__(start_coordinates)
-        self._side: int = random.randrange(3, 8)
-        self._duration: int = random.randrange(20, 50)
-        self._all_coordinates: List = []
+        self._side: int = rng.randrange(3, 8)
+        self._duration: int = rng.randrange(20, 50)
 
-    @staticmethod
-    def raining_effect(affected_worms: List[Worm], affected_food: List[Food]) -> None:
+    @classmethod
+    def raining_effect(cls, affected_worms: List[Worm], affected_food: List[Food],
+                       intensity: int = 1) -> None:
         """The effect of reducing the characteristics
-        of worms and food objects caught in the affected area."""
+        of worms and food objects caught in the affected area.
+        The intensity is the number of rains covering the objects."""
         if len(affected_worms) > 0:
             for worm in affected_worms:
-                worm.health -= 0.2
-                worm.damage -= 0.1
+                worm.health -= cls.health_penalty * intensity
+                worm.damage -= cls.damage_penalty * intensity
 
         if len(affected_food) > 0:
             for item in affected_food:
-                item.nutritional_value -= 0.5
+                item.nutritional_value -= cls.nutrition_penalty * intensity
 
 
 class Tornado(WeatherEvent):
     """An object on the map scattering worms and food objects
     on definite number of cells to the sides."""
 
-    def __init__(self, start_coordinates: tuple):
+    __slots__ = ('_charge', '_direction')
+
+    def __init__(self, start_coordinates: tuple, rng=random):
         super().__init__(start_coordinates)
-        self._side: int = random.randrange(3, 8)
-        self._duration: int = random.randrange(60, 100)
-        self._all_coordinates: List = []
+        self._side: int = rng.randrange(3, 8)
+        self._duration: int = rng.randrange(60, 100)
         self._charge: int = 20
-        self._direction = random.choice(NEIGHBOURS_VALUES)
+        self._direction = rng.choice(NEIGHBOURS_VALUES)
+
+    def get_state(self) -> tuple:
+        """Returns (x, y, side, duration, charge, direction x, direction y) of the tornado."""
+        return super().get_state() + (self._charge,) + self._direction
+
+    def set_state(self, state: tuple) -> None:
+        """Restores the tornado from the values returned by get_state."""
+        super().set_state(state)
+        self._charge = state[4]
+        self._direction = (state[5], state[6])
 
     @staticmethod
     def tornado_effect(affected_worms: List[Worm],
-                       affected_food: List[Food], border_x: int, border_y: int):
-        """Scattering worms and food objects in the affected area."""
+                       affected_food: List[Food], border_x: int, border_y: int, rng=random):
+        """Scattering worms and food objects in the affected area,
+        throws for all objects are drawn at once."""
         if len(affected_worms) > 0:
-            for worm in affected_worms:
-                throw = random.choice(tornado_scatter_values)
+            throws = rng.choices(tornado_scatter_values, k=len(affected_worms))
+            for worm, throw in zip(affected_worms, throws):
                 worm.move(throw, border_x, border_y)
 
         if len(affected_food) > 0:
-            for food in affected_food:
-                throw = random.choice(tornado_scatter_values)
+            throws = rng.choices(tornado_scatter_values, k=len(affected_food))
+            for food, throw in zip(affected_food, throws):
                 food.relocation(throw, border_x, border_y)
 
-    def move(self, border_x: int, border_y: int) -> None:
+    def move(self, border_x: int, border_y: int, rng=random) -> None:
         """Moving method on the map with limitation movements in one direction."""
         if not self.is_over:
             self.decrease_duration()
             if self._charge <= 0:
-                self._direction = random.choice(NEIGHBOURS_VALUES)
+                self._direction = rng.choice(NEIGHBOURS_VALUES)
                 self._charge = 10
             self._charge -= 1
             new_coordinates = tuple(map(add, self._direction, self._zero_coordinates))
             new_x = min(max(new_coordinates[0], 0), border_x - 1)
             if new_x in (0, border_x - 1):
-                new_direction = random.choice(NEIGHBOURS_VALUES)
+                new_direction = rng.choice(NEIGHBOURS_VALUES)
                 while new_direction == self._direction:
-                    new_direction = random.choice(NEIGHBOURS_VALUES)
+                    new_direction = rng.choice(NEIGHBOURS_VALUES)
                 self._direction = new_direction
 
             new_y = min(max(new_coordinates[1], 0), border_y - 1)
             if new_y in (0, border_x - 1):
-                new_direction = random.choice(NEIGHBOURS_VALUES)
+                new_direction = rng.choice(NEIGHBOURS_VALUES)
                 while new_direction == self._direction:
-                    new_direction = random.choice(NEIGHBOURS_VALUES)
+                    new_direction = rng.choice(NEIGHBOURS_VALUES)
                 self._direction = new_direction
             self._zero_coordinates = (new_x, new_y)
@@ -1,37 +1,76 @@
 """The module contains World class
 with all cell search methods."""
-from typing import Dict, List
+import gc
+from contextlib import contextmanager
+from itertools import chain
+from operator import attrgetter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 import random
 
-from src.active_characters import Worm, Food, Genes, create_genome
+import numpy as np
+
+from src.active_characters import BaseWorm, Worm, Food, Genes, Genetics, Genome, \
+    genes_variations, intern_genome, GENOME_LENGTH
+from src.arena import Arena
+from src.food_field import FoodField
+from src.grid import Grid
+from src.instrumentation import Instrumentation
+from src.journal import Journal
+from src.population import Population, ColumnarWorm
 from src.weather import Rain, Tornado
 from resources.common_types import Neighbors, NEIGHBOURS_VALUES
+from resources.names import NAMES
 
 
-class Cell:
-    """Container with objects located at certain coordinates on the map."""
-
-    def __init__(self):
-        self.worms = []
-        self.food = []
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """Pauses the cyclic garbage collector while many objects are created,
+    otherwise every few hundred new objects make it scan the young objects
+    and the growing older generations again."""
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
 
 
 class World:
-    """The main class in which the mechanics are implemented."""
+    """The main class in which the mechanics are implemented.
+    The world owns the sources of random values:
+    random for single draws and rng for drawing arrays at once,
+    both are created from the seed, so seeded runs are reproducible.
+    With food_field set food is kept in the FoodField arrays of cells
+    instead of food objects.
+    While journal is set, changes of the map made through the world
+    are noted in it."""
 
     def __init__(self, height: int = 100, width: int = 100,
-                 worms_num: int = 250, food_num: int = 1000):
-        self.cells: Dict[tuple, Cell] = {}
-        self.worms: List[Worm] = []
-        self.food: List[Food] = []
-
-        for y in range(height):
-            for x in range(width):
-                self.cells[(x, y)] = Cell()
+                 worms_num: int = 250, food_num: int = 1000,
+                 columnar: bool = False, seed: Optional[int] = None,
+                 food_field: bool = False):
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.rng = np.random.default_rng(seed)
+        self.grid = Grid(height, width)
+        self.worms = Arena()
+        self.food = Arena()
+        self.population: Optional[Population] = None
+        self._initiative_order: Optional[List[Worm]] = None
+        self._dead_worms: Optional[List[Worm]] = None
+        self.instrumentation = Instrumentation()
+        self.journal: Optional[Journal] = None
+        if columnar:
+            self.population = Population(max(worms_num, 1) * 2)
+        self.food_field: Optional[FoodField] = FoodField(self.grid) if food_field else None
 
         self.rains: List[Rain] = []
         self.tornadoes: List[Tornado] = []
         self.name: str = 'World'
+        self.tick: int = 0
+        self.births: int = 0
+        self.deaths: int = 0
         self.height = height
         self.width = width
 
@@ -40,54 +79,284 @@ class World:
 
     def get_random_pos(self) -> tuple:
         """get a random coordinates on the map."""
-        return random.randrange(0, self.width), random.randrange(0, self.height)
+        return self.random.randrange(0, self.width), self.random.randrange(0, self.height)
+
+    def get_random_positions(self, number: int) -> List[tuple]:
+        """get a list of random coordinates on the map."""
+        xs = self.rng.integers(0, self.width, size=number).tolist()
+        ys = self.rng.integers(0, self.height, size=number).tolist()
+        return list(zip(xs, ys))
 
     def populate(self, worms_num: int = 250) -> None:
         """Places a given number of worms at random map coordinates."""
-        for i in range(worms_num):
-            pos = self.get_random_pos()
-            worm = Worm(pos)
-            worm.genetics.genotype = create_genome()
-            worm.newborn_genetics_boost(worm.genetics.genotype)
-            self.cells[pos].worms.append(worm)
-            self.worms.append(worm)
+        positions = self.get_random_positions(worms_num)
+        genomes = self.rng.integers(0, len(genes_variations),
+                                    size=(worms_num, GENOME_LENGTH)).astype(np.uint8)
+        counts = np.stack([np.count_nonzero(genomes == code, axis=1)
+                           for code in range(len(genes_variations))], axis=1)
+        codes = genomes.tobytes()
+        with paused_gc():
+            shared_genomes = [
+                intern_genome(codes[index * GENOME_LENGTH:(index + 1) * GENOME_LENGTH],
+                              genome_counts)
+                for index, genome_counts in enumerate(map(tuple, counts.tolist()))]
+            self.spawn_worms(positions, shared_genomes)
+
+    def spawn_worms(self, positions: List[tuple], genomes: List[Genome],
+                    families: Optional[List[int]] = None,
+                    generations: Optional[List[float]] = None) -> List[BaseWorm]:
+        """Creates newborn worms with the shared genomes at the positions
+        in one batch and places them on the map.
+        Characteristics of all worms are drawn at once and the bonuses
+        of the genomes are given like by newborn_genetics_boost.
+        Worms without given families found new ones."""
+        with paused_gc():
+            return self._spawn_worms(positions, genomes, families, generations)
+
+    def _spawn_worms(self, positions: List[tuple], genomes: List[Genome],
+                     families: Optional[List[int]],
+                     generations: Optional[List[float]]) -> List[BaseWorm]:
+        """Creates the worms for spawn_worms."""
+        number = len(positions)
+        if number == 0:
+            return []
+        bonuses = np.array([genome.bonuses for genome in genomes], dtype=np.int64)
+        health_bonuses, damage_bonuses, energetic_bonuses, defense_bonuses = bonuses.T
+        name_indices = self.rng.integers(0, len(NAMES), size=number).tolist()
+        health = self.rng.integers(6, 10, size=number) + Genes.HEALTH.value * health_bonuses
+        damage = self.rng.integers(1, 4, size=number) + Genes.DAMAGE.value * damage_bonuses
+        defense = self.rng.uniform(0.8, 0.95, size=number)
+        for bonus in range(int(defense_bonuses.max())):
+            defense = np.where(bonus < defense_bonuses,
+                               np.maximum(defense - Genes.DEFENSE.value, 0.2), defense)
+        initiative = self.rng.integers(1, 4, size=number)
+        energy = 100 + Genes.ENERGY.value * energetic_bonuses
+        if families is None:
+            families = self.rng.integers(np.iinfo(np.int64).max, size=number,
+                                         endpoint=True).tolist()
+        if generations is None:
+            generations = [0] * number
+        genetics = [Genetics.from_state(genome, (family, energetic_pool, health_pool,
+                                                 damage_pool, defense_pool,
+                                                 energetic_bonus, health_bonus,
+                                                 damage_bonus, defense_bonus))
+                    for genome, family, (health_pool, damage_pool, energetic_pool, defense_pool),
+                    (health_bonus, damage_bonus, energetic_bonus, defense_bonus)
+                    in zip(genomes, families, (genome.pools for genome in genomes),
+                           (genome.bonuses for genome in genomes))]
+
+        xs, ys = np.array(positions, dtype=np.int64).reshape(-1, 2).T
+        if self.population is not None:
+            worms: List[BaseWorm] = ColumnarWorm.spawn(
+                self.population,
+                {'health': health, 'damage': damage, 'defense': defense,
+                 'initiative': initiative, 'energy': energy, 'level': 1,
+                 'generation': np.asarray(generations, dtype=np.float64), 'x': xs, 'y': ys},
+                name_indices, genetics)
+        else:
+            worms = [Worm.from_state(position, (name_index, worm_health, worm_damage,
+                                                worm_defense, worm_initiative, worm_energy,
+                                                1, 0, 0, 0, generation, 0), worm_genetics)
+                     for position, name_index, worm_health, worm_damage, worm_defense,
+                     worm_initiative, worm_energy, generation, worm_genetics
+                     in zip(positions, name_indices, health.tolist(), damage.tolist(),
+                            defense.tolist(), initiative.tolist(), energy.tolist(),
+                            generations, genetics)]
+        self.grid.add_worms(ys * self.width + xs, worms)
+        self.worms.extend(worms)
+        self._initiative_order = None
+        if self.journal is not None:
+            self.journal.add_worms(worms)
+        return worms
+
+    def create_worm(self, pos: tuple) -> BaseWorm:
+        """Creates a worm, backed by the population store
+        if the world is columnar."""
+        if self.population is not None:
+            return ColumnarWorm(pos, self.population, self.random)
+        return Worm(pos, self.random)
+
+    def add_worm(self, worm: Worm) -> None:
+        """Places the worm on the map."""
+        self.grid.add_worm(self.grid.cell_id(worm.coordinates), worm)
+        self.worms.append(worm)
+        self._initiative_order = None
+        if self.journal is not None:
+            self.journal.add_worms([worm])
+
+    def remove_worm(self, worm: Worm) -> None:
+        """Removes the worm from the map and frees its slot in the store."""
+        if self.journal is not None:
+            self.journal.remove_worm(worm)
+        self.grid.remove_worm(self.grid.cell_id(worm.coordinates), worm)
+        self.worms.remove(worm)
+        self._initiative_order = None
+        if self.population is not None:
+            self.population.release(worm.slot)
+
+    def move_worm(self, worm: Worm, step: tuple) -> None:
+        """Moves the worm and updates the cells it left and entered."""
+        self.grid.remove_worm(self.grid.cell_id(worm.coordinates), worm)
+        worm.move(step, self.width, self.height)
+        self.grid.add_worm(self.grid.cell_id(worm.coordinates), worm)
+        if self.journal is not None:
+            self.journal.move_worm(worm)
+
+    def add_food(self, food_unit: Food) -> None:
+        """Places the food object on the map,
+        in the food field only its nutritional value is kept."""
+        if self.food_field is not None:
+            self.food_field.sow(np.array([self.grid.cell_id(food_unit.coordinates)]),
+                                np.array([food_unit.nutritional_value]))
+            return
+        self.grid.add_food(self.grid.cell_id(food_unit.coordinates), food_unit)
+        self.food.append(food_unit)
+        if self.journal is not None:
+            self.journal.add_food(food_unit)
+
+    def remove_food(self, food_unit: Food) -> None:
+        """Removes the food object from the map."""
+        if self.journal is not None:
+            self.journal.remove_food(food_unit)
+        self.grid.remove_food(self.grid.cell_id(food_unit.coordinates), food_unit)
+        self.food.remove(food_unit)
+
+    def worm_coordinates(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns arrays of x and y coordinates of all worms."""
+        if self.population is not None:
+            mask = self.population.mask()
+            return self.population.column('x')[mask], self.population.column('y')[mask]
+        return self._coordinates_of(self.worms)
+
+    def worm_generations(self) -> np.ndarray:
+        """Returns array of generations of all worms
+        in the same order as worm_coordinates."""
+        if self.population is not None:
+            return self.population.column('generation')[self.population.mask()]
+        return np.fromiter((worm.get_generation() for worm in self.worms),
+                           dtype=np.float64, count=len(self.worms))
+
+    def worm_characteristics(self, names: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Returns arrays of characteristics of all worms by the names of population columns
+        in the same order as worm_coordinates, all of them are taken in one pass over worms."""
+        if self.population is not None:
+            mask = self.population.mask()
+            return {name: self.population.column(name)[mask] for name in names}
+        getter = attrgetter(*('_' + name for name in names))
+        rows = np.array([getter(worm) for worm in self.worms],
+                        dtype=np.float64).reshape(-1, len(names))
+        return dict(zip(names, rows.T))
+
+    def gene_counts(self) -> np.ndarray:
+        """Returns numbers of genes of every type of all worms, one row per worm
+        in the same order as worm_coordinates, columns follow genes_variations."""
+        if self.population is not None:
+            owners = self.population.owners
+            worms = [owners[slot] for slot in self.population.active_slots().tolist()]
+        else:
+            worms = self.worms
+        return np.array([worm.genetics.shared_genome.counts for worm in worms],
+                        dtype=np.int64).reshape(-1, len(genes_variations))
+
+    def food_coordinates(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns arrays of x and y coordinates of all food objects,
+        of the cells with food for the food field."""
+        if self.food_field is not None:
+            return self.food_field.coordinates()
+        return self._coordinates_of(self.food)
+
+    def food_count(self) -> int:
+        """Returns the number of food units on the map."""
+        if self.food_field is not None:
+            return len(self.food_field)
+        return len(self.food)
+
+    @staticmethod
+    def _coordinates_of(objects) -> Tuple[np.ndarray, np.ndarray]:
+        """Collects coordinates of the objects into arrays."""
+        coordinates = np.fromiter(chain.from_iterable(item.coordinates for item in objects),
+                                  dtype=np.int64, count=2 * len(objects)).reshape(-1, 2)
+        return coordinates[:, 0], coordinates[:, 1]
 
     def sow_food(self, food_num: int = 1000) -> None:
         """Places a given number of food objects at random map coordinates."""
-        for i in range(food_num):
-            pos = self.get_random_pos()
-            food_unit = Food(pos)
-            self.cells[pos].food.append(food_unit)
-            self.food.append(food_unit)
+        positions = self.get_random_positions(food_num)
+        nutritional_values = self.rng.integers(1, 6, size=food_num)
+        if self.food_field is not None:
+            xs, ys = np.array(positions, dtype=np.int64).reshape(-1, 2).T
+            self.food_field.sow(ys * self.width + xs, nutritional_values)
+            return
+        for pos, nutritional_value in zip(positions, nutritional_values.tolist()):
+            self.add_food(Food(pos, nutritional_value))
 
     def rain_emergence(self) -> None:
         """creates a new Rain object."""
-        self.rains.append(Rain(self.get_random_pos()))
+        self.rains.append(Rain(self.get_random_pos(), self.random))
 
     def tornado_emergence(self) -> None:
         """creates a new Tornado object."""
-        self.tornadoes.append(Tornado(self.get_random_pos()))
+        self.tornadoes.append(Tornado(self.get_random_pos(), self.random))
 
     @property
     def worms_by_initiative(self) -> List[Worm]:
-        """Sorts list of worms by initiative."""
-        return sorted(self.worms, key=lambda worm: worm.get_initiative())
+        """List of worms sorted by initiative.
+        The order is kept until a worm is born, dies or levels up,
+        the returned list must not be changed."""
+        if self._initiative_order is None:
+            buckets: Dict[int, List[Worm]] = {}
+            for worm in self.worms:
+                buckets.setdefault(worm.get_initiative(), []).append(worm)
+            order: List[Worm] = []
+            for initiative in sorted(buckets):
+                order.extend(buckets[initiative])
+            self._initiative_order = order
+        return self._initiative_order
+
+    def start_tick(self) -> None:
+        """Forgets what was found during the previous tick,
+        called before the processors of every tick."""
+        self._dead_worms = None
+
+    def dead_worms(self) -> List[Worm]:
+        """Returns the dead worms in the order of worms.
+        The list is found by the first call in the tick and kept until take_dead_worms
+        or the start of the next tick, worms dying after that call are found in the next tick.
+        The returned list must not be changed."""
+        if self._dead_worms is None:
+            if self.population is not None and not (
+                    self.population.column('health')[self.population.mask()] <= 0).any():
+                self._dead_worms = []
+            else:
+                self._dead_worms = [worm for worm in self.worms if worm.dead]
+        return self._dead_worms
+
+    def take_dead_worms(self) -> List[Worm]:
+        """Returns the dead worms of the tick and forgets them,
+        the next call of dead_worms searches again."""
+        dead = self.dead_worms()
+        self._dead_worms = None
+        return dead
+
+    def initiative_changed(self) -> None:
+        """Drops the order of worms by initiative after level ups."""
+        self._initiative_order = None
 
     def worms_at(self, location_cell: tuple) -> List[Worm]:
         """Returns list of worms located on the cell."""
-        if location_cell in self.cells:
-            return self.cells[location_cell].worms
+        if self.grid.contains(location_cell):
+            return self.grid.worms_in(self.grid.cell_id(location_cell))
         return []
 
     def food_at(self, location_cell: tuple) -> List[Food]:
         """Returns list of food objects located on the cell."""
-        if location_cell in self.cells:
-            return self.cells[location_cell].food
+        if self.grid.contains(location_cell):
+            return self.grid.food_in(self.grid.cell_id(location_cell))
         return []
 
     def has_food_at(self, location_cell: tuple) -> bool:
         """True if in the cell located food."""
-        return location_cell in self.cells and len(self.cells[location_cell].food) > 0
+        return self.grid.contains(location_cell) \
+            and self.grid.has_food(self.grid.cell_id(location_cell))
 
     @staticmethod
     def move(pos, direction):
@@ -99,21 +368,28 @@ class World:
         neighbours_worms = {}
 
         x, y = location_cell[0], location_cell[1]
+        cell_id = self.grid.cell_id(location_cell)
+        width = self.grid.width
 
         if y > 0:
-            neighbours_worms[Neighbors.UP] = \
-                self.worms_at(self.move(location_cell, Neighbors.UP.value))
+            neighbours_worms[Neighbors.UP] = self.grid.worms_in(cell_id - width)
         if y < border_y - 1:
-            neighbours_worms[Neighbors.DOWN] = \
-                self.worms_at(self.move(location_cell, Neighbors.DOWN.value))
+            neighbours_worms[Neighbors.DOWN] = self.grid.worms_in(cell_id + width)
         if x > 0:
-            neighbours_worms[Neighbors.LEFT] = \
-                self.worms_at(self.move(location_cell, Neighbors.LEFT.value))
+            neighbours_worms[Neighbors.LEFT] = self.grid.worms_in(cell_id - 1)
         if x < border_x - 1:
-            neighbours_worms[Neighbors.RIGHT] = \
-                self.worms_at(self.move(location_cell, Neighbors.RIGHT.value))
+            neighbours_worms[Neighbors.RIGHT] = self.grid.worms_in(cell_id + 1)
         return neighbours_worms
 
+    def movement_maps(self, cells: np.ndarray,
+                      healths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the highest health of the worms with the given cell ids and healths
+        in every cell, 0 for cells without living worms,
+        and the mask of cells with food. Both are indexed by cell ids."""
+        danger = np.zeros(self.height * self.width, dtype=np.float64)
+        np.maximum.at(danger, cells, healths)
+        return danger, self.grid.food_counts > 0
+
     def get_neighbours_food(self, location_cell: tuple) -> List[Neighbors]:
         """Returns list of neighbours cells with food."""
         neighbours_food = []
@@ -126,49 +402,59 @@ class World:
         """Compares the genotype lengths of the worms in the cell
         and returns the highest value."""
         genotype_owners = self.worms_at(location_cell)
-        lengths = [len(creature.genetics.genotype) for creature in genotype_owners]
+        lengths = [len(creature.genetics.genome) for creature in genotype_owners]
         return max(lengths, default=0)
 
+    def families_at(self, location_cell: tuple) -> Dict[int, List[Worm]]:
+        """Returns the index of families of the worms in the cell:
+        members of every family in the order of the cell."""
+        families: Dict[int, List[Worm]] = {}
+        for worm in self.worms_at(location_cell):
+            families.setdefault(worm.genetics.family, []).append(worm)
+        return families
+
     def worms_is_not_relatives(self, location_cell: tuple) -> List[Worm]:
-        """Returns a list of non-related worms with unique genotypes."""
+        """Returns a list of non-related worms with unique genotypes,
+        the first worm of every family in the cell."""
         worms_at_location = self.worms_at(location_cell)
         if len(worms_at_location) == 1:
             return worms_at_location
-        families: List[float] = []
-        worms_is_not_relatives = []
-        for worm in worms_at_location:
-            if len(families) == 0:
-                families.append(worm.genetics.family_affinity)
-                worms_is_not_relatives.append(worm)
-                continue
-            overlap = False
-            for family in families:
-                if abs(worm.genetics.family_affinity - family) < 1e-12:
-                    overlap = True
-                    break
-            if overlap is False:
-                families.append(worm.genetics.family_affinity)
-                worms_is_not_relatives.append(worm)
-        return worms_is_not_relatives
-
-    def genetic_variability(self, location_cell: tuple) -> List[Genes]:
-        """Shuffles parental genotypes into a new one."""
+        return [members[0] for members in self.families_at(location_cell).values()]
+
+    def genetic_variability(self, location_cell: tuple) -> bytes:
+        """Shuffles parental genomes into a new one."""
         parents = self.worms_is_not_relatives(location_cell)
-        if len(parents) == 1 and len(parents[0].genetics.genotype) > 0:
-            return parents[0].genetics.genotype
-        new_genotype = []
-        new_genotype_length = self.get_the_longest_genotype_at(location_cell)
-        gene_counter = 0
-        while gene_counter <= new_genotype_length:
-            if len(parents) > 0:
-                for parent in parents:
-                    try:
-                        new_genotype.append(parent.genetics.genotype[gene_counter])
-
-                    except IndexError:
-                        parents.remove(parent)
-                        gene_counter -= 1
-                    gene_counter += 1
-            else:
-                break
-        return new_genotype
+        return self.crossover([[parent.genetics.genome for parent in parents]])[0]
+
+    @staticmethod
+    def crossover(parents_genomes: List[List[bytes]]) -> List[bytes]:
+        """Shuffles every group of parental genomes into a new one,
+        all groups are mixed at once in a padded array
+        of shape (groups, parents, genes).
+        Parents give genes in turn: the gene at the position i is taken
+        from the parent number i modulo the number of parents
+        having the position, counting only them.
+        A single parent passes its genome unchanged."""
+        children: List[bytes] = [genomes[0] if len(genomes) == 1 else b''
+                                 for genomes in parents_genomes]
+        mixed = [index for index, genomes in enumerate(parents_genomes) if len(genomes) > 1]
+        if not mixed:
+            return children
+        lengths = np.zeros((len(mixed), max(len(parents_genomes[index]) for index in mixed)),
+                           dtype=np.int64)
+        for row, index in enumerate(mixed):
+            lengths[row, :len(parents_genomes[index])] = [len(genome) for genome
+                                                           in parents_genomes[index]]
+        positions = np.arange(lengths.max())
+        has_position = positions < lengths[:, :, None]
+        genes = np.zeros(has_position.shape, dtype=np.uint8)
+        genes[has_position] = np.frombuffer(
+            b''.join(genome for index in mixed for genome in parents_genomes[index]),
+            dtype=np.uint8)
+        rank = np.cumsum(has_position, axis=1) - 1
+        turn = positions % np.maximum(has_position.sum(axis=1), 1)
+        donors = np.argmax(has_position & (rank == turn[:, None, :]), axis=1)
+        mixed_genes = np.take_along_axis(genes, donors[:, None, :], axis=1)[:, 0, :]
+        for row, index in enumerate(mixed):
+            children[index] = mixed_genes[row, :lengths[row].max()].tobytes()
+        return children
@@ -0,0 +1,212 @@
+"""Parameter sweep over variants of config.ini.
+Expands the grid of WORLD parameters, processor sets and seeds
+from a sweep file, runs every simulation headless for a fixed number
+of ticks in a process pool and appends summaries of the runs
+as JSON lines to the results file. Runs already present
+in the results file are skipped, so a stopped sweep can be resumed.
+Every run writes its files into its own directory under runs_directory.
+
+Run from the repository root:
+    python sweep.py resources/sweep.ini"""
+import argparse
+import concurrent.futures
+import configparser
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterator, List, Set
+
+import worms
+from src.instrumentation import Instrumentation
+
+
+def read_sweep(path: str) -> configparser.ConfigParser:
+    """Reads the sweep file."""
+    sweep = configparser.ConfigParser()
+    sweep.optionxform = str
+    if not sweep.read(path):
+        logging.error('Sweep file is not found')
+        raise ValueError('Sweep file is not found')
+    return sweep
+
+
+def split_values(value: str) -> List[str]:
+    """Splits a comma separated list of values."""
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def expand_runs(sweep: configparser.ConfigParser) -> Iterator[Dict]:
+    """Yields settings of every run of the grid.
+    Every option of the WORLD section lists the values to try,
+    every option of the PROCESSOR_SETS section names a set of disabled processors."""
+    world_grid = {option: split_values(value) for option, value in sweep.items('WORLD')} \
+        if sweep.has_section('WORLD') else {}
+    processor_sets = {name: split_values(value) for name, value in sweep.items('PROCESSOR_SETS')} \
+        if sweep.has_section('PROCESSOR_SETS') else {'all': []}
+    seeds = [int(seed) for seed in split_values(sweep.get('SWEEP', 'seeds', fallback='0'))]
+    ticks = sweep.getint('SWEEP', 'ticks', fallback=1000)
+
+    for values in itertools.product(*world_grid.values()):
+        for processor_set, disabled in processor_sets.items():
+            for seed in seeds:
+                yield {'world': dict(zip(world_grid, values)),
+                       'processor_set': processor_set,
+                       'disabled': disabled,
+                       'seed': seed,
+                       'ticks': ticks}
+
+
+def run_key(run: Dict) -> str:
+    """Returns the identifier of the run in the results file."""
+    return json.dumps({'world': run['world'], 'processor_set': run['processor_set'],
+                       'seed': run['seed'], 'ticks': run['ticks']}, sort_keys=True)
+
+
+def run_id(run: Dict) -> str:
+    """Returns the short name of the run used for its output directory."""
+    return hashlib.sha1(run_key(run).encode('utf-8')).hexdigest()[:12]
+
+
+def run_config(run: Dict, base_config: str,
+               runs_directory: str = 'sweep_runs') -> configparser.ConfigParser:
+    """Returns the base config changed for the run:
+    parameters of the world, seed, disabled processors and no visualization.
+    Analytics, checkpoints, event logs and frames of the run are written
+    into its own directory, runs_directory/run_id."""
+    config = configparser.ConfigParser()
+    config.read(base_config)
+    for option, value in run['world'].items():
+        config.set('WORLD', option, value)
+    config.set('WORLD', 'seed', str(run['seed']))
+    run_directory = os.path.join(runs_directory, run_id(run))
+    for section, option, path in (('ANALYTICS', 'path', run_directory),
+                                  ('VISUALIZER', 'path', run_directory),
+                                  ('CHECKPOINT', 'directory',
+                                   os.path.join(run_directory, 'checkpoints')),
+                                  ('EVENTS', 'directory', os.path.join(run_directory, 'events'))):
+        if not config.has_section(section):
+            config.add_section(section)
+        config.set(section, option, path)
+    enabled = {option.lower() for option in config.options('PROCESSORS')}
+    for processor in run['disabled'] + ['Visualizer']:
+        if processor.lower() not in enabled:
+            logging.error('Unknown processor')
+            raise ValueError('Unknown processor')
+        config.set('PROCESSORS', processor, 'False')
+    return config
+
+
+def run_simulation(run: Dict, base_config: str, runs_directory: str = 'sweep_runs') -> Dict:
+    """Runs the simulation of the run and returns its summary.
+    The run stops early if all worms die."""
+    config = run_config(run, base_config, runs_directory)
+    start = time.perf_counter()
+    world = worms.create_world(config)
+    world.instrumentation = Instrumentation(enabled=True)
+    processors = worms.build_processors(config)
+    extinction_tick = None
+    try:
+        for _ in range(run['ticks']):
+            world.instrumentation.run_tick(world, processors)
+            if len(world.worms) == 0:
+                extinction_tick = world.tick
+                break
+    finally:
+        for proc in processors:
+            proc.close()
+
+    generations = [worm.get_generation() for worm in world.worms]
+    levels = [worm.get_level() for worm in world.worms]
+    return {'key': run_key(run),
+            'run_id': run_id(run),
+            'world': run['world'],
+            'processor_set': run['processor_set'],
+            'seed': run['seed'],
+            'ticks': world.tick,
+            'worms': len(world.worms),
+            'food': world.food_count(),
+            'extinction_tick': extinction_tick,
+            'max_generation': max(generations, default=0),
+            'mean_level': sum(levels) / len(levels) if levels else 0,
+            'counters': dict(world.instrumentation.counters),
+            'seconds': time.perf_counter() - start}
+
+
+def completed_runs(output: str) -> Set[str]:
+    """Returns keys of the runs already finished in the results file,
+    failed runs are not counted, so they are run again."""
+    if not os.path.exists(output):
+        return set()
+    keys = set()
+    with open(output, encoding='utf-8') as reader:
+        for line in reader:
+            try:
+                result = json.loads(line)
+                if 'error' not in result:
+                    keys.add(result['key'])
+            except (ValueError, KeyError):
+                continue
+    return keys
+
+
+def failed_run(run: Dict, error: BaseException) -> Dict:
+    """Returns the record of the run stopped by the error."""
+    return {'key': run_key(run),
+            'run_id': run_id(run),
+            'world': run['world'],
+            'processor_set': run['processor_set'],
+            'seed': run['seed'],
+            'error': f'{type(error).__name__}: {error}'}
+
+
+def run_sweep(runs: List[Dict], base_config: str, output: str, workers: int = 0,
+              runs_directory: str = 'sweep_runs') -> int:
+    """Runs the runs missing in the results file in a process pool,
+    appends every summary as soon as the run finishes.
+    A failed run is appended with its error and does not stop the others.
+    Returns the number of finished runs."""
+    done = completed_runs(output)
+    pending = [run for run in runs if run_key(run) not in done]
+    logging.info('Sweep: %d runs, %d already done', len(runs), len(runs) - len(pending))
+    finished = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers or None) as executor, \
+            open(output, 'a', encoding='utf-8') as writer:
+        futures = {executor.submit(run_simulation, run, base_config, runs_directory): run
+                   for run in pending}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result = future.result()
+                finished += 1
+            except Exception as error:  # pylint: disable=broad-except
+                logging.error('Run %s failed: %s', run_key(futures[future]), error)
+                result = failed_run(futures[future], error)
+            writer.write(json.dumps(result) + '\n')
+            writer.flush()
+    return finished
+
+
+def main() -> None:
+    """Runs the sweep described in the sweep file."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sweep', help='sweep file')
+    parser.add_argument('--config', default='resources/config.ini', help='base config')
+    parser.add_argument('--output', help='results file, the one of the sweep file if not set')
+    parser.add_argument('--workers', type=int, help='number of processes, all cores if 0')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        level=logging.INFO)
+    sweep = read_sweep(args.sweep)
+    output = args.output or sweep.get('SWEEP', 'output', fallback='sweep_results.jsonl')
+    workers = args.workers if args.workers is not None \
+        else sweep.getint('SWEEP', 'workers', fallback=0)
+    finished = run_sweep(list(expand_runs(sweep)), args.config, output, workers,
+                         sweep.get('SWEEP', 'runs_directory', fallback='sweep_runs'))
+    logging.info('Sweep: %d runs finished, results in %s', finished, output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1 @@
-__all__ = ["test_worm", "test_weather"]
+__all__ = ["test_worm", "test_weather", "test_population", "test_world", "test_arena", "test_processors", "test_frame_sinks", "test_instrumentation", "test_checkpoint", "test_tiles", "test_sweep", "test_food_field", "test_analytics", "test_replay"]
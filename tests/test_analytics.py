@@ -0,0 +1,124 @@
+import csv
+import os
+import tempfile
+import unittest
+import numpy as np
+from src import analytics_sinks
+from src import processors
+from src import world
+
+
+class CollectingSink(analytics_sinks.AnalyticsSink):
+    """Sink remembering written batches."""
+
+    def __init__(self):
+        self.batches = []
+        self.closed = False
+
+    def write(self, batch: dict) -> None:
+        self.batches.append(batch)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class AnalyticsTest(unittest.TestCase):
+    """General test class of the analytics records."""
+
+    def test_batches(self) -> None:
+        """Checks sampling of ticks, batches of records and their aggregates."""
+        test_world = world.World(5, 5, 20, 10, columnar=True, seed=1)
+        sink = CollectingSink()
+        analytics = processors.AnalyticsProcessor(sink, interval=2, batch_size=2)
+        for tick in range(7):
+            test_world.tick = tick
+            test_world.births += 3
+            analytics.process(test_world)
+        self.assertEqual(len(sink.batches), 1)
+        analytics.close()
+        self.assertTrue(sink.closed)
+        self.assertEqual([batch['tick'].tolist() for batch in sink.batches], [[1, 3], [5]])
+
+        batch = sink.batches[0]
+        self.assertEqual(list(batch), processors.AnalyticsProcessor.columns())
+        self.assertEqual(batch['births'].tolist(), [6, 6])
+        self.assertEqual(batch['worms'][0], 20)
+        self.assertEqual(batch['food'][0], 10)
+        self.assertEqual(batch['generation_0'][0], 20)
+        self.assertAlmostEqual(batch['mean_health'][0],
+                               np.mean([worm.get_health() for worm in test_world.worms]))
+        self.assertAlmostEqual(sum(batch[name][0] for name in batch if name.startswith('genes_')),
+                               1)
+
+    def test_same_records(self) -> None:
+        """Checks that worlds of worm objects and of the columnar store give the same records."""
+        records = []
+        for columnar in (False, True):
+            sink = CollectingSink()
+            analytics = processors.AnalyticsProcessor(sink)
+            analytics.process(world.World(6, 6, 30, 0, columnar=columnar, seed=4))
+            analytics.close()
+            records.append({name: column.tolist() for name, column in sink.batches[0].items()})
+        self.assertEqual(records[0], records[1])
+
+    def test_background_writer(self) -> None:
+        """Checks that batches are written in order from the analytics thread."""
+        sink = CollectingSink()
+        writer = analytics_sinks.AsyncAnalyticsSink(sink, queue_size=1)
+        self.assertEqual(writer._thread.name, 'analytics-sink')
+        for tick in range(5):
+            writer.write({'tick': np.array([tick])})
+        writer.close()
+        self.assertEqual([batch['tick'].tolist() for batch in sink.batches],
+                         [[tick] for tick in range(5)])
+        self.assertTrue(sink.closed)
+
+    def test_files(self) -> None:
+        """Checks records written to the CSV file and to the NumPy archives."""
+        batch = {'tick': np.array([0, 1]), 'mean_health': np.array([1.5, 2.0])}
+        with tempfile.TemporaryDirectory() as directory:
+            sink = analytics_sinks.CsvSink(os.path.join(directory, 'analytics.csv'))
+            sink.write(batch)
+            sink.write(batch)
+            sink.close()
+            with open(os.path.join(directory, 'analytics.csv'), encoding='utf-8') as reader:
+                rows = list(csv.reader(reader))
+            self.assertEqual(rows[0], ['tick', 'mean_health'])
+            self.assertEqual(rows[1:], [['0', '1.5'], ['1', '2.0']] * 2)
+
+            sink = analytics_sinks.NpzSink(os.path.join(directory, 'analytics'))
+            sink.write(batch)
+            sink.write(batch)
+            sink.close()
+            columns = analytics_sinks.read_npz(os.path.join(directory, 'analytics'))
+            self.assertEqual(columns['tick'].tolist(), [0, 1, 0, 1])
+
+    def test_resumed_files(self) -> None:
+        """Checks that sinks of a resumed run continue the files of the first run."""
+        first = {'tick': np.arange(12), 'mean_health': np.zeros(12)}
+        resumed = {'tick': np.array([12]), 'mean_health': np.ones(1)}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'analytics.csv')
+            for batch in (first, resumed):
+                sink = analytics_sinks.CsvSink(path)
+                sink.write(batch)
+                sink.close()
+            with open(path, encoding='utf-8') as reader:
+                rows = list(csv.reader(reader))
+            self.assertEqual(rows[0], ['tick', 'mean_health'])
+            self.assertEqual([int(row[0]) for row in rows[1:]], list(range(13)))
+
+            path = os.path.join(directory, 'analytics')
+            sink = analytics_sinks.NpzSink(path)
+            for tick in range(12):
+                sink.write({name: column[tick:tick + 1] for name, column in first.items()})
+            sink.close()
+            sink = analytics_sinks.NpzSink(path)
+            self.assertEqual(sink.count, 12)
+            sink.write(resumed)
+            sink.close()
+            self.assertEqual(analytics_sinks.read_npz(path)['tick'].tolist(), list(range(13)))
+
+
+if __name__ == '__main__':
+    unittest.main()
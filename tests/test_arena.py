@@ -0,0 +1,36 @@
+import unittest
+from src import arena
+from src import active_characters
+
+
+class ArenaTest(unittest.TestCase):
+    """General test class of the collection with stable ids."""
+
+    def test_remove(self) -> None:
+        """Checks that removal keeps ids of remaining objects."""
+        collection = arena.Arena()
+        food = [active_characters.Food((0, 0)) for _ in range(4)]
+        for food_unit in food:
+            collection.append(food_unit)
+        collection.remove(food[1])
+        self.assertEqual(len(collection), 3)
+        self.assertNotIn(food[1], collection)
+        for food_unit in (food[0], food[2], food[3]):
+            self.assertIs(collection.get(food_unit.uid), food_unit)
+
+    def test_free_ids(self) -> None:
+        """Checks that ids of removed objects are reused."""
+        collection = arena.Arena()
+        first = active_characters.Food((0, 0))
+        second = active_characters.Food((0, 0))
+        collection.append(first)
+        removed_uid = first.uid
+        collection.remove(first)
+        collection.append(second)
+        self.assertEqual(second.uid, removed_uid)
+        self.assertEqual(first.uid, -1)
+        self.assertEqual(list(collection), [second])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from src import checkpoint
+from src import processors
+from src import world
+
+
+class CheckpointTest(unittest.TestCase):
+    """General test class of saving and restoring of worlds."""
+
+    @staticmethod
+    def pipeline() -> list:
+        return [processors.AddFoodProcessor(), processors.AgingProcessor(),
+                processors.WeatherEventsEmergenceProcessor(), processors.WeatherMovementsProcessor(),
+                processors.WeatherEffectsProcessor(), processors.WormsMovementProcessor(),
+                processors.FightProcessor(), processors.LevelUpProcessor(),
+                processors.FoodPickUpProcessor(), processors.EatenFoodRemover(),
+                processors.DeadWormsRemover(), processors.WormDivisionProcessor(),
+                processors.MutationProcessor(), processors.WeatherEventsRemover()]
+
+    @staticmethod
+    def run_ticks(test_world: world.World, pipeline: list, ticks: int) -> None:
+        for _ in range(ticks):
+            test_world.instrumentation.run_tick(test_world, pipeline)
+
+    @staticmethod
+    def describe(test_world: world.World) -> list:
+        return [[(worm.uid, worm.coordinates, worm.get_state(), list(worm.genetics.genotype))
+                 for worm in test_world.worms],
+                [(food.uid, food.coordinates, food.nutritional_value) for food in test_world.food],
+                [] if test_world.food_field is None
+                else [test_world.food_field.counts.tolist(), test_world.food_field.nutrition.tolist()],
+                [weather_event.get_state() for weather_event
+                 in test_world.rains + test_world.tornadoes]]
+
+    def test_resume(self) -> None:
+        """Checks that a restored world continues exactly like the saved one."""
+        for columnar, food_field in ((False, False), (True, False), (False, True)):
+            test_world = world.World(20, 20, 60, 100, columnar=columnar, seed=5,
+                                     food_field=food_field)
+            pipeline = self.pipeline()
+            self.run_ticks(test_world, pipeline, 10)
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'saved')
+                checkpoint.save(test_world, path, pipeline)
+                restored_pipeline = self.pipeline()
+                restored = checkpoint.load(path, restored_pipeline)
+
+            self.assertEqual(restored.tick, 10)
+            self.assertEqual(self.describe(restored), self.describe(test_world))
+            self.assertEqual(restored_pipeline[10].dead_worms, pipeline[10].dead_worms)
+            self.run_ticks(test_world, pipeline, 10)
+            self.run_ticks(restored, restored_pipeline, 10)
+            self.assertEqual(self.describe(restored), self.describe(test_world))
+
+    def test_checkpointer(self) -> None:
+        """Checks periodic saving and removal of old checkpoints."""
+        test_world = world.World(10, 10, 10, 10, seed=1)
+        with tempfile.TemporaryDirectory() as directory:
+            checkpointer = checkpoint.Checkpointer(directory, interval=2, keep=2)
+            for _ in range(6):
+                test_world.tick += 1
+                checkpointer.after_tick(test_world, [])
+            checkpointer.close()
+            self.assertEqual(sorted(os.listdir(directory)), ['tick_4', 'tick_6'])
+            self.assertEqual(checkpoint.latest(directory), os.path.join(directory, 'tick_6'))
+            self.assertEqual(len(checkpoint.load(checkpoint.latest(directory)).worms), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
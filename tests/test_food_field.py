@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+from src import processors
+from src import weather
+from src import world
+
+
+class FoodFieldTest(unittest.TestCase):
+    """General test class of the food kept in arrays of cells."""
+
+    def test_eating(self) -> None:
+        """Checks that a worm eats one unit of the cell with the mean nutritional value."""
+        test_world = world.World(3, 3, 0, 0, food_field=True)
+        test_world.food_field.sow(np.array([4, 4, 4]), np.array([1, 2, 3]))
+        self.assertTrue(test_world.has_food_at((1, 1)))
+        worm = test_world.create_worm((1, 1))
+        worm.health = 5
+        test_world.add_worm(worm)
+
+        processors.FoodPickUpProcessor().process(test_world)
+        self.assertEqual(worm.get_health(), 7)
+        self.assertEqual(worm.get_energy(), 110)
+        self.assertEqual(test_world.food_count(), 2)
+        self.assertEqual(test_world.food_field.nutrition[4], 4)
+
+    def test_rain_and_removal(self) -> None:
+        """Checks that rains spoil units and spoiled cells are emptied."""
+        test_world = world.World(10, 10, 0, 0, food_field=True)
+        test_world.food_field.sow(np.array([0, 0, 99]), np.array([1, 2, 1]))
+        rain = weather.Rain((0, 0))
+        rain.side = 3
+        rain.upscaling(10, 10)
+        test_world.rains = [rain, rain, rain]
+
+        processors.WeatherEffectsProcessor().process(test_world)
+        self.assertAlmostEqual(test_world.food_field.nutrition[0], 0)
+        self.assertEqual(test_world.food_field.nutrition[99], 1)
+        processors.EatenFoodRemover().process(test_world)
+        self.assertFalse(test_world.has_food_at((0, 0)))
+        self.assertEqual(test_world.food_count(), 1)
+
+    def test_tornado_scatter(self) -> None:
+        """Checks that the tornado moves units out of its area and keeps their value."""
+        test_world = world.World(20, 20, 0, 0, seed=3, food_field=True)
+        test_world.food_field.sow(np.full(40, 10 * 20 + 10), np.full(40, 2))
+        tornado = weather.Tornado((9, 9))
+        tornado.side = 3
+        tornado.upscaling(20, 20)
+        test_world.tornadoes.append(tornado)
+
+        processors.WeatherEffectsProcessor().process(test_world)
+        self.assertEqual(test_world.food_count(), 40)
+        self.assertAlmostEqual(test_world.food_field.nutrition.sum(), 80)
+        self.assertFalse(test_world.has_food_at((10, 10)))
+        food_x, food_y = test_world.food_coordinates()
+        self.assertTrue(set(zip(food_x.tolist(), food_y.tolist()))
+                        <= {(15, 10), (5, 10), (10, 15), (10, 5)})
+
+
+if __name__ == '__main__':
+    unittest.main()
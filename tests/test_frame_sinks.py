@@ -0,0 +1,63 @@
+import threading
+import unittest
+import numpy as np
+from src import frame_sinks
+
+
+class CollectingSink(frame_sinks.FrameSink):
+    """Sink remembering written frames."""
+
+    def __init__(self):
+        self.frames = []
+        self.closed = False
+        self.release = threading.Event()
+        self.release.set()
+
+    def write(self, frame: np.ndarray) -> None:
+        self.release.wait()
+        self.frames.append(int(frame[0, 0, 0]))
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class AsyncSinkTest(unittest.TestCase):
+    """General test class of the background frame writer."""
+
+    @staticmethod
+    def frame(number: int) -> np.ndarray:
+        return np.full((2, 2, 3), number, dtype='uint8')
+
+    def test_block(self) -> None:
+        """Checks that all frames are written in order."""
+        sink = CollectingSink()
+        writer = frame_sinks.AsyncSink(sink, queue_size=2)
+        for number in range(10):
+            writer.write(self.frame(number))
+        writer.close()
+        self.assertEqual(sink.frames, list(range(10)))
+        self.assertTrue(sink.closed)
+
+    def test_drop_oldest(self) -> None:
+        """Checks that the newest frames are kept when the queue is full."""
+        sink = CollectingSink()
+        sink.release.clear()
+        writer = frame_sinks.AsyncSink(sink, queue_size=2, overflow='drop_oldest')
+        writer.write(self.frame(0))
+        while not writer._queue.empty():
+            pass
+        for number in range(1, 6):
+            writer.write(self.frame(number))
+        sink.release.set()
+        writer.close()
+        self.assertEqual(sink.frames, [0, 4, 5])
+        self.assertEqual(writer.dropped_frames, 3)
+
+    def test_unknown_policy(self) -> None:
+        """Checks the error on an unknown overflow policy."""
+        with self.assertRaises(ValueError):
+            frame_sinks.AsyncSink(CollectingSink(), overflow='wait')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from src import instrumentation
+from src import processors
+from src import world
+
+
+class InstrumentationTest(unittest.TestCase):
+    """General test class of measuring of processors."""
+
+    def test_disabled(self) -> None:
+        """Checks that a disabled instrumentation only runs processors."""
+        test_world = world.World(10, 10, 20, 20)
+        measurer = instrumentation.Instrumentation()
+        test_world.instrumentation = measurer
+        measurer.run_tick(test_world, [processors.AgingProcessor(), processors.FightProcessor()])
+        self.assertEqual(test_world.worms[0].get_age(), 1)
+        self.assertEqual(measurer.summary()['processors'], {})
+        self.assertEqual(measurer.counters, {})
+
+    def test_timings_and_counters(self) -> None:
+        """Checks collected timings and counters of events."""
+        test_world = world.World(3, 3, 30, 0)
+        measurer = instrumentation.Instrumentation(enabled=True, window=2)
+        test_world.instrumentation = measurer
+        pipeline = [processors.AgingProcessor(), processors.FightProcessor()]
+        for _ in range(3):
+            measurer.run_tick(test_world, pipeline)
+
+        summary = measurer.summary()
+        self.assertEqual(summary['tick'], 3)
+        self.assertEqual(set(summary['processors']), {'AgingProcessor', 'FightProcessor'})
+        self.assertEqual(set(summary['processors']['AgingProcessor']), {'p50', 'p90', 'p99'})
+        self.assertGreater(measurer.counters['strikes'], 0)
+        self.assertEqual(len(measurer._timings['AgingProcessor']), 2)
+
+    def test_moves(self) -> None:
+        """Checks that only worms which changed their cell are counted as moves."""
+        test_world = world.World(8, 8, 40, 10, seed=3)
+        for worm in test_world.worms[::2]:
+            worm.energy = 0
+        measurer = instrumentation.Instrumentation(enabled=True)
+        test_world.instrumentation = measurer
+        before = [worm.coordinates for worm in test_world.worms]
+        measurer.run_tick(test_world, [processors.WormsMovementProcessor()])
+        moved = sum(worm.coordinates != coordinates
+                    for worm, coordinates in zip(test_world.worms, before))
+        self.assertGreater(moved, 0)
+        self.assertEqual(measurer.counters['moves'], moved)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import copy
+import pickle
+import sys
+import unittest
+from src import active_characters
+from src import population
+from src import processors
+from src import world
+
+
+class PopulationTest(unittest.TestCase):
+    """General test class of the columnar population store."""
+
+    def test_worm_view(self) -> None:
+        """Checks that worm characteristics are kept in the columns."""
+        store = population.Population(1)
+        first = population.ColumnarWorm((1, 2), store)
+        second = population.ColumnarWorm((3, 4), store)
+        second.health = 7
+        second.move((1, 0), 10, 10)
+        self.assertEqual(store.health[second.slot], 7)
+        self.assertEqual(second.coordinates, (4, 4))
+        self.assertEqual(first.coordinates, (1, 2))
+        self.assertEqual(len(store), 2)
+
+    def test_compact_view(self) -> None:
+        """Checks that the worm view keeps no slots for the characteristics kept in the columns."""
+        worm = population.ColumnarWorm((0, 0), population.Population(1))
+        self.assertFalse(hasattr(worm, '__dict__'))
+        self.assertNotIn('health', population.ColumnarWorm.__slots__)
+        self.assertLess(sys.getsizeof(worm), sys.getsizeof(active_characters.Worm((0, 0))))
+
+    def test_slot_reuse(self) -> None:
+        """Checks that slots of removed worms are reused."""
+        store = population.Population(4)
+        first = population.ColumnarWorm((0, 0), store)
+        population.ColumnarWorm((0, 0), store)
+        store.release(first.slot)
+        third = population.ColumnarWorm((0, 0), store)
+        self.assertEqual(third.slot, first.slot)
+        self.assertIs(store.owners[third.slot], third)
+
+    def test_vectorized_processors(self) -> None:
+        """Checks that array processors change worms like the per-worm ones."""
+        test_world = world.World(10, 10, 20, 0, columnar=True)
+        for worm in test_world.worms[:10]:
+            worm.energy = 0
+            worm.poisoned = 2
+        expected = [(worm.get_health() - 1.1 if worm.get_energy() <= 0 else worm.get_health(),
+                     worm.get_age() + 1) for worm in test_world.worms]
+        processors.AgingProcessor().process(test_world)
+        processors.ZeroEnergyProcessor().process(test_world)
+        processors.PoisonProcessor().process(test_world)
+        result = [(worm.get_health(), worm.get_age()) for worm in test_world.worms]
+        for (expected_health, expected_age), (health, age) in zip(expected, result):
+            self.assertAlmostEqual(health, expected_health)
+            self.assertEqual(age, expected_age)
+
+    def test_copy(self) -> None:
+        """Checks that copies of a columnar world have their own store and go on alike."""
+        test_world = world.World(10, 10, 30, 20, columnar=True, seed=3)
+        def describe(copied_world: world.World) -> list:
+            return [(worm.uid, worm.slot, worm.coordinates, worm.get_state(), worm.genetics.genome)
+                    for worm in copied_world.worms]
+
+        for copied in (copy.deepcopy(test_world), pickle.loads(pickle.dumps(test_world))):
+            self.assertEqual(describe(copied), describe(test_world))
+            self.assertIsNot(copied.population, test_world.population)
+            self.assertTrue(all(worm.store is copied.population for worm in copied.worms))
+            copied.worms[0].health = 100
+            self.assertNotEqual(test_world.worms[0].get_health(), 100)
+            copied.worms[0].health = test_world.worms[0].get_health()
+
+        copied = copy.deepcopy(test_world)
+        for run_world in (test_world, copied):
+            pipeline = [processors.AgingProcessor(), processors.WormsMovementProcessor(),
+                        processors.FightProcessor(), processors.DeadWormsRemover(),
+                        processors.WormDivisionProcessor()]
+            for _ in range(5):
+                for proc in pipeline:
+                    proc.process(run_world)
+        self.assertEqual(describe(copied), describe(test_world))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+import unittest
+import numpy as np
+from src import processors
+from src import world
+from src import active_characters
+from src import weather
+from resources.common_types import Colors
+
+
+class VisualizerTest(unittest.TestCase):
+    """General test class of the visualizing processor."""
+
+    def test_compose_frame(self) -> None:
+        """Checks colors and scale of the drawn map."""
+        test_world = world.World(3, 4, 0, 0)
+        young_worm = active_characters.Worm((1, 0))
+        old_worm = active_characters.Worm((2, 2))
+        old_worm.generation = 7
+        test_world.add_worm(young_worm)
+        test_world.add_worm(old_worm)
+        test_world.add_food(active_characters.Food((3, 1)))
+
+        frame = processors.Visualizer().compose_frame(test_world)
+        self.assertEqual(frame.shape, (12, 16, 3))
+        self.assertEqual(tuple(frame[0, 4]), Colors.WHITE.value)
+        self.assertEqual(tuple(frame[3, 7]), Colors.WHITE.value)
+        self.assertEqual(tuple(frame[11, 11]), Colors.WHITE.value)
+        self.assertEqual(tuple(frame[4, 12]), Colors.FOOD.value)
+        self.assertEqual(tuple(frame[0, 0]), Colors.SPACE.value)
+
+        young_worm.generation = 2
+        frame = processors.Visualizer().compose_frame(test_world)
+        self.assertEqual(tuple(frame[0, 4]), Colors.GREEN.value)
+
+
+class WeatherEffectsTest(unittest.TestCase):
+    """General test class of the weather effects processor."""
+
+    def test_rain_effect(self) -> None:
+        """Checks that overlapping rains stack and cover only their area."""
+        for columnar in (False, True):
+            test_world = world.World(10, 10, 0, 0, columnar=columnar)
+            inside = test_world.create_worm((2, 2))
+            overlapped = test_world.create_worm((4, 4))
+            outside = test_world.create_worm((9, 9))
+            for worm in (inside, overlapped, outside):
+                worm.health = 5
+                test_world.add_worm(worm)
+            food_unit = active_characters.Food((4, 4))
+            food_unit.nutritional_value = 3
+            test_world.add_food(food_unit)
+            for zero_coordinates in ((0, 0), (4, 4)):
+                rain = weather.Rain(zero_coordinates)
+                rain.side = 5
+                rain.upscaling(10, 10)
+                test_world.rains.append(rain)
+
+            processors.WeatherEffectsProcessor().process(test_world)
+            self.assertAlmostEqual(inside.get_health(), 4.8)
+            self.assertAlmostEqual(overlapped.get_health(), 4.6)
+            self.assertEqual(outside.get_health(), 5)
+            self.assertAlmostEqual(food_unit.nutritional_value, 2)
+
+    def test_tornado_effect(self) -> None:
+        """Checks that scattered worms are moved in the cells of the map."""
+        test_world = world.World(20, 20, 0, 0)
+        worm = active_characters.Worm((10, 10))
+        test_world.add_worm(worm)
+        tornado = weather.Tornado((9, 9))
+        tornado.side = 3
+        tornado.upscaling(20, 20)
+        test_world.tornadoes.append(tornado)
+
+        processors.WeatherEffectsProcessor().process(test_world)
+        self.assertNotEqual(worm.coordinates, (10, 10))
+        self.assertEqual(test_world.worms_at(worm.coordinates), [worm])
+        self.assertEqual(test_world.grid.worm_counts.sum(), 1)
+
+
+
+class MovementTest(unittest.TestCase):
+    """General test class of the movement decisions."""
+
+    def test_decisions(self) -> None:
+        """Checks that decisions taken for all worms at once match the decision of every worm."""
+        test_world = world.World(6, 6, 60, 30, seed=2)
+        for worm in test_world.worms:
+            worm.health = test_world.random.choice([0, 1, 2, 3])
+        grid = test_world.grid
+        cells = np.array([grid.cell_id(worm.coordinates) for worm in test_world.worms])
+        healths = np.array([worm.get_health() for worm in test_world.worms], dtype=np.float64)
+        danger, food = test_world.movement_maps(cells, healths)
+        decisions = processors.WormsMovementProcessor.decisions(
+            cells, healths, danger, food, grid.worm_counts, test_world.width, test_world.height)
+        self.assertEqual(decisions.tolist(),
+                         [processors.WormsMovementProcessor.decision(
+                             cell, health, danger, food, grid.worm_counts,
+                             test_world.width, test_world.height)
+                          for cell, health in zip(cells.tolist(), healths.tolist())])
+
+
+class FightTest(unittest.TestCase):
+    """General test class of the fights resolved by cells."""
+
+    @staticmethod
+    def run_fights(min_round_cells: int, columnar: bool = False) -> list:
+        test_world = world.World(4, 4, 200, 0, columnar=columnar, seed=4)
+        for worm in test_world.worms:
+            worm.energy = test_world.random.choice([0, 5, 100])
+        fight = processors.FightProcessor()
+        fight.min_round_cells = min_round_cells
+        for _ in range(3):
+            fight.process(test_world)
+        return [(worm.get_health(), worm.get_energy(), worm._experience, worm.poisoned)
+                for worm in test_world.worms]
+
+    def test_rounds(self) -> None:
+        """Checks that fights resolved in rounds give the same worms as worm by worm."""
+        by_rounds = self.run_fights(1)
+        self.assertEqual(by_rounds, self.run_fights(10 ** 6))
+        self.assertEqual(by_rounds, self.run_fights(1, columnar=True))
+
+    def test_strike_back(self) -> None:
+        """Checks that relatives do not fight and dead worms do not strike back."""
+        test_world = world.World(1, 1, 0, 0, seed=1)
+        strong = active_characters.Worm((0, 0))
+        weak = active_characters.Worm((0, 0))
+        strong.health, strong.damage = 10, 10
+        weak.health = 1
+        for worm in (strong, weak):
+            worm._defense = 1
+            test_world.add_worm(worm)
+        weak.genetics.family = strong.genetics.family
+        fight = processors.FightProcessor()
+        fight.process(test_world)
+        self.assertEqual((strong.get_health(), weak.get_health()), (10, 1))
+
+        weak.genetics.family = strong.genetics.family + 1
+        while weak.get_health() > 0:
+            fight.process(test_world)
+        health, experience = strong.get_health(), weak._experience
+        for _ in range(10):
+            fight.process(test_world)
+        self.assertEqual((strong.get_health(), weak._experience), (health, experience))
+        self.assertGreater(strong._experience, 0)
+
+
+class CorpseGrindingTest(unittest.TestCase):
+    """General test class of the grinding and removal of dead worms."""
+
+    def test_grinding(self) -> None:
+        """Checks bonuses for several dead worms of a cell and their removal."""
+        for columnar in (False, True):
+            test_world = world.World(3, 3, 0, 0, columnar=columnar)
+            eater, first, second, stranger = (test_world.create_worm(pos)
+                                              for pos in ((1, 1), (1, 1), (1, 1), (2, 2)))
+            for worm in (eater, first, second, stranger):
+                test_world.add_worm(worm)
+            first.health, second.health = 0, -1
+            health, energy = eater.get_health(), eater.get_energy()
+            bonus = sum(worm.get_level() + worm.get_damage() + worm.get_initiative()
+                        for worm in (first, second))
+
+            dead_worms = test_world.dead_worms()
+            processors.CorpseGrindingProcessor().process(test_world)
+            self.assertAlmostEqual(eater.get_health(), health + bonus)
+            self.assertAlmostEqual(eater.get_energy(), energy + bonus * 10)
+            self.assertIs(test_world.dead_worms(), dead_worms)
+
+            remover = processors.DeadWormsRemover()
+            remover.process(test_world)
+            self.assertEqual(remover.dead_worms, 2)
+            self.assertEqual(list(test_world.worms), [eater, stranger])
+            self.assertEqual(test_world.dead_worms(), [])
+
+    def test_late_deaths(self) -> None:
+        """Checks that a worm dying after the grinding is ground and removed in the next tick."""
+        for columnar in (False, True):
+            test_world = world.World(3, 3, 0, 0, columnar=columnar)
+            eater, victim = test_world.create_worm((1, 1)), test_world.create_worm((1, 1))
+            test_world.add_worm(eater)
+            test_world.add_worm(victim)
+            grinder, remover = processors.CorpseGrindingProcessor(), processors.DeadWormsRemover()
+            health = eater.get_health()
+            bonus = victim.get_level() + victim.get_damage() + victim.get_initiative()
+
+            test_world.start_tick()
+            grinder.process(test_world)
+            victim.health = 0
+            remover.process(test_world)
+            self.assertEqual(len(test_world.worms), 2)
+            for _ in range(2):
+                test_world.start_tick()
+                grinder.process(test_world)
+                remover.process(test_world)
+                self.assertAlmostEqual(eater.get_health(), health + bonus)
+                self.assertEqual(list(test_world.worms), [eater])
+
+            test_world.start_tick()
+            grinder.process(test_world)
+            eater.health = 0
+            test_world.start_tick()
+            self.assertEqual(test_world.dead_worms(), [eater])
+
+
+class FusedProcessorsTest(unittest.TestCase):
+    """General test class of the fused per-worm pass."""
+
+    @staticmethod
+    def pipeline() -> list:
+        return [processors.AgingProcessor(), processors.ZeroEnergyProcessor(),
+                processors.PoisonProcessor(), processors.LevelUpProcessor(),
+                processors.MutationProcessor(), processors.FightProcessor()]
+
+    @staticmethod
+    def run_ticks(pipeline: list) -> list:
+        test_world = world.World(4, 4, 40, 0, seed=7)
+        for worm in test_world.worms:
+            worm.energy = test_world.random.choice([0, 100])
+            worm.poisoned = test_world.random.randint(0, 2)
+        for _ in range(20):
+            for proc in pipeline:
+                proc.process(test_world)
+        return [(worm.get_health(), worm.get_age(), worm.get_level(),
+                 list(worm.genetics.genotype)) for worm in test_world.worms]
+
+    def test_fuse_processors(self) -> None:
+        """Checks grouping of per-worm processors."""
+        fused = processors.fuse_processors(self.pipeline())
+        self.assertEqual([type(proc) for proc in fused],
+                         [processors.FusedWormProcessor, processors.MutationProcessor,
+                          processors.FightProcessor])
+        self.assertEqual(len(fused[0].processors), 4)
+
+    def test_same_result(self) -> None:
+        """Checks that the fused pass gives the same worms as separate passes."""
+        self.assertEqual(self.run_ticks(self.pipeline()),
+                         self.run_ticks(processors.fuse_processors(self.pipeline())))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import unittest
+from src import checkpoint
+from src import replay
+from src import world
+from tests import test_checkpoint
+
+pipeline_of = test_checkpoint.CheckpointTest.pipeline
+describe = test_checkpoint.CheckpointTest.describe
+
+
+def describe_map(test_world: world.World) -> list:
+    food_field = test_world.food_field
+    return [[(worm.uid,) + worm.coordinates for worm in test_world.worms],
+            [(food.uid,) + food.coordinates + (food.nutritional_value,)
+             for food in test_world.food],
+            food_field.counts.tolist() if food_field is not None else [],
+            food_field.nutrition.tolist() if food_field is not None else [],
+            checkpoint.weather_records(test_world).tolist(),
+            (test_world.tick, test_world.births, test_world.deaths)]
+
+
+def describe_map_state(map_state: replay.MapState) -> list:
+    return [map_state.worms.tolist(), map_state.food.tolist(),
+            map_state.food_counts.tolist(), map_state.food_nutrition.tolist(),
+            map_state.weather.tolist(),
+            (map_state.tick, map_state.births, map_state.deaths)]
+
+
+class ReplayTest(unittest.TestCase):
+    """General test class of the event log and the replay of recorded worlds."""
+
+    def test_map_at(self) -> None:
+        """Checks that the map restored at every recorded tick is the simulated one
+        and that the whole world is restored only at keyframes."""
+        for columnar in (False, True):
+            for food_field in (False, True):
+                test_world = world.World(20, 20, 60, 100, columnar=columnar, seed=5,
+                                         food_field=food_field)
+                pipeline = pipeline_of()
+                with tempfile.TemporaryDirectory() as directory:
+                    recorder = replay.EventRecorder(directory, keyframe_interval=7)
+                    recorder.start(test_world, pipeline)
+                    states = {test_world.tick: describe(test_world)}
+                    maps = {test_world.tick: describe_map(test_world)}
+                    for _ in range(16):
+                        test_world.instrumentation.run_tick(test_world, pipeline)
+                        recorder.after_tick(test_world, pipeline)
+                        states[test_world.tick] = describe(test_world)
+                        maps[test_world.tick] = describe_map(test_world)
+                    recorder.close()
+                    self.assertIsNone(test_world.journal)
+
+                    log = replay.Replay(directory)
+                    self.assertEqual(log.keyframes, [0, 7, 14])
+                    self.assertEqual(log.ticks, range(17))
+                    for tick in log.ticks:
+                        self.assertEqual(describe_map_state(log.map_at(tick)), maps[tick])
+                        if tick in log.keyframes:
+                            restored = log.world_at(tick)
+                            self.assertEqual(describe(restored), states[tick])
+                            self.assertEqual(describe_map(restored), maps[tick])
+                        else:
+                            with self.assertRaises(ValueError):
+                                log.world_at(tick)
+                    with self.assertRaises(ValueError):
+                        log.map_at(17)
+
+    def test_new_recording(self) -> None:
+        """Checks that a new recording replaces the log and keyframes in the directory
+        and that a directory with other files is refused."""
+        test_world = world.World(10, 10, 10, 10, seed=1)
+        pipeline = pipeline_of()
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = replay.EventRecorder(directory, keyframe_interval=2)
+            for _ in range(5):
+                test_world.instrumentation.run_tick(test_world, pipeline)
+                recorder.after_tick(test_world, pipeline)
+            recorder.start(test_world, pipeline)
+            recorder.close()
+            log = replay.Replay(directory)
+            self.assertEqual(log.keyframes, [5])
+            self.assertEqual(log.ticks, range(5, 6))
+
+            os.makedirs(os.path.join(directory, 'tick_9'))
+            with self.assertRaises(ValueError):
+                recorder.start(test_world, pipeline)
+            self.assertTrue(os.path.isdir(os.path.join(directory, 'tick_9')))
+            self.assertTrue(os.path.isdir(os.path.join(directory, 'tick_5')))
+
+            with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as writer:
+                json.dump({'format': 0}, writer)
+            with self.assertRaises(ValueError):
+                replay.Replay(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
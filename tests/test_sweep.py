@@ -0,0 +1,72 @@
+import configparser
+import json
+import os
+import tempfile
+import unittest
+import sweep
+
+BASE_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'resources', 'config.ini')
+
+
+class SweepTest(unittest.TestCase):
+    """General test class of the parameter sweep."""
+
+    @staticmethod
+    def sweep_file() -> configparser.ConfigParser:
+        sweep_config = configparser.ConfigParser()
+        sweep_config.optionxform = str
+        sweep_config.read_string('[SWEEP]\nseeds = 1, 2\nticks = 5\n'
+                                 '[WORLD]\nheight = 10\nwidth = 10\nworms_num = 5, 10\n'
+                                 '[PROCESSOR_SETS]\nall =\n'
+                                 'no_weather = WeatherEventsEmergenceProcessor\n')
+        return sweep_config
+
+    def test_expand_runs(self) -> None:
+        """Checks the grid of parameters, processor sets and seeds."""
+        runs = list(sweep.expand_runs(self.sweep_file()))
+        self.assertEqual(len(runs), 8)
+        self.assertEqual(len({sweep.run_key(run) for run in runs}), 8)
+        self.assertEqual(runs[-1]['disabled'], ['WeatherEventsEmergenceProcessor'])
+
+        config = sweep.run_config(runs[-1], BASE_CONFIG)
+        self.assertEqual(config.get('WORLD', 'worms_num'), '10')
+        self.assertFalse(config.getboolean('PROCESSORS', 'visualizer'))
+        self.assertFalse(config.getboolean('PROCESSORS', 'weathereventsemergenceprocessor'))
+
+        paths = {sweep.run_config(run, BASE_CONFIG, 'runs').get('ANALYTICS', 'path')
+                 for run in runs}
+        self.assertEqual(len(paths), 8)
+        self.assertEqual(config.get('EVENTS', 'directory'),
+                         os.path.join('sweep_runs', sweep.run_id(runs[-1]), 'events'))
+
+    def test_resume(self) -> None:
+        """Checks that finished runs are skipped when the sweep is run again."""
+        runs = list(sweep.expand_runs(self.sweep_file()))
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.jsonl')
+            self.assertEqual(sweep.run_sweep(runs[:3], BASE_CONFIG, output, workers=2), 3)
+            self.assertEqual(sweep.run_sweep(runs, BASE_CONFIG, output, workers=2), 5)
+            with open(output, encoding='utf-8') as reader:
+                results = [json.loads(line) for line in reader]
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result['ticks'] <= 5 for result in results))
+
+    def test_failed_run(self) -> None:
+        """Checks that a failed run is recorded and does not stop the sweep."""
+        runs = list(sweep.expand_runs(self.sweep_file()))[:2]
+        runs[0] = dict(runs[0], processor_set='broken', disabled=['NoSuchProcessor'])
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.jsonl')
+            self.assertEqual(sweep.run_sweep(runs, BASE_CONFIG, output, workers=2,
+                                             runs_directory=directory), 1)
+            self.assertEqual(sweep.completed_runs(output), {sweep.run_key(runs[1])})
+            with open(output, encoding='utf-8') as reader:
+                results = {result['processor_set']: result
+                           for result in map(json.loads, reader)}
+        self.assertEqual(results['broken']['error'], 'ValueError: Unknown processor')
+        self.assertNotIn('error', results['all'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import configparser
+import unittest
+from multiprocessing import shared_memory
+import numpy as np
+import worms
+from resources.common_types import Neighbors
+from src import active_characters
+from src import processors
+from src import tiles
+
+
+class FailingProcessor(processors.WorldProcessor):
+    """Processor raising in the second tile at the third tick."""
+
+    def process(self, world_object: tiles.TileWorld) -> None:
+        if world_object.index == 1 and world_object.tick == 2:
+            raise ValueError('Tile failure')
+
+
+class TileWorldTest(unittest.TestCase):
+    """General test class of the world of one tile."""
+
+    def test_bounds(self) -> None:
+        """Checks splitting of columns between tiles."""
+        self.assertEqual(tiles.tile_bounds(10, 3), [0, 3, 6, 10])
+        with self.assertRaises(ValueError):
+            tiles.tile_bounds(10, 11)
+
+    def test_population_and_halo(self) -> None:
+        """Checks that objects are created in the tile and the halo is seen by neighbours."""
+        tile = tiles.TileWorld(10, 10, [0, 5, 10], 1, 20, 20, seed=1)
+        self.assertEqual(len(tile.worms), 20)
+        self.assertTrue(all(5 <= worm.coordinates[0] < 10 for worm in tile.worms))
+        self.assertTrue(all(5 <= food.coordinates[0] < 10 for food in tile.food))
+
+        tile.halo_health[0, 3] = 50
+        tile.halo_food[0, 4] = True
+        cells = np.array([tile.grid.cell_id(worm.coordinates) for worm in tile.worms])
+        healths = np.array([worm.get_health() for worm in tile.worms], dtype=np.float64)
+        danger, food = tile.movement_maps(cells, healths)
+        self.assertEqual(danger[tile.grid.cell_id((4, 3))], 50)
+        self.assertEqual(danger[tile.grid.cell_id((4, 4))], 0)
+        self.assertTrue(food[tile.grid.cell_id((4, 4))])
+        self.assertFalse(food[tile.grid.cell_id((4, 3))])
+
+    def test_migration(self) -> None:
+        """Checks that objects leaving the tile are passed to the neighbour."""
+        left = tiles.TileWorld(4, 4, [0, 2, 4], 0, seed=1)
+        right = tiles.TileWorld(4, 4, [0, 2, 4], 1, seed=2)
+        worm = active_characters.Worm((1, 1))
+        worm.health = 42
+        left.add_worm(worm)
+        left.add_food(active_characters.Food((2, 3), 4))
+        left.move_worm(worm, Neighbors.RIGHT.value)
+
+        emigrants = left.take_emigrants()
+        self.assertEqual(list(emigrants), [1])
+        right.accept_immigrants(*emigrants[1])
+        self.assertEqual(len(left.worms) + len(left.food), 0)
+        self.assertEqual(right.worms_at((2, 1))[0].get_health(), 42)
+        self.assertEqual(right.food_at((2, 3))[0].nutritional_value, 4)
+
+    def test_food_field_migration(self) -> None:
+        """Checks that units of the food field leaving the tile are passed to the neighbour."""
+        left = tiles.TileWorld(4, 4, [0, 2, 4], 0, seed=1, food_field=True)
+        right = tiles.TileWorld(4, 4, [0, 2, 4], 1, seed=2, food_field=True)
+        left.food_field.sow(np.array([14, 14]), np.array([4, 2]))
+
+        emigrants = left.take_emigrants()
+        right.accept_immigrants(*emigrants[1])
+        self.assertEqual(left.food_count(), 0)
+        self.assertEqual(right.food_field.counts[14], 2)
+        self.assertEqual(right.food_field.nutrition[14], 6)
+
+
+class TiledSimulationTest(unittest.TestCase):
+    """General test class of the simulation split into worker processes."""
+
+    @staticmethod
+    def run_ticks() -> list:
+        pipeline = [processors.AddFoodProcessor(), processors.WeatherEventsEmergenceProcessor(),
+                    processors.WeatherMovementsProcessor(), processors.WeatherEffectsProcessor(),
+                    processors.WormsMovementProcessor(), processors.FightProcessor(),
+                    processors.FoodPickUpProcessor(), processors.EatenFoodRemover(),
+                    processors.WeatherEventsRemover()]
+        simulation = tiles.TiledSimulation(20, 20, 60, 100, pipeline, tiles=2, seed=3)
+        try:
+            return [simulation.step() for _ in range(10)]
+        finally:
+            simulation.close()
+
+    def test_deterministic(self) -> None:
+        """Checks that a seeded tiled run is reproducible and keeps all worms."""
+        totals = self.run_ticks()
+        self.assertEqual(totals, self.run_ticks())
+        self.assertEqual(totals[-1]['worms'], 60)
+        self.assertGreater(sum(tick['migrations'] for tick in totals), 0)
+
+    def test_unsupported_settings(self) -> None:
+        """Checks that settings of the single world are refused with tiles."""
+        config = configparser.ConfigParser()
+        config.read_string('[EXECUTION]\ntiles = 2\n[CHECKPOINT]\ninterval = 0\nresume =\n')
+        worms.check_tiles_config(config)
+        for section, option, value in (('CHECKPOINT', 'interval', '10'),
+                                       ('CHECKPOINT', 'resume', 'latest'),
+                                       ('EVENTS', 'record', 'True'),
+                                       ('INSTRUMENTATION', 'enabled', 'True')):
+            changed = configparser.ConfigParser()
+            changed.read_dict(config)
+            if not changed.has_section(section):
+                changed.add_section(section)
+            changed.set(section, option, value)
+            with self.assertRaises(ValueError):
+                worms.check_tiles_config(changed)
+            changed.set('EXECUTION', 'tiles', '1')
+            worms.check_tiles_config(changed)
+
+    def test_failed_tile(self) -> None:
+        """Checks that a failing tile stops the simulation with an error
+        and that the shared memory is freed."""
+        pipeline = [FailingProcessor(), processors.WormsMovementProcessor(),
+                    processors.FightProcessor()]
+        simulation = tiles.TiledSimulation(20, 20, 60, 100, pipeline, tiles=2, seed=3)
+        names = (simulation._halo_health.name, simulation._halo_food.name)
+        try:
+            simulation.step()
+            simulation.step()
+            with self.assertLogs(level='ERROR') as logs, self.assertRaises(RuntimeError):
+                simulation.step()
+        finally:
+            simulation.close()
+        self.assertIn('ValueError: Tile failure', '\n'.join(logs.output))
+        for name in names:
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,7 +12,8 @@ class TestWeather(unittest.TestCase):
         weather_object = weather.Rain((0, 0))
         weather_object.side = 5
         weather_object.upscaling(3, 3)
-        self.assertEqual(len(weather_object.all_coordinates), 15)
+        self.assertEqual(weather_object.rectangle, (0, 0, 3, 3))
+        self.assertEqual(len(weather_object.all_coordinates), 9)
         self.assertEqual(max(weather_object.all_coordinates), (2, 2))
 
     def test_tornado_effect(self) -> None:
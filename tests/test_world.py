@@ -0,0 +1,148 @@
+import unittest
+from src import processors
+from src import world
+from src import active_characters
+from resources.common_types import Neighbors
+
+
+class WorldTest(unittest.TestCase):
+    """General test class of the world queries."""
+
+    def setUp(self) -> None:
+        self.world = world.World(5, 5, 0, 0)
+
+    def test_cell_queries(self) -> None:
+        """Checks searching worms and food by coordinates."""
+        worm = active_characters.Worm((1, 2))
+        food_unit = active_characters.Food((1, 2))
+        self.world.add_worm(worm)
+        self.world.add_food(food_unit)
+        self.assertEqual(self.world.worms_at((1, 2)), [worm])
+        self.assertEqual(self.world.food_at((1, 2)), [food_unit])
+        self.assertTrue(self.world.has_food_at((1, 2)))
+        self.assertFalse(self.world.has_food_at((2, 1)))
+        self.assertFalse(self.world.has_food_at((-1, 2)))
+        self.assertEqual(self.world.worms_at((5, 5)), [])
+
+        self.world.remove_food(food_unit)
+        self.assertFalse(self.world.has_food_at((1, 2)))
+
+    def test_move_worm(self) -> None:
+        """Checks updating of cells after the worm moves."""
+        worm = active_characters.Worm((0, 0))
+        self.world.add_worm(worm)
+        self.world.move_worm(worm, Neighbors.RIGHT.value)
+        self.assertEqual(self.world.worms_at((0, 0)), [])
+        self.assertEqual(self.world.worms_at((1, 0)), [worm])
+        self.assertEqual(self.world.grid.worm_counts.sum(), 1)
+
+    def test_neighbours(self) -> None:
+        """Checks neighbours of the cell at the border of the map."""
+        worm = active_characters.Worm((1, 0))
+        self.world.add_worm(worm)
+        self.world.add_food(active_characters.Food((0, 1)))
+        neighbours_worms = self.world.get_neighbours_worms((0, 0), 5, 5)
+        self.assertEqual(set(neighbours_worms), {Neighbors.DOWN, Neighbors.RIGHT})
+        self.assertEqual(neighbours_worms[Neighbors.RIGHT], [worm])
+        self.assertEqual(self.world.get_neighbours_food((0, 0)), [Neighbors.DOWN.value])
+
+    def test_worms_by_initiative(self) -> None:
+        """Checks the order of worms by initiative and its update."""
+        populated_world = world.World(5, 5, 30, 0)
+        order = populated_world.worms_by_initiative
+        self.assertEqual(order, sorted(populated_world.worms,
+                                       key=lambda worm: worm.get_initiative()))
+        self.assertIs(populated_world.worms_by_initiative, order)
+
+        last_worm = order[-1]
+        first_worm = order[0]
+        while first_worm.get_initiative() <= last_worm.get_initiative():
+            first_worm.level_up_initiative()
+        populated_world.initiative_changed()
+        self.assertIs(populated_world.worms_by_initiative[-1], first_worm)
+
+        populated_world.remove_worm(first_worm)
+        self.assertNotIn(first_worm, populated_world.worms_by_initiative)
+
+    def test_crossover(self) -> None:
+        """Checks mixing of parental genomes of several cells at once."""
+        children = world.World.crossover([[b'\x00\x00\x00\x00', b'\x01\x01\x01\x01'],
+                                          [b'\x02\x02\x02'],
+                                          [b'\x00', b'\x01\x01\x01', b'\x02\x02']])
+        self.assertEqual(children, [b'\x00\x01\x00\x01', b'\x02\x02\x02', b'\x00\x02\x01'])
+
+        test_world = world.World(3, 3, 0, 0)
+        for family, genotype in ((1, [active_characters.Genes.HEALTH] * 2),
+                                 (2, [active_characters.Genes.ENERGY] * 2)):
+            parent = active_characters.Worm((1, 1))
+            parent.genetics.family = family
+            parent.genetics.genotype = genotype
+            test_world.add_worm(parent)
+        self.assertEqual(test_world.worms[0].genetics.genotype, [active_characters.Genes.HEALTH] * 2)
+        mixed = test_world.genetic_variability((1, 1))
+        self.assertEqual(mixed, bytes([active_characters.GENE_CODES[active_characters.Genes.HEALTH],
+                                       active_characters.GENE_CODES[active_characters.Genes.ENERGY]]))
+
+    def test_families(self) -> None:
+        """Checks the index of families in a cell."""
+        test_world = world.World(3, 3, 0, 0)
+        for family in (7, 3, 7, 3, 5):
+            worm = active_characters.Worm((2, 1))
+            worm.genetics.family = family
+            test_world.add_worm(worm)
+        families = test_world.families_at((2, 1))
+        self.assertEqual(list(families), [7, 3, 5])
+        self.assertEqual(len(families[7]), 2)
+        self.assertEqual(test_world.worms_is_not_relatives((2, 1)),
+                         [members[0] for members in families.values()])
+        self.assertTrue(families[3][0].is_relative_to(families[3][1]))
+        self.assertFalse(families[3][0].is_relative_to(families[5][0]))
+
+    def test_spawn_worms(self) -> None:
+        """Checks newborn worms created in one batch and the reuse of freed slots."""
+        genome = active_characters.intern_genome(bytes([0] * 4 + [2] * 7 + [3] * 5))
+        for columnar in (False, True):
+            test_world = world.World(4, 4, 3, 0, columnar=columnar, seed=2)
+            removed = test_world.worms[1]
+            test_world.remove_worm(removed)
+            children = test_world.spawn_worms([(1, 1), (3, 2)], [genome, genome],
+                                              families=[5, 6], generations=[2, 3])
+            self.assertEqual(len(test_world.worms), 4)
+            self.assertEqual(test_world.worms_at((3, 2)), [children[1]])
+            self.assertIn(children[0], test_world.worms_by_initiative)
+            for child, family, generation in zip(children, (5, 6), (2, 3)):
+                self.assertIs(child.genetics.shared_genome, genome)
+                self.assertEqual(child.genetics.family, family)
+                self.assertEqual(child.get_generation(), generation)
+                self.assertEqual(child.get_energy(), 140)
+                self.assertIn(child.get_health(), range(9, 13))
+                self.assertEqual(child.get_level(), 1)
+                self.assertEqual((child.genetics.health_boost, child.genetics.energetic_boost,
+                                  child.genetics.defense_boost), (1, 2, 1))
+                self.assertEqual(child.genetics.energetic_genes_pool, 1)
+            if columnar:
+                self.assertEqual(children[0].slot, 1)
+                self.assertEqual(test_world.population.health[1], children[0].get_health())
+
+    def test_seeded_runs(self) -> None:
+        """Checks that worlds with the same seed evolve identically."""
+        def run(seed: int) -> list:
+            seeded_world = world.World(8, 8, 40, 40, seed=seed)
+            pipeline = [processors.AddFoodProcessor(), processors.WormsMovementProcessor(),
+                        processors.FightProcessor(), processors.FoodPickUpProcessor(),
+                        processors.MutationProcessor(), processors.WormDivisionProcessor(),
+                        processors.WeatherEventsEmergenceProcessor(),
+                        processors.WeatherMovementsProcessor(),
+                        processors.WeatherEffectsProcessor()]
+            for _ in range(10):
+                for proc in pipeline:
+                    proc.process(seeded_world)
+            return [(worm.coordinates, worm.get_health(), len(worm.genetics.genotype))
+                    for worm in seeded_world.worms]
+
+        self.assertEqual(run(3), run(3))
+        self.assertNotEqual(run(3), run(4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,6 @@
+import copy
 import unittest
+from resources.names import NAMES
 from src import active_characters
 from resources.common_types import Neighbors
 
@@ -45,11 +47,81 @@ class WormTest(unittest.TestCase):
         self.control_worm = active_characters.Worm((0, 0))
         test_genotype = active_characters.create_genome()
         self.control_worm.genetics.genotype = test_genotype
+        self.assertEqual(sum(self.control_worm.genetics.gene_counts), len(test_genotype))
         rounds = 20
         while rounds > 0:
             self.control_worm.deletion_mutation()
             rounds -= 1
         self.assertEqual(len(self.control_worm.genetics.genotype), 0)
+        self.assertEqual(self.control_worm.genetics.gene_counts, (0, 0, 0, 0))
+
+    def test_shared_genome(self) -> None:
+        """Checks sharing of equal genomes, their mutations and bonuses."""
+        genotype = [active_characters.Genes.ENERGY] * 7 + [active_characters.Genes.DEFENSE] * 5
+        parent = active_characters.Worm((0, 0))
+        child = active_characters.Worm((0, 0))
+        parent.genetics.genotype = genotype
+        child.genetics.genotype = list(genotype)
+        self.assertIs(parent.genetics.shared_genome, child.genetics.shared_genome)
+
+        defense = child.get_defense()
+        child.newborn_genetics_boost(child.genetics.genotype)
+        self.assertEqual(child.get_energy(), 140)
+        self.assertEqual(child.get_defense(), max(defense - 0.1, 0.2))
+        self.assertEqual(child.genetics.energetic_genes_pool, 1)
+        self.assertEqual(child.genetics.energetic_boost, 2)
+        self.assertEqual(child.genetics.defense_boost, 1)
+
+        child.newborn_genetics_boost([active_characters.Genes.ENERGY] * 2)
+        self.assertEqual(child.get_energy(), 160)
+        self.assertEqual(child.genetics.energetic_genes_pool, 0)
+        self.assertEqual(child.genetics.energetic_boost, 3)
+
+        child.insertion_mutation()
+        self.assertEqual(len(child.genetics.genotype), 13)
+        self.assertEqual(parent.genetics.genotype, genotype)
+
+    def test_genetics_boost_pools(self) -> None:
+        """Checks that bonuses of the genes match the realization gene by gene
+        for negative and large pools."""
+        genes = active_characters.Genes
+        genotype = [genes.HEALTH] * 9 + [genes.DAMAGE] * 11 \
+            + [genes.ENERGY] * 7 + [genes.DEFENSE] * 13
+        fields = active_characters.Genetics.state_fields
+        for pool in (-11, -7, -5, -1, 0, 3, 4, 12, 29):
+            for defense in (0.2, 0.25, 0.9):
+                worm = active_characters.Worm((0, 0))
+                worm._defense = defense
+                worm.genetics.health_genes_pool = pool
+                worm.genetics.damage_genes_pool = -pool
+                worm.genetics.energetic_genes_pool = pool
+                worm.genetics.defense_genes_pool = -pool
+                control_worm = copy.deepcopy(worm)
+                worm.newborn_genetics_boost(genotype)
+                for gene in genotype:
+                    if gene is genes.ENERGY:
+                        control_worm.genetics.energetic_genes_pool += 1
+                    elif gene is genes.HEALTH:
+                        control_worm.genetics.health_genes_pool += 1
+                    elif gene is genes.DAMAGE:
+                        control_worm.genetics.damage_genes_pool += 1
+                    else:
+                        control_worm.genetics.defense_genes_pool += 1
+                control_worm.energetic_genes_realization()
+                control_worm.health_genes_realization()
+                control_worm.damage_genes_realization()
+                control_worm.defense_genes_realization()
+                self.assertEqual(worm.get_state(), control_worm.get_state())
+                self.assertEqual([getattr(worm.genetics, field) for field in fields],
+                                 [getattr(control_worm.genetics, field) for field in fields])
+
+    def test_compact_worm(self) -> None:
+        """Checks that the worm keeps no dictionary of attributes and the index of its name."""
+        worm = active_characters.Worm((0, 0))
+        self.assertFalse(hasattr(worm, '__dict__'))
+        self.assertFalse(hasattr(worm.genetics, '__dict__'))
+        self.assertIn(worm.name, NAMES)
+        self.assertEqual(worm.name, NAMES[worm.get_state()[0]])
 
 
 if __name__ == '__main__':
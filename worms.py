@@ -3,10 +3,104 @@ the implementation of the mechanics
 of worms, food, weather events."""
 import configparser
 import logging
+from typing import List
 
 
 import src.processors
 import src.world
+from src.checkpoint import Checkpointer, latest, load
+from src.instrumentation import Instrumentation
+from src.replay import EventRecorder
+from src.tiles import TiledSimulation
+
+VALID_PROCESSORS = {
+    'agingprocessor': src.processors.AgingProcessor,
+    'zeroenergyprocessor': src.processors.ZeroEnergyProcessor,
+    'poisonprocessor': src.processors.PoisonProcessor,
+    'weathereventsemergenceprocessor': src.processors.WeatherEventsEmergenceProcessor,
+    'addfoodprocessor': src.processors.AddFoodProcessor,
+    'weathermovementsprocessor': src.processors.WeatherMovementsProcessor,
+    'weathereffectsprocessor': src.processors.WeatherEffectsProcessor,
+    'wormsmovementprocessor': src.processors.WormsMovementProcessor,
+    'fightprocessor': src.processors.FightProcessor,
+    'corpsegrindingprocessor': src.processors.CorpseGrindingProcessor,
+    'foodpickupprocessor': src.processors.FoodPickUpProcessor,
+    'deadwormsremover': src.processors.DeadWormsRemover,
+    'eatenfoodremover': src.processors.EatenFoodRemover,
+    'weathereventsremover': src.processors.WeatherEventsRemover,
+    'levelupprocessor': src.processors.LevelUpProcessor,
+    'wormdivisionprocessor': src.processors.WormDivisionProcessor,
+    'mutationprocessor': src.processors.MutationProcessor,
+    'analyticsprocessor': src.processors.AnalyticsProcessor,
+    'visualizer': src.processors.Visualizer}
+
+
+def create_world(config: configparser.ConfigParser) -> src.world.World:
+    """Creates the world with settings from the WORLD section."""
+    world_height = int(config.get('WORLD', 'height'))
+    world_width = int(config.get('WORLD', 'width'))
+    world_start_worms_num = int(config.get('WORLD', 'worms_num'))
+    world_start_food_num = int(config.get('WORLD', 'food_num'))
+    world_columnar = config.getboolean('WORLD', 'columnar', fallback=False)
+    world_seed = config.get('WORLD', 'seed', fallback='')
+    world_food_field = config.getboolean('WORLD', 'food_field', fallback=False)
+
+    return src.world.World(world_height, world_width, world_start_worms_num, world_start_food_num,
+                           world_columnar, int(world_seed) if world_seed else None,
+                           world_food_field)
+
+
+def build_processors(config: configparser.ConfigParser) -> List[src.processors.WorldProcessor]:
+    """Creates processors enabled in the PROCESSORS section
+    in the order of the config."""
+    processors = []
+
+    for option in config.options('PROCESSORS'):
+        if option not in VALID_PROCESSORS.keys():
+            logging.error('Unknown processor')
+            raise ValueError('Unknown processor')
+        if config.getboolean('PROCESSORS', option) is True:
+            proc = VALID_PROCESSORS[option]
+            processors.append(proc.from_config(config))
+
+    execution_mode = config.get('EXECUTION', 'mode', fallback='sequential')
+    if execution_mode == 'fused':
+        processors = src.processors.fuse_processors(processors)
+    elif execution_mode != 'sequential':
+        logging.error('Unknown execution mode')
+        raise ValueError('Unknown execution mode')
+    return processors
+
+
+def resume_world(config: configparser.ConfigParser,
+                 processors: List[src.processors.WorldProcessor]) -> src.world.World:
+    """Loads the world from the checkpoint set in the CHECKPOINT section,
+    'latest' selects the newest one in the checkpoints directory.
+    Creates a new world if no checkpoint is set or found."""
+    resume = config.get('CHECKPOINT', 'resume', fallback='')
+    if resume == 'latest':
+        resume = latest(config.get('CHECKPOINT', 'directory', fallback='checkpoints')) or ''
+    if not resume:
+        return create_world(config)
+    logging.info('Resuming from %s', resume)
+    return load(resume, processors)
+
+
+def check_tiles_config(config: configparser.ConfigParser) -> None:
+    """Raises ValueError if settings not supported by the tiled simulation are set:
+    checkpoints, resume, event recording and instrumentation."""
+    if config.getint('EXECUTION', 'tiles', fallback=1) <= 1:
+        return
+    unsupported = [name for name, is_set in (
+        ('CHECKPOINT interval', config.getint('CHECKPOINT', 'interval', fallback=0) > 0),
+        ('CHECKPOINT resume', bool(config.get('CHECKPOINT', 'resume', fallback=''))),
+        ('EVENTS record', config.getboolean('EVENTS', 'record', fallback=False)),
+        ('INSTRUMENTATION enabled',
+         config.getboolean('INSTRUMENTATION', 'enabled', fallback=False))) if is_set]
+    if unsupported:
+        logging.error('Settings not supported with tiles: %s', ', '.join(unsupported))
+        raise ValueError('Settings not supported with tiles')
+
 
 if __name__ == "__main__":
 
@@ -23,45 +117,34 @@ if __name__ == "__main__":
     logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
                         level=logging_levels.get(logging_level))
 
-    WORLD_HEIGHT = int(config.get('WORLD', 'height'))
-    WORLD_WIDTH = int(config.get('WORLD', 'width'))
-    WORLD_START_WORMS_NUM = int(config.get('WORLD', 'worms_num'))
-    WORLD_START_FOOD_NUM = int(config.get('WORLD', 'food_num'))
-
-    world = src.world.World(WORLD_HEIGHT, WORLD_WIDTH, WORLD_START_WORMS_NUM, WORLD_START_FOOD_NUM)
-    valid_processors = {
-        'agingprocessor': src.processors.AgingProcessor,
-        'zeroenergyprocessor': src.processors.ZeroEnergyProcessor,
-        'poisonprocessor': src.processors.PoisonProcessor,
-        'weathereventsemergenceprocessor': src.processors.WeatherEventsEmergenceProcessor,
-        'addfoodprocessor': src.processors.AddFoodProcessor,
-        'weathermovementsprocessor': src.processors.WeatherMovementsProcessor,
-        'weathereffectsprocessor': src.processors.WeatherEffectsProcessor,
-        'wormsmovementprocessor': src.processors.WormsMovementProcessor,
-        'fightprocessor': src.processors.FightProcessor,
-        'corpsegrindingprocessor': src.processors.CorpseGrindingProcessor,
-        'foodpickupprocessor': src.processors.FoodPickUpProcessor,
-        'deadwormsremover': src.processors.DeadWormsRemover,
-        'eatenfoodremover': src.processors.EatenFoodRemover,
-        'weathereventsremover': src.processors.WeatherEventsRemover,
-        'levelupprocessor': src.processors.LevelUpProcessor,
-        'wormdivisionprocessor': src.processors.WormDivisionProcessor,
-        'mutationprocessor': src.processors.MutationProcessor,
-        'analyticsprocessor': src.processors.AnalyticsProcessor,
-        'visualizer': src.processors.Visualizer}
-
-    processors = []
-
-    for option in config.options('PROCESSORS'):
-        if option not in valid_processors.keys():
-            logging.error('Unknown processor')
-            raise ValueError('Unknown processor')
-        if config.getboolean('PROCESSORS', option) is True:
-            proc = valid_processors[option]
-            processors.append(proc())
+    check_tiles_config(config)
+    processors = build_processors(config)
 
     PROCESS = True
 
-    while PROCESS is True:
-        for proc in processors:
-            proc.process(world)
+    if config.getint('EXECUTION', 'tiles', fallback=1) > 1:
+        simulation = TiledSimulation.from_config(config, processors)
+        try:
+            while PROCESS is True:
+                logging.debug('Tick totals: %s', simulation.step())
+        finally:
+            simulation.close()
+    else:
+        world = resume_world(config, processors)
+        world.instrumentation = Instrumentation.from_config(config)
+        checkpointer = Checkpointer.from_config(config)
+        recorder = EventRecorder.from_config(config)
+        recorder.start(world, processors)
+
+        try:
+            while PROCESS is True:
+                world.instrumentation.run_tick(world, processors)
+                checkpointer.after_tick(world, processors)
+                recorder.after_tick(world, processors)
+        finally:
+            checkpointer.close()
+            recorder.close()
+            for proc in processors:
+                proc.close()
+            if world.instrumentation.enabled:
+                world.instrumentation.dump()